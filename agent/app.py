@@ -4,6 +4,7 @@ from __future__ import annotations
 AI Trainer unified backend (videos, gyms, coach).
 """
 
+import asyncio
 import base64
 import hashlib
 import io
@@ -23,7 +24,7 @@ from dotenv import load_dotenv
 dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
 load_dotenv(dotenv_path=dotenv_path, override=True)
 from datetime import date, datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
 
 _ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if _ROOT_DIR not in sys.path:
@@ -31,6 +32,7 @@ if _ROOT_DIR not in sys.path:
 _ROOT_ENV_PATH = os.path.join(_ROOT_DIR, ".env")
 _ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
 
+import anyio
 import certifi
 import json
 import urllib.parse
@@ -39,18 +41,32 @@ import stripe
 
 from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from googleapiclient.discovery import build
 import google.generativeai as genai
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
 from PIL import Image
 from pydantic import BaseModel
 from openai import OpenAI
 
-from agent.state import SESSION_CACHE
-from agent.redis.cache import _redis_delete, _redis_get_json, _redis_set_json
-from config.constants import DB_PATH, CACHE_TTL_LONG, _draft_health_activity_key, _draft_meal_logs_key, _draft_reminders_key, _draft_workout_sessions_key
-from agent.db.connection import get_db_conn
+from agent.bulkheads import AUDIO, BULKHEADS, DEFAULT_POOL, EXTERNAL, LLM, VISION, BulkheadFull, run_in_threadpool
+from agent.state import SESSION_CACHE, SessionStore, SharedState, remember_session_fields, session_field
+from agent.redis.cache import (
+    _aredis_get_json,
+    _aredis_set_json,
+    _aredis_set_json_if_current,
+    _aredis_tag_generations,
+    _redis_get_json,
+    _redis_set_json,
+)
+from agent.redis.invalidation import cache_tags, invalidate
+from agent.redis.swr import aswr_get, swr_get
+from config.constants import DB_PATH, CACHE_TTL_LONG, CACHE_TTL_SWR_HARD, CACHE_TTL_SWR_SOFT, _draft_health_activity_key, _draft_meal_logs_key, _draft_reminders_key, _draft_workout_sessions_key
+from agent.db import queries
+from agent.db.bulk import bulk_insert
+from agent.db.connection import close_async_pool, get_async_db_conn, get_db_conn, use_async_db_conn
+from agent.db.migrations import apply_migrations
 from agent.plan.plan_generation import _build_plan_data
 from agent.tools.plan_tools import _set_active_plan_cache
 load_dotenv(dotenv_path=_ROOT_ENV_PATH)
@@ -130,16 +146,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("startup")
+def _run_schema_migrations() -> None:
+    if os.environ.get("RUN_MIGRATIONS_ON_STARTUP", "1").lower() in {"0", "false", "no"}:
+        return
+    try:
+        applied = apply_migrations()
+        if applied:
+            logger.info("Schema migrations applied: %s", applied)
+    except Exception:
+        logger.exception("Schema migrations failed; run `python -m agent.db.migrations` manually.")
+
+
+@app.on_event("startup")
+async def _configure_default_threadpool() -> None:
+    # Sync endpoints (mostly DB reads) share this pool; slow upstream calls
+    # run on the bulkheads in agent.bulkheads instead.
+    size = os.environ.get("THREADPOOL_SIZE")
+    if size:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = int(size)
+    DEFAULT_POOL.install()
+
+
+@app.exception_handler(BulkheadFull)
+async def _bulkhead_full_handler(request: Request, exc: BulkheadFull) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.on_event("shutdown")
+async def _close_db_pools() -> None:
+    await close_async_pool()
+
+
 youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
 
 # Agent integration (lazy-loaded so env vars are available)
 _AGENT_GRAPH = None
-_AGENT_PRELOADED: set[str] = set()
+# Per-thread bookkeeping is bounded like SESSION_CACHE so long-lived workers stay flat.
+# It only records that this process warmed SESSION_CACHE, so it stays local.
+_AGENT_PRELOADED = SessionStore(
+    "agent_preloaded",
+    max_entries=int(os.getenv("AGENT_PRELOADED_MAX_ENTRIES", "20000")),
+    max_bytes=int(os.getenv("AGENT_PRELOADED_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl_seconds=int(os.getenv("AGENT_PRELOADED_TTL_SECONDS", str(2 * 60 * 60))),
+)
 _AGENT_PRELOAD_FN = None
 _AGENT_RAG_INIT = None
-_PENDING_PLANS: Dict[str, Dict[str, Any]] = {}
+# Shared (STATE_BACKEND) so /coach/feedback can land on any worker.
+_PENDING_PLANS = SharedState(
+    "pending_plans",
+    max_entries=int(os.getenv("PENDING_PLANS_MAX_ENTRIES", "2000")),
+    max_bytes=int(os.getenv("PENDING_PLANS_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl_seconds=int(os.getenv("PENDING_PLANS_TTL_SECONDS", str(24 * 60 * 60))),
+)
 _GEMINI_MODEL = None
 _OPENAI_CLIENT = None
+_ASHLEY_LLM = None
+_ONBOARDING_EXTRACT_LLM = None
 COACH_CHANGE_COOLDOWN_DAYS = 2
 
 
@@ -204,7 +272,8 @@ def _extract_plan_from_messages(messages: List[Any]) -> Dict[str, Any]:
     plan_text = None
     proposed_plan = None
     for message in reversed(messages):
-        if isinstance(message, ToolMessage):
+        # Tool calls can run in parallel, so skip results of other tools in the batch.
+        if isinstance(message, ToolMessage) and message.name in (None, "generate_plan"):
             try:
                 payload = json.loads(message.content)
             except json.JSONDecodeError:
@@ -414,42 +483,28 @@ def _extract_og_image(url: str) -> Optional[str]:
         return None
 
 
-def _store_meal_log(payload: FoodLogRequest) -> None:
-    _ensure_meal_log_schema()
+def _store_meal_log(payload: FoodLogRequest) -> bool:
+    """Insert the meal; False when its idempotency key was already stored."""
     if int(payload.total_calories or 0) <= 0:
         raise ValueError("Could not determine calories for this meal")
     logged_at = payload.logged_at or datetime.now().isoformat(timespec="seconds")
     description = payload.food_name
     day_key = logged_at[:10]
+    idempotency_key = (payload.idempotency_key or "").strip() or None
+    confidence = max((item.confidence for item in payload.items), default=0.6)
 
-    # Cache-first: store meal draft in Redis before DB persistence.
-    draft_key = _draft_meal_logs_key(payload.user_id)
-    cached_draft = _redis_get_json(draft_key)
-    draft = cached_draft if isinstance(cached_draft, dict) else {"meals": []}
-    draft_entry = {
-        "id": None,
-        "user_id": payload.user_id,
-        "logged_at": logged_at,
-        "description": description,
-        "calories": int(payload.total_calories),
-        "protein_g": int(payload.protein_g),
-        "carbs_g": int(payload.carbs_g),
-        "fat_g": int(payload.fat_g),
-        "confidence": max((item.confidence for item in payload.items), default=0.6),
-        "confirmed": 1,
-    }
-    draft.setdefault("meals", []).insert(0, draft_entry)
-    _redis_set_json(draft_key, draft, ttl_seconds=CACHE_TTL_LONG)
-    SESSION_CACHE.setdefault(payload.user_id, {})["meal_logs"] = draft
-
+    # Retries with the same idempotency key hit the unique index and insert nothing.
     with get_db_conn() as conn:
         cur = conn.cursor()
         cur.execute(
             """
             INSERT INTO meal_logs (
                 user_id, logged_at, photo_path, description, calories,
-                protein_g, carbs_g, fat_g, fiber_g, sugar_g, sodium_mg, confidence, confirmed
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                protein_g, carbs_g, fat_g, fiber_g, sugar_g, sodium_mg, confidence, confirmed,
+                idempotency_key
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+            RETURNING id
             """,
             (
                 payload.user_id,
@@ -463,122 +518,41 @@ def _store_meal_log(payload: FoodLogRequest) -> None:
                 float(payload.fiber_g or 0),
                 float(payload.sugar_g or 0),
                 float(payload.sodium_mg or 0),
-                max((item.confidence for item in payload.items), default=0.6),
+                confidence,
                 1,
+                idempotency_key,
             ),
         )
+        inserted = cur.fetchone()
         conn.commit()
-    _invalidate_user_activity_cache(payload.user_id, day=day_key)
+    if not inserted:
+        return False
+
+    draft_key = _draft_meal_logs_key(payload.user_id)
+    cached_draft = _redis_get_json(draft_key)
+    draft = cached_draft if isinstance(cached_draft, dict) else {"meals": []}
+    draft_entry = {
+        "id": inserted[0],
+        "user_id": payload.user_id,
+        "logged_at": logged_at,
+        "description": description,
+        "calories": int(payload.total_calories),
+        "protein_g": int(payload.protein_g),
+        "carbs_g": int(payload.carbs_g),
+        "fat_g": int(payload.fat_g),
+        "confidence": confidence,
+        "confirmed": 1,
+        "idempotency_key": idempotency_key,
+    }
+    draft.setdefault("meals", []).insert(0, draft_entry)
+    _redis_set_json(draft_key, draft, ttl_seconds=CACHE_TTL_LONG)
+    SESSION_CACHE.setdefault(payload.user_id, {})["meal_logs"] = draft
+    invalidate(payload.user_id, "meals", day=day_key)
     _award_points(payload.user_id, 5, f"meal_log:{logged_at}")
     _maybe_award_daily_calorie_target_bonus(payload.user_id, logged_at[:10])
     _apply_daily_checklist_completion_bonus(payload.user_id, logged_at[:10])
     _ensure_daily_coach_checkin_reminder(payload.user_id)
-
-
-def _ensure_auth_schema() -> None:
-    with get_db_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-              AND table_name = 'users'
-              AND column_name = 'password_hash'
-            """
-        )
-        has_password_hash = cur.fetchone() is not None
-        if not has_password_hash:
-            cur.execute("ALTER TABLE users ADD COLUMN password_hash TEXT NULL")
-            conn.commit()
-
-
-def _ensure_profile_schema() -> None:
-    with get_db_conn() as conn:
-        cur = conn.cursor()
-        # Check if profile_image_base64 column exists (PostgreSQL compatible)
-        cur.execute(
-            """
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-              AND table_name = 'users'
-              AND column_name = 'profile_image_base64'
-            """
-        )
-        has_profile_image = cur.fetchone() is not None
-        if not has_profile_image:
-            cur.execute("ALTER TABLE users ADD COLUMN profile_image_base64 TEXT NULL")
-        user_columns = [
-            ("location_shared", "BOOLEAN NULL"),
-            ("location_latitude", "DOUBLE PRECISION NULL"),
-            ("location_longitude", "DOUBLE PRECISION NULL"),
-        ]
-        for col_name, col_type in user_columns:
-            cur.execute(
-                """
-                SELECT 1
-                FROM information_schema.columns
-                WHERE table_schema = 'public'
-                  AND table_name = 'users'
-                  AND column_name = ?
-                """,
-                (col_name,),
-            )
-            has_col = cur.fetchone() is not None
-            if not has_col:
-                cur.execute(f"ALTER TABLE users ADD COLUMN {col_name} {col_type}")
-        pref_columns = [
-            ("allergies", "TEXT NULL"),
-            ("preferred_workout_time", "TEXT NULL"),
-            ("menstrual_cycle_notes", "TEXT NULL"),
-            ("trainer_gender_preference", "TEXT NULL"),
-            ("trainer_style_preference", "TEXT NULL"),
-            ("muscle_group_preferences", "TEXT NULL"),
-            ("sports_preferences", "TEXT NULL"),
-            ("location_context", "TEXT NULL"),
-            ("google_calendar_connected", "BOOLEAN NULL"),
-        ]
-        for col_name, col_type in pref_columns:
-            cur.execute(
-                """
-                SELECT 1
-                FROM information_schema.columns
-                WHERE table_schema = 'public'
-                  AND table_name = 'user_preferences'
-                  AND column_name = ?
-                """,
-                (col_name,),
-            )
-            has_col = cur.fetchone() is not None
-            if not has_col:
-                cur.execute(f"ALTER TABLE user_preferences ADD COLUMN {col_name} {col_type}")
-        conn.commit()
-
-
-def _ensure_meal_log_schema() -> None:
-    with get_db_conn() as conn:
-        cur = conn.cursor()
-        meal_columns = [
-            ("fiber_g", "DOUBLE PRECISION NULL"),
-            ("sugar_g", "DOUBLE PRECISION NULL"),
-            ("sodium_mg", "DOUBLE PRECISION NULL"),
-        ]
-        for col_name, col_type in meal_columns:
-            cur.execute(
-                """
-                SELECT 1
-                FROM information_schema.columns
-                WHERE table_schema = 'public'
-                  AND table_name = 'meal_logs'
-                  AND column_name = ?
-                """,
-                (col_name,),
-            )
-            has_col = cur.fetchone() is not None
-            if not has_col:
-                cur.execute(f"ALTER TABLE meal_logs ADD COLUMN {col_name} {col_type}")
-        conn.commit()
+    return True
 
 
 def _supabase_url() -> Optional[str]:
@@ -620,74 +594,6 @@ def _sign_storage_url(url: str, expires_in: int = 3600) -> Optional[str]:
     return f"{base}{signed}"
 
 
-def _ensure_coach_schema() -> None:
-    with get_db_conn() as conn:
-        cur = conn.cursor()
-        # Check if agent_id column exists (PostgreSQL compatible)
-        cur.execute(
-            """
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-              AND table_name = 'users'
-              AND column_name = 'agent_id'
-            """
-        )
-        has_agent_id = cur.fetchone() is not None
-        if not has_agent_id:
-            cur.execute("ALTER TABLE users ADD COLUMN agent_id BIGINT NULL")
-
-        cur.execute(
-            """
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-              AND table_name = 'users'
-              AND column_name = 'coach_voice'
-            """
-        )
-        has_coach_voice = cur.fetchone() is not None
-        if not has_coach_voice:
-            cur.execute("ALTER TABLE users ADD COLUMN coach_voice TEXT NULL")
-
-        cur.execute(
-            """
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_schema = 'public'
-              AND table_name = 'users'
-              AND column_name = 'last_agent_change_at'
-            """
-        )
-        has_last_agent_change_at = cur.fetchone() is not None
-        if not has_last_agent_change_at:
-            cur.execute("ALTER TABLE users ADD COLUMN last_agent_change_at TEXT NULL")
-
-        # Default to Marcus (id=1) when missing.
-        cur.execute("UPDATE users SET agent_id = 1 WHERE agent_id IS NULL")
-        cur.execute(
-            """
-            UPDATE users
-            SET coach_voice = CASE
-                WHEN agent_id = 1 THEN 'onyx'
-                WHEN agent_id = 2 THEN 'shimmer'
-                WHEN agent_id = 3 THEN 'sage'
-                WHEN agent_id = 4 THEN 'nova'
-                WHEN agent_id = 5 THEN 'echo'
-                WHEN agent_id = 6 THEN 'alloy'
-                WHEN agent_id = 7 THEN 'nova'
-                WHEN agent_id = 8 THEN 'echo'
-                WHEN agent_id = 9 THEN 'shimmer'
-                WHEN agent_id = 10 THEN 'nova'
-                WHEN agent_id = 11 THEN 'alloy'
-                ELSE 'alloy'
-            END
-            WHERE coach_voice IS NULL OR coach_voice = ''
-            """
-        )
-        conn.commit()
-
-
 def _default_voice_for_agent(agent_id: Optional[int]) -> str:
     mapping = {
         1: "onyx",
@@ -851,7 +757,7 @@ def _award_points(user_id: int, points: int, reason: str) -> None:
 def _has_points_reason(user_id: int, reason: str) -> bool:
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT 1 FROM points WHERE user_id = ? AND reason = ? LIMIT 1", (user_id, reason))
+        cur.execute(queries.SELECT_POINTS_REASON, (user_id, reason))
         return cur.fetchone() is not None
 
 
@@ -888,13 +794,6 @@ def _level_progress_from_points(points: int) -> Dict[str, int]:
     }
 
 
-def _invalidate_user_activity_cache(user_id: int, day: Optional[str] = None) -> None:
-    _redis_delete(f"session_hydration:{user_id}")
-    _redis_delete(f"user:{user_id}:meal_logs")
-    if day:
-        _redis_delete(f"daily_intake:{user_id}:{day}")
-
-
 def _ensure_daily_coach_checkin_reminder(user_id: int) -> None:
     # Schedule today's check-in if upcoming; otherwise schedule for tomorrow.
     now = datetime.now()
@@ -918,27 +817,11 @@ def _ensure_daily_coach_checkin_reminder(user_id: int) -> None:
 
 
 def _invalidate_health_activity_cache(user_id: int) -> None:
-    _redis_delete(_draft_health_activity_key(user_id))
-    _redis_delete(f"session_hydration:{user_id}")
+    invalidate(user_id, "health_activity", keys=[_draft_health_activity_key(user_id)])
 
 
 def _invalidate_reminders_cache(user_id: int) -> None:
-    _redis_delete(_draft_reminders_key(user_id))
-    _redis_delete(f"session_hydration:{user_id}")
-
-
-def _ensure_app_open_schema() -> None:
-    with get_db_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS app_open_events (
-                user_id INTEGER PRIMARY KEY,
-                last_open_at TEXT NOT NULL
-            )
-            """
-        )
-        conn.commit()
+    invalidate(user_id, "reminders", keys=[_draft_reminders_key(user_id)])
 
 
 def _daily_intake_and_target(user_id: int, target_day: str) -> tuple[int, Optional[int]]:
@@ -1069,21 +952,15 @@ def _apply_daily_checklist_completion_bonus(user_id: int, target_day: str) -> No
     end = f"{target_day}T23:59:59"
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
-            "SELECT COUNT(*) FROM meal_logs WHERE user_id = ? AND logged_at BETWEEN ? AND ?",
-            (user_id, start, end),
-        )
-        meal_count = int((cur.fetchone() or [0])[0] or 0)
-        cur.execute(
-            "SELECT COUNT(*) FROM workout_sessions WHERE user_id = ? AND completed = 1 AND date = ?",
-            (user_id, target_day),
-        )
-        workout_count = int((cur.fetchone() or [0])[0] or 0)
+        cur.execute(queries.SELECT_DAILY_MEAL_COUNT, (user_id, start, end))
+        meal_count = _count_from_row(cur.fetchone())
+        cur.execute(queries.SELECT_DAILY_COMPLETED_WORKOUT_COUNT, (user_id, target_day))
+        workout_count = _count_from_row(cur.fetchone())
         cur.execute(
             "SELECT COUNT(*) FROM checkins WHERE user_id = ? AND checkin_date = ?",
             (user_id, target_day),
         )
-        checkin_count = int((cur.fetchone() or [0])[0] or 0)
+        checkin_count = _count_from_row(cur.fetchone())
     if meal_count < 3 or workout_count < 1 or checkin_count < 1:
         return
     reason = f"daily_checklist_complete:{target_day}"
@@ -1092,18 +969,48 @@ def _apply_daily_checklist_completion_bonus(user_id: int, target_day: str) -> No
     _award_points(user_id, 10, reason)
 
 
+def _count_from_row(row: Optional[tuple]) -> int:
+    return int((row or [0])[0] or 0)
+
+
 def _daily_checklist_status(user_id: int, target_day: str) -> Dict[str, Any]:
     start = f"{target_day}T00:00:00"
     end = f"{target_day}T23:59:59"
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM meal_logs WHERE user_id = ? AND logged_at BETWEEN ? AND ?", (user_id, start, end))
-        meal_count = int((cur.fetchone() or [0])[0] or 0)
-        cur.execute("SELECT COUNT(*) FROM workout_sessions WHERE user_id = ? AND completed = 1 AND date = ?", (user_id, target_day))
-        workout_count = int((cur.fetchone() or [0])[0] or 0)
+        cur.execute(queries.SELECT_DAILY_MEAL_COUNT, (user_id, start, end))
+        meal_count = _count_from_row(cur.fetchone())
+        cur.execute(queries.SELECT_DAILY_COMPLETED_WORKOUT_COUNT, (user_id, target_day))
+        workout_count = _count_from_row(cur.fetchone())
     checkin_done = _has_points_reason(user_id, f"checkin_log:{target_day}")
     checklist_reason = f"daily_checklist_complete:{target_day}"
     checklist_done = _has_points_reason(user_id, checklist_reason)
+    return _checklist_status_payload(target_day, meal_count, workout_count, checkin_done, checklist_done)
+
+
+async def _adaily_checklist_status(user_id: int, target_day: str, conn=None) -> Dict[str, Any]:
+    start = f"{target_day}T00:00:00"
+    end = f"{target_day}T23:59:59"
+    async with use_async_db_conn(conn) as conn:
+        cur = conn.cursor()
+        await cur.execute(queries.SELECT_DAILY_MEAL_COUNT, (user_id, start, end))
+        meal_count = _count_from_row(await cur.fetchone())
+        await cur.execute(queries.SELECT_DAILY_COMPLETED_WORKOUT_COUNT, (user_id, target_day))
+        workout_count = _count_from_row(await cur.fetchone())
+        await cur.execute(queries.SELECT_POINTS_REASON, (user_id, f"checkin_log:{target_day}"))
+        checkin_done = await cur.fetchone() is not None
+        await cur.execute(queries.SELECT_POINTS_REASON, (user_id, f"daily_checklist_complete:{target_day}"))
+        checklist_done = await cur.fetchone() is not None
+    return _checklist_status_payload(target_day, meal_count, workout_count, checkin_done, checklist_done)
+
+
+def _checklist_status_payload(
+    target_day: str,
+    meal_count: int,
+    workout_count: int,
+    checkin_done: bool,
+    checklist_done: bool,
+) -> Dict[str, Any]:
     return {
         "day": target_day,
         "meals_logged": meal_count,
@@ -1188,8 +1095,6 @@ def _gamification_summary(user_id: int) -> Dict[str, Any]:
 
 
 def _load_user_profile(user_id: int) -> Dict[str, Any]:
-    _ensure_profile_schema()
-    _ensure_coach_schema()
     def _map_user(row: Optional[tuple]) -> Optional[Dict[str, Any]]:
         if not row:
             return None
@@ -1282,24 +1187,31 @@ def _resolve_coach_slug(agent_id: Optional[Union[int, str]]) -> Optional[str]:
     return str(agent_id).strip().lower()
 
 
+def _checkin_rows_to_dicts(rows: List[tuple]) -> List[Dict[str, Any]]:
+    return [
+        {"date": row[0], "weight_kg": row[1], "mood": row[2], "notes": row[3]}
+        for row in rows
+    ]
+
+
 def _list_checkins(user_id: int) -> List[Dict[str, Any]]:
     try:
         with get_db_conn() as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT checkin_date, weight_kg, mood, notes
-                FROM checkins
-                WHERE user_id = ?
-                ORDER BY checkin_date DESC
-                """,
-                (user_id,),
-            )
+            cur.execute(queries.SELECT_CHECKINS_FOR_USER, (user_id,))
             rows = cur.fetchall()
-        return [
-            {"date": row[0], "weight_kg": row[1], "mood": row[2], "notes": row[3]}
-            for row in rows
-        ]
+        return _checkin_rows_to_dicts(rows)
+    except Exception:
+        return []
+
+
+async def _alist_checkins(user_id: int, conn=None) -> List[Dict[str, Any]]:
+    try:
+        async with use_async_db_conn(conn) as conn:
+            cur = conn.cursor()
+            await cur.execute(queries.SELECT_CHECKINS_FOR_USER, (user_id,))
+            rows = await cur.fetchall()
+        return _checkin_rows_to_dicts(rows)
     except Exception:
         return []
 
@@ -1315,28 +1227,12 @@ def _upsert_daily_weight_checkin(user_id: int, weight_kg: float, conn=None) -> N
         today = datetime.now().date().isoformat()
         cur.execute(
             """
-            SELECT id
-            FROM checkins
-            WHERE user_id = ? AND checkin_date = ?
-            ORDER BY id DESC
-            LIMIT 1
+            INSERT INTO checkins (user_id, checkin_date, weight_kg, mood, notes)
+            VALUES (?, ?, ?, NULL, NULL)
+            ON CONFLICT (user_id, checkin_date) DO UPDATE SET weight_kg = EXCLUDED.weight_kg
             """,
-            (user_id, today),
+            (user_id, today, weight_kg),
         )
-        existing = cur.fetchone()
-        if existing and existing[0]:
-            cur.execute(
-                "UPDATE checkins SET weight_kg = ? WHERE id = ?",
-                (weight_kg, int(existing[0])),
-            )
-        else:
-            cur.execute(
-                """
-                INSERT INTO checkins (user_id, checkin_date, weight_kg, mood, notes)
-                VALUES (?, ?, ?, NULL, NULL)
-                """,
-                (user_id, today, weight_kg),
-            )
         if own_conn:
             conn.commit()
     finally:
@@ -1344,93 +1240,147 @@ def _upsert_daily_weight_checkin(user_id: int, weight_kg: float, conn=None) -> N
             conn.close()
 
 
-def _list_workout_sessions(user_id: int) -> List[Dict[str, Any]]:
-    cached = _redis_get_json(_draft_workout_sessions_key(user_id))
+def _workout_session_rows_to_dicts(rows: List[tuple]) -> List[Dict[str, Any]]:
+    sessions = []
+    for row in rows:
+        notes = row[5]
+        details = _safe_parse_json(notes) if isinstance(notes, str) else None
+        sessions.append(
+            {
+                "id": row[0],
+                "date": row[1],
+                "workout_type": row[2],
+                "duration_min": row[3],
+                "calories_burned": row[4],
+                "completed": bool(row[6]),
+                "source": row[7],
+                "details": details,
+            }
+        )
+    return sessions
+
+
+def _sessions_from_draft(cached: Any) -> Optional[List[Dict[str, Any]]]:
     if isinstance(cached, dict):
         sessions = cached.get("sessions")
         if isinstance(sessions, list):
             return sessions
+    return None
+
+
+def _store_workout_sessions_draft(user_id: int, sessions: List[Dict[str, Any]]) -> None:
+    draft = {"sessions": sessions}
+    _redis_set_json(_draft_workout_sessions_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
+    SESSION_CACHE.setdefault(user_id, {})["workout_sessions"] = draft
+
+
+async def _astore_workout_sessions_draft(user_id: int, sessions: List[Dict[str, Any]]) -> None:
+    draft = {"sessions": sessions}
+    await _aredis_set_json(_draft_workout_sessions_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
+    SESSION_CACHE.setdefault(user_id, {})["workout_sessions"] = draft
+
+
+def _list_workout_sessions(user_id: int) -> List[Dict[str, Any]]:
+    cached = _sessions_from_draft(_redis_get_json(_draft_workout_sessions_key(user_id)))
+    if cached is not None:
+        return cached
     try:
         with get_db_conn() as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT id, date, workout_type, duration_min, calories_burned, notes, completed, source
-                FROM workout_sessions
-                WHERE user_id = ?
-                ORDER BY date DESC
-                """,
-                (user_id,),
-            )
+            cur.execute(queries.SELECT_WORKOUT_SESSIONS_FOR_USER, (user_id,))
             rows = cur.fetchall()
-        sessions = []
-        for row in rows:
-            notes = row[5]
-            details = _safe_parse_json(notes) if isinstance(notes, str) else None
-            sessions.append(
-                {
-                    "id": row[0],
-                    "date": row[1],
-                    "workout_type": row[2],
-                    "duration_min": row[3],
-                    "calories_burned": row[4],
-                    "completed": bool(row[6]),
-                    "source": row[7],
-                    "details": details,
-                }
-            )
-        draft = {"sessions": sessions}
-        _redis_set_json(_draft_workout_sessions_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
-        SESSION_CACHE.setdefault(user_id, {})["workout_sessions"] = draft
+        sessions = _workout_session_rows_to_dicts(rows)
+        _store_workout_sessions_draft(user_id, sessions)
         return sessions
     except Exception:
         return []
 
 
-def _list_meal_logs(user_id: int) -> List[Dict[str, Any]]:
-    _ensure_meal_log_schema()
-    cached = _redis_get_json(_draft_meal_logs_key(user_id))
+async def _alist_workout_sessions(user_id: int, conn=None) -> List[Dict[str, Any]]:
+    cached = _sessions_from_draft(await _aredis_get_json(_draft_workout_sessions_key(user_id)))
+    if cached is not None:
+        return cached
+    try:
+        async with use_async_db_conn(conn) as conn:
+            cur = conn.cursor()
+            await cur.execute(queries.SELECT_WORKOUT_SESSIONS_FOR_USER, (user_id,))
+            rows = await cur.fetchall()
+        sessions = _workout_session_rows_to_dicts(rows)
+        await _astore_workout_sessions_draft(user_id, sessions)
+        return sessions
+    except Exception:
+        return []
+
+
+def _meal_log_rows_to_dicts(rows: List[tuple]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": row[0],
+            "logged_at": row[1],
+            "photo_path": row[2],
+            "photo_url": None,
+            "description": row[3],
+            "calories": row[4],
+            "protein_g": row[5],
+            "carbs_g": row[6],
+            "fat_g": row[7],
+            "fiber_g": float(row[8] or 0),
+            "sugar_g": float(row[9] or 0),
+            "sodium_mg": float(row[10] or 0),
+            "confidence": row[11],
+            "confirmed": bool(row[12]),
+        }
+        for row in rows
+    ]
+
+
+def _meals_from_draft(cached: Any) -> Optional[List[Dict[str, Any]]]:
     if isinstance(cached, dict):
         meals = cached.get("meals")
         if isinstance(meals, list):
             return meals
+    return None
+
+
+def _store_meal_logs_draft(user_id: int, meals: List[Dict[str, Any]]) -> None:
+    draft = {"meals": meals}
+    _redis_set_json(_draft_meal_logs_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
+    SESSION_CACHE.setdefault(user_id, {})["meal_logs"] = draft
+
+
+async def _astore_meal_logs_draft(user_id: int, meals: List[Dict[str, Any]]) -> None:
+    draft = {"meals": meals}
+    await _aredis_set_json(_draft_meal_logs_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
+    SESSION_CACHE.setdefault(user_id, {})["meal_logs"] = draft
+
+
+def _list_meal_logs(user_id: int) -> List[Dict[str, Any]]:
+    cached = _meals_from_draft(_redis_get_json(_draft_meal_logs_key(user_id)))
+    if cached is not None:
+        return cached
     try:
         with get_db_conn() as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT id, logged_at, photo_path, description, calories, protein_g, carbs_g, fat_g,
-                       fiber_g, sugar_g, sodium_mg, confidence, confirmed
-                FROM meal_logs
-                WHERE user_id = ?
-                ORDER BY logged_at DESC
-                """,
-                (user_id,),
-            )
+            cur.execute(queries.SELECT_MEAL_LOGS_FOR_USER, (user_id,))
             rows = cur.fetchall()
-        meals = []
-        for row in rows:
-            meals.append(
-                {
-                    "id": row[0],
-                    "logged_at": row[1],
-                    "photo_path": row[2],
-                    "photo_url": None,
-                    "description": row[3],
-                    "calories": row[4],
-                    "protein_g": row[5],
-                    "carbs_g": row[6],
-                    "fat_g": row[7],
-                    "fiber_g": float(row[8] or 0),
-                    "sugar_g": float(row[9] or 0),
-                    "sodium_mg": float(row[10] or 0),
-                    "confidence": row[11],
-                    "confirmed": bool(row[12]),
-                }
-            )
-        draft = {"meals": meals}
-        _redis_set_json(_draft_meal_logs_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
-        SESSION_CACHE.setdefault(user_id, {})["meal_logs"] = draft
+        meals = _meal_log_rows_to_dicts(rows)
+        _store_meal_logs_draft(user_id, meals)
+        return meals
+    except Exception:
+        return []
+
+
+async def _alist_meal_logs(user_id: int, conn=None) -> List[Dict[str, Any]]:
+    cached = _meals_from_draft(await _aredis_get_json(_draft_meal_logs_key(user_id)))
+    if cached is not None:
+        return cached
+    try:
+        async with use_async_db_conn(conn) as conn:
+            cur = conn.cursor()
+            await cur.execute(queries.SELECT_MEAL_LOGS_FOR_USER, (user_id,))
+            rows = await cur.fetchall()
+        meals = _meal_log_rows_to_dicts(rows)
+        await _astore_meal_logs_draft(user_id, meals)
         return meals
     except Exception:
         return []
@@ -2191,7 +2141,7 @@ def get_categories():
 
 
 @app.get("/videos")
-def get_videos(
+async def get_videos(
     category: str = Query("all", description="Workout category"),
     limit: int = Query(20, ge=1, le=50, description="Max videos to return")
 ):
@@ -2210,11 +2160,11 @@ def get_videos(
     videos = []
     query = CATEGORY_QUERIES.get(category)
     if query:
-        videos = fetch_videos_by_search(query, limit)
+        videos = await EXTERNAL.run(fetch_videos_by_search, query, limit)
 
     if not videos:
         video_ids = CATEGORY_VIDEOS[category][:limit]  # Limit the video IDs
-        videos = fetch_videos_by_ids(video_ids)
+        videos = await EXTERNAL.run(fetch_videos_by_ids, video_ids)
 
     result = {
         "category": category,
@@ -2276,7 +2226,6 @@ def _resolve_gym_search_origin(
     if user_id is None:
         return lat, lng
 
-    _ensure_profile_schema()
     with get_db_conn() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -2292,7 +2241,7 @@ def _resolve_gym_search_origin(
 
 
 @app.get("/gyms/nearby")
-def get_nearby_gyms(
+async def get_nearby_gyms(
     lat: Optional[float] = Query(None, description="Latitude"),
     lng: Optional[float] = Query(None, description="Longitude"),
     radius: int = Query(5000, ge=100, le=50000, description="Search radius in meters"),
@@ -2300,7 +2249,7 @@ def get_nearby_gyms(
     user_id: Optional[int] = Query(None, description="Optional user ID for saved location fallback"),
 ):
     """Proxy to Google Places Nearby Search for gyms."""
-    lat, lng = _resolve_gym_search_origin(lat, lng, user_id)
+    lat, lng = await run_in_threadpool(_resolve_gym_search_origin, lat, lng, user_id)
     if lat is None or lng is None:
         raise HTTPException(status_code=400, detail="Latitude/longitude missing. Share location first.")
 
@@ -2311,11 +2260,11 @@ def get_nearby_gyms(
     }
     if keyword:
         params["keyword"] = keyword
-    return _places_request("nearbysearch", params)
+    return await EXTERNAL.run(_places_request, "nearbysearch", params)
 
 
 @app.get("/gyms/search")
-def search_gyms(
+async def search_gyms(
     query: str = Query(..., description="Search text"),
     lat: Optional[float] = Query(None, description="Optional latitude"),
     lng: Optional[float] = Query(None, description="Optional longitude"),
@@ -2327,15 +2276,26 @@ def search_gyms(
         raise HTTPException(status_code=400, detail="Query must not be empty")
 
     params: Dict[str, str] = {"query": trimmed}
-    lat, lng = _resolve_gym_search_origin(lat, lng, user_id)
+    lat, lng = await run_in_threadpool(_resolve_gym_search_origin, lat, lng, user_id)
     if lat is not None and lng is not None:
         params["location"] = f"{lat},{lng}"
         params["radius"] = "10000"
-    return _places_request("textsearch", params)
+    return await EXTERNAL.run(_places_request, "textsearch", params)
+
+
+def _fetch_gym_photo(ref: str, maxwidth: int) -> tuple:
+    params = urllib.parse.urlencode(
+        {"maxwidth": str(maxwidth), "photoreference": ref, "key": PLACES_API_KEY}
+    )
+    url = f"https://maps.googleapis.com/maps/api/place/photo?{params}"
+    request = urllib.request.Request(url, headers={"User-Agent": "ai-trainer-backend"})
+    ssl_context = ssl.create_default_context(cafile=certifi.where())
+    with urllib.request.urlopen(request, timeout=10, context=ssl_context) as response:
+        return response.read(), response.headers.get("Content-Type", "image/jpeg")
 
 
 @app.get("/gyms/photo")
-def get_gym_photo(
+async def get_gym_photo(
     ref: str = Query(..., description="Google Places photo reference"),
     maxwidth: int = Query(400, ge=100, le=1600, description="Photo max width"),
 ):
@@ -2343,18 +2303,11 @@ def get_gym_photo(
     if not PLACES_API_KEY:
         raise HTTPException(status_code=500, detail="Missing GOOGLE_PLACES_API_KEY")
 
-    params = urllib.parse.urlencode(
-        {"maxwidth": str(maxwidth), "photoreference": ref, "key": PLACES_API_KEY}
-    )
-    url = f"https://maps.googleapis.com/maps/api/place/photo?{params}"
-    request = urllib.request.Request(url, headers={"User-Agent": "ai-trainer-backend"})
-
     try:
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        with urllib.request.urlopen(request, timeout=10, context=ssl_context) as response:
-            data = response.read()
-            content_type = response.headers.get("Content-Type", "image/jpeg")
+        data, content_type = await EXTERNAL.run(_fetch_gym_photo, ref, maxwidth)
         return Response(content=data, media_type=content_type)
+    except BulkheadFull:
+        raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Photo fetch failed: {e}")
 
@@ -2367,7 +2320,6 @@ def coach_health_check():
 
 @app.post("/auth/signup", response_model=AuthResponse)
 def auth_signup(payload: AuthSignUpRequest):
-    _ensure_auth_schema()
     email = (payload.email or "").strip().lower()
     password = payload.password or ""
     if not email or not password:
@@ -2398,7 +2350,6 @@ def auth_signup(payload: AuthSignUpRequest):
 
 @app.post("/auth/signin", response_model=AuthResponse)
 def auth_signin(payload: AuthSignInRequest):
-    _ensure_auth_schema()
     email = (payload.email or "").strip().lower()
     password = payload.password or ""
     if not email or not password:
@@ -2576,98 +2527,104 @@ def create_checkout_session(payload: BillingCheckoutRequest):
     return BillingCheckoutResponse(checkout_url=checkout_url, session_id=session_id)
 
 
-@app.post("/coach/chat", response_model=CoachChatResponse)
-def coach_chat(payload: CoachChatRequest):
-    """Chat with the AI coach using the agent graph."""
-    if payload.image_base64:
-        try:
-            image_bytes = base64.b64decode(payload.image_base64)
-            analyzed = _analyze_food_image(image_bytes)
-            idem = f"img:{hashlib.sha256(image_bytes).hexdigest()}"
-            _store_meal_log(
-                FoodLogRequest(
-                    user_id=payload.user_id,
-                    food_name=analyzed.food_name,
-                    total_calories=analyzed.total_calories,
-                    protein_g=analyzed.protein_g,
-                    carbs_g=analyzed.carbs_g,
-                    fat_g=analyzed.fat_g,
-                    items=analyzed.items,
-                    logged_at=datetime.now().isoformat(timespec="seconds"),
-                    idempotency_key=idem,
-                )
-            )
-            item_lines = []
-            for item in analyzed.items[:6]:
-                qty = item.amount or "estimated portion"
-                item_lines.append(f"- {item.name}: {qty} (~{item.calories} kcal)")
-            details = "\n".join(item_lines) if item_lines else "- Meal items detected."
-            reply = (
-                "I analyzed your photo and logged your meal.\n"
-                f"Detected: {analyzed.food_name}\n"
-                f"Totals: {analyzed.total_calories} kcal, P {int(analyzed.protein_g)}g, "
-                f"C {int(analyzed.carbs_g)}g, F {int(analyzed.fat_g)}g\n"
-                f"{details}"
+def _coach_image_meal_reply(payload: CoachChatRequest) -> CoachChatResponse:
+    """Log a meal from the attached photo and reply without running the agent."""
+    try:
+        image_bytes = base64.b64decode(payload.image_base64)
+        analyzed = _analyze_food_image(image_bytes)
+        idem = f"img:{hashlib.sha256(image_bytes).hexdigest()}"
+        stored = _store_meal_log(
+            FoodLogRequest(
+                user_id=payload.user_id,
+                food_name=analyzed.food_name,
+                total_calories=analyzed.total_calories,
+                protein_g=analyzed.protein_g,
+                carbs_g=analyzed.carbs_g,
+                fat_g=analyzed.fat_g,
+                items=analyzed.items,
+                logged_at=datetime.now().isoformat(timespec="seconds"),
+                idempotency_key=idem,
             )
-            return CoachChatResponse(reply=reply, thread_id=payload.thread_id or f"user:{payload.user_id}")
-        except Exception as exc:
-            raise HTTPException(status_code=400, detail=f"Image meal analysis failed: {exc}") from exc
+        )
+        item_lines = []
+        for item in analyzed.items[:6]:
+            qty = item.amount or "estimated portion"
+            item_lines.append(f"- {item.name}: {qty} (~{item.calories} kcal)")
+        details = "\n".join(item_lines) if item_lines else "- Meal items detected."
+        headline = "I analyzed your photo and logged your meal." if stored else "This photo's meal was already logged."
+        reply = (
+            f"{headline}\n"
+            f"Detected: {analyzed.food_name}\n"
+            f"Totals: {analyzed.total_calories} kcal, P {int(analyzed.protein_g)}g, "
+            f"C {int(analyzed.carbs_g)}g, F {int(analyzed.fat_g)}g\n"
+            f"{details}"
+        )
+        return CoachChatResponse(reply=reply, thread_id=payload.thread_id or f"user:{payload.user_id}")
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Image meal analysis failed: {exc}") from exc
+
 
+def _prepare_coach_turn(payload: CoachChatRequest):
+    """Record session fields, warm the session cache and build the graph input."""
     graph, preload_fn = _get_agent_graph()
     thread_id = payload.thread_id or f"user:{payload.user_id}"
     config = {"configurable": {"thread_id": thread_id}}
 
+    session_fields: Dict[str, Any] = {"last_user_message": payload.message}
     resolved_agent = _resolve_coach_slug(payload.agent_id)
     if resolved_agent:
-        SESSION_CACHE.setdefault(payload.user_id, {})["agent_id"] = resolved_agent
-    SESSION_CACHE.setdefault(payload.user_id, {})["last_user_message"] = payload.message
+        session_fields["agent_id"] = resolved_agent
     _calendar_trace(
         f"coach_chat incoming user_id={payload.user_id} thread_id={thread_id} token={_mask_token(payload.google_access_token)}"
     )
-    if payload.google_access_token and payload.google_access_token.strip():
-        SESSION_CACHE.setdefault(payload.user_id, {})["google_access_token"] = payload.google_access_token.strip()
+    has_token = bool(payload.google_access_token and payload.google_access_token.strip())
+    if has_token:
+        session_fields["google_access_token"] = payload.google_access_token.strip()
+    remember_session_fields(payload.user_id, **session_fields)
+    if has_token:
         _calendar_trace(
             f"coach_chat stored token in SESSION_CACHE user_id={payload.user_id} token={_mask_token(payload.google_access_token)}"
         )
     else:
-        cached = SESSION_CACHE.get(payload.user_id, {}).get("google_access_token")
+        cached = session_field(payload.user_id, "google_access_token")
         _calendar_trace(
             f"coach_chat payload token missing user_id={payload.user_id}, cached={_mask_token(cached)}"
         )
 
     if thread_id not in _AGENT_PRELOADED:
         preload_fn(payload.user_id)
-        _AGENT_PRELOADED.add(thread_id)
+        _AGENT_PRELOADED[thread_id] = True
 
-    try:
-        message = payload.message
-        if payload.image_base64:
-            try:
-                encoded = _strip_data_url_prefix(payload.image_base64)
-                image_bytes = base64.b64decode(encoded)
-                analysis = _summarize_image(image_bytes, payload.message)
-                if analysis:
-                    if message:
-                        message = f"{message}\n\nImage analysis: {analysis}"
-                    else:
-                        message = f"Image analysis: {analysis}"
-            except Exception as exc:
-                raise HTTPException(status_code=400, detail=f"Invalid image data: {exc}") from exc
-
-        state = graph.invoke(
-            {
-                "messages": [HumanMessage(content=message)],
-                "user_id": payload.user_id,
-            },
-            config,
-        )
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Coach error: {exc}") from exc
+    message = payload.message
+    if payload.image_base64:
+        try:
+            encoded = _strip_data_url_prefix(payload.image_base64)
+            image_bytes = base64.b64decode(encoded)
+            analysis = _summarize_image(image_bytes, payload.message)
+            if analysis:
+                if message:
+                    message = f"{message}\n\nImage analysis: {analysis}"
+                else:
+                    message = f"Image analysis: {analysis}"
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid image data: {exc}") from exc
+
+    graph_input = {
+        "messages": [HumanMessage(content=message)],
+        "user_id": payload.user_id,
+    }
+    return graph, config, thread_id, graph_input
 
-    graph_state = graph.get_state(config)
+
+def _finish_coach_turn(
+    payload: CoachChatRequest,
+    graph_state,
+    thread_id: str,
+    state: Dict[str, Any],
+) -> CoachChatResponse:
+    """Apply the calendar guard and the plan-approval interrupt to a finished turn."""
     reply = state["messages"][-1].content if state.get("messages") else ""
-    session = SESSION_CACHE.get(payload.user_id, {})
-    has_calendar_auth = bool(str(session.get("google_access_token") or "").strip())
+    has_calendar_auth = bool(str(session_field(payload.user_id, "google_access_token") or "").strip())
     is_calendar_request = _looks_like_calendar_request(payload.message)
 
     if is_calendar_request and not has_calendar_auth:
@@ -2698,6 +2655,100 @@ def coach_chat(payload: CoachChatRequest):
     return CoachChatResponse(reply=reply, thread_id=thread_id)
 
 
+@app.post("/coach/chat", response_model=CoachChatResponse)
+async def coach_chat(payload: CoachChatRequest):
+    """Chat with the AI coach using the agent graph."""
+    if payload.image_base64:
+        return await VISION.run(_coach_image_meal_reply, payload)
+
+    graph, config, thread_id, graph_input = await run_in_threadpool(_prepare_coach_turn, payload)
+    try:
+        async with LLM.slot():
+            state = await graph.ainvoke(graph_input, config)
+        graph_state = await graph.aget_state(config)
+    except BulkheadFull:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Coach error: {exc}") from exc
+    return await run_in_threadpool(_finish_coach_turn, payload, graph_state, thread_id, state)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _coach_stream_events(
+    payload: CoachChatRequest,
+    graph,
+    config: Dict[str, Any],
+    thread_id: str,
+    graph_input: Dict[str, Any],
+    release_slot: Callable[..., None],
+) -> AsyncIterator[str]:
+    # Calendar replies may be swapped for a guard message afterwards, so their
+    # tokens are held back and only the final reply is sent.
+    stream_tokens = not _looks_like_calendar_request(payload.message)
+    try:
+        try:
+            async for mode, chunk in graph.astream(graph_input, config, stream_mode=["messages", "updates"]):
+                if mode == "messages":
+                    message, metadata = chunk
+                    if (
+                        stream_tokens
+                        and metadata.get("langgraph_node") == "assistant"
+                        and isinstance(message, AIMessageChunk)
+                        and isinstance(message.content, str)
+                        and message.content
+                    ):
+                        yield _sse("token", {"text": message.content})
+                    continue
+                for node, update in (chunk or {}).items():
+                    if not isinstance(update, dict):
+                        continue  # e.g. the "__interrupt__" marker before human_feedback
+                    for message in update.get("messages") or []:
+                        if node == "assistant" and isinstance(message, AIMessage):
+                            for call in message.tool_calls or []:
+                                yield _sse("tool_start", {"name": call.get("name"), "id": call.get("id")})
+                        elif node == "tools" and isinstance(message, ToolMessage):
+                            yield _sse("tool_end", {"name": message.name, "id": message.tool_call_id})
+        except BaseException:
+            release_slot(True)
+            raise
+        release_slot()
+        graph_state = await graph.aget_state(config)
+        response = await run_in_threadpool(_finish_coach_turn, payload, graph_state, thread_id, graph_state.values)
+    except Exception as exc:
+        yield _sse("error", {"detail": f"Coach error: {exc}"})
+        return
+    yield _sse("done", response.model_dump())
+
+
+@app.post("/coach/chat/stream")
+async def coach_chat_stream(payload: CoachChatRequest):
+    """Server-Sent Events variant of /coach/chat.
+
+    Emits ``token`` events with assistant text as it is generated,
+    ``tool_start``/``tool_end`` around tool rounds, then one ``done`` event
+    carrying the same body /coach/chat would return (its ``reply`` is
+    authoritative), or ``error``.
+    """
+    if payload.image_base64:
+        response = await VISION.run(_coach_image_meal_reply, payload)
+        return StreamingResponse(iter([_sse("done", response.model_dump())]), media_type="text/event-stream")
+
+    graph, config, thread_id, graph_input = await run_in_threadpool(_prepare_coach_turn, payload)
+    # Take the LLM slot before the response starts so a full bulkhead is a
+    # 503 rather than an SSE error. The background task frees it if the
+    # stream is never consumed; release is idempotent.
+    release_slot = await LLM.acquire()
+    return StreamingResponse(
+        _coach_stream_events(payload, graph, config, thread_id, graph_input, release_slot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release_slot),
+    )
+
+
 def _ashley_extract_recommendation(reply: str) -> tuple:
     """Parse [COACH_RECOMMENDATION: slug] from Ashley reply. Returns (clean_reply, slug or None)."""
     import re
@@ -2710,14 +2761,31 @@ def _ashley_extract_recommendation(reply: str) -> tuple:
     return reply, None
 
 
+def _get_ashley_llm():
+    global _ASHLEY_LLM
+    if _ASHLEY_LLM is None:
+        from langchain_openai import ChatOpenAI
+
+        _ASHLEY_LLM = ChatOpenAI(model="gpt-4o", temperature=0.7, max_retries=1, request_timeout=30)
+    return _ASHLEY_LLM
+
+
+def _get_onboarding_extract_llm():
+    global _ONBOARDING_EXTRACT_LLM
+    if _ONBOARDING_EXTRACT_LLM is None:
+        from langchain_openai import ChatOpenAI
+
+        _ONBOARDING_EXTRACT_LLM = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_retries=1)
+    return _ONBOARDING_EXTRACT_LLM
+
+
 @app.post("/api/ashley/chat", response_model=AshleyChatResponse)
-def ashley_chat(payload: AshleyChatRequest):
+async def ashley_chat(payload: AshleyChatRequest):
     """Chat with Ashley (receptionist) during onboarding. Returns reply and optional coach recommendation."""
-    from langchain_openai import ChatOpenAI
     from agent.prompts.system_prompt import get_ashley_system_prompt
 
     thread_id = payload.thread_id or f"ashley:{payload.user_id}"
-    llm = ChatOpenAI(model="gpt-4o", temperature=0.7, max_retries=1, request_timeout=30)
+    llm = _get_ashley_llm()
 
     messages: List = [SystemMessage(content=get_ashley_system_prompt())]
 
@@ -2733,8 +2801,11 @@ def ashley_chat(payload: AshleyChatRequest):
     messages.append(HumanMessage(content=payload.message))
 
     try:
-        response = llm.invoke(messages)
+        async with LLM.slot():
+            response = await llm.ainvoke(messages)
         reply = response.content if hasattr(response, "content") else str(response)
+    except BulkheadFull:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Ashley chat error: {exc}") from exc
 
@@ -2753,9 +2824,8 @@ def ashley_chat(payload: AshleyChatRequest):
     )
 
 
-def _extract_onboarding_from_ashley_conversation(messages_history: List[Dict[str, str]]) -> Dict[str, Any]:
+async def _extract_onboarding_from_ashley_conversation(messages_history: List[Dict[str, str]]) -> Dict[str, Any]:
     """Extract structured onboarding fields from Ashley chat history."""
-    from langchain_openai import ChatOpenAI
     import json
 
     conv_text = "\n".join(
@@ -2791,9 +2861,9 @@ Conversation:
     prompt += conv_text
     prompt += "\n\nReturn ONLY valid JSON, no markdown."
 
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_retries=1)
     try:
-        response = llm.invoke([HumanMessage(content=prompt)])
+        async with LLM.slot():
+            response = await _get_onboarding_extract_llm().ainvoke([HumanMessage(content=prompt)])
         content = response.content if hasattr(response, "content") else str(response)
         # Strip markdown code blocks if present
         if "```" in content:
@@ -2801,26 +2871,28 @@ Conversation:
         data = json.loads(content)
         if isinstance(data, dict):
             return data
+    except BulkheadFull:
+        raise
     except Exception:
         pass
     return {}
 
 
 @app.post("/api/ashley/complete-onboarding")
-def ashley_complete_onboarding(payload: AshleyCompleteOnboardingRequest):
+async def ashley_complete_onboarding(payload: AshleyCompleteOnboardingRequest):
     """Complete onboarding using Ashley's conversation. Extracts structured data and creates plan."""
     user_id = payload.user_id
-    extracted = _extract_onboarding_from_ashley_conversation(payload.messages_history)
+    extracted = await _extract_onboarding_from_ashley_conversation(payload.messages_history)
 
     # Resolve coach
     trainer_id: Optional[int] = None
     if payload.coach_id:
         trainer_id = payload.coach_id
     elif payload.coach_slug:
-        with get_db_conn() as conn:
+        async with get_async_db_conn() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT id FROM coaches WHERE slug = ? LIMIT 1", (payload.coach_slug,))
-            row = cur.fetchone()
+            await cur.execute("SELECT id FROM coaches WHERE slug = ? LIMIT 1", (payload.coach_slug,))
+            row = await cur.fetchone()
         if row:
             trainer_id = int(row[0])
 
@@ -2829,13 +2901,13 @@ def ashley_complete_onboarding(payload: AshleyCompleteOnboardingRequest):
 
     # Fetch coach for storyline/personality
     storyline, personality, voice = None, None, None
-    with get_db_conn() as conn:
+    async with get_async_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
+        await cur.execute(
             "SELECT philosophy, personality FROM coaches WHERE id = ? LIMIT 1",
             (trainer_id,),
         )
-        row = cur.fetchone()
+        row = await cur.fetchone()
     if row:
         storyline = str(row[0]) if row[0] else None
         personality = str(row[1]) if row[1] else None
@@ -2881,24 +2953,27 @@ def ashley_complete_onboarding(payload: AshleyCompleteOnboardingRequest):
         preferred_workout_time=extracted.get("preferred_workout_time"),
         menstrual_cycle_notes=extracted.get("menstrual_cycle_notes"),
     )
-    return complete_onboarding(payload_obj)
+    # Plan generation is sync DB/LLM work; keep it off the event loop.
+    return await run_in_threadpool(complete_onboarding, payload_obj)
 
 
 @app.post("/coach/feedback", response_model=CoachFeedbackResponse)
-def coach_feedback(payload: CoachFeedbackRequest):
+async def coach_feedback(payload: CoachFeedbackRequest):
     """Submit human feedback for a proposed plan."""
-    graph, _ = _get_agent_graph()
+    graph, _ = await run_in_threadpool(_get_agent_graph)
     config = {"configurable": {"thread_id": payload.thread_id}}
     try:
-        proposed_plan = _PENDING_PLANS.get(payload.thread_id)
-        graph.update_state(
+        proposed_plan = await run_in_threadpool(_PENDING_PLANS.get, payload.thread_id)
+        await graph.aupdate_state(
             config,
             {"approve_plan": payload.approve_plan, "proposed_plan": proposed_plan},
             as_node="human_feedback",
         )
-        if payload.thread_id in _PENDING_PLANS:
-            _PENDING_PLANS.pop(payload.thread_id, None)
-        state = graph.invoke(None, config)
+        await run_in_threadpool(_PENDING_PLANS.__delitem__, payload.thread_id)
+        async with LLM.slot():
+            state = await graph.ainvoke(None, config)
+    except BulkheadFull:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Coach feedback error: {exc}") from exc
     reply = state["messages"][-1].content if state.get("messages") else ""
@@ -2952,13 +3027,20 @@ async def scan_food(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Missing image file")
     image = await file.read()
     try:
-        return _analyze_food_image(image)
+        return await VISION.run(_analyze_food_image, image)
+    except BulkheadFull:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Failed to analyze image: {exc}") from exc
 
 
 @app.post("/recipes/suggest", response_model=RecipeSuggestResponse)
-def suggest_recipes(payload: RecipeSuggestRequest):
+async def suggest_recipes(payload: RecipeSuggestRequest):
+    bulkhead = VISION if payload.image_base64 else LLM
+    return await bulkhead.run(_suggest_recipes, payload)
+
+
+def _suggest_recipes(payload: RecipeSuggestRequest) -> RecipeSuggestResponse:
     ingredients_text = (payload.ingredients or "").strip()
     if not ingredients_text and not payload.image_base64:
         raise HTTPException(status_code=400, detail="Provide ingredients text or an image.")
@@ -3081,7 +3163,7 @@ def suggest_recipes(payload: RecipeSuggestRequest):
 
 
 @app.post("/recipes/search", response_model=RecipeSearchResponse)
-def search_recipes(payload: RecipeSearchRequest):
+async def search_recipes(payload: RecipeSearchRequest):
     trimmed = payload.query.strip()
     if not trimmed:
         raise HTTPException(status_code=400, detail="Query must not be empty")
@@ -3102,8 +3184,8 @@ def search_recipes(payload: RecipeSearchRequest):
     full_query = f"healthy recipe {full_query}"
 
     try:
-        results = _tavily_search(full_query, payload.max_results)
-    except HTTPException:
+        results = await EXTERNAL.run(_tavily_search, full_query, payload.max_results)
+    except (HTTPException, BulkheadFull):
         raise
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Tavily search failed: {exc}") from exc
@@ -3250,16 +3332,10 @@ def log_workout_session_direct(payload: WorkoutSessionLogRequest):
             )
             conn.commit()
 
-        for cache_key in (
-            "workout:latest",
-            f"session_hydration:{payload.user_id}",
-            f"user:{payload.user_id}:progress",
-            f"user:{payload.user_id}:meal_logs",
-        ):
-            try:
-                _redis_delete(cache_key)
-            except Exception:
-                pass
+        try:
+            invalidate(payload.user_id, "workouts", day=session_date)
+        except Exception:
+            pass
 
         _award_points(payload.user_id, 5, f"workout_log:{datetime.now().isoformat(timespec='seconds')}")
         _apply_daily_checklist_completion_bonus(payload.user_id, session_date)
@@ -3278,40 +3354,39 @@ async def transcribe_audio(file: UploadFile = File(...)):
     if not data:
         raise HTTPException(status_code=400, detail="Empty audio file")
     try:
-        response = openai_client.audio.transcriptions.create(
+        response = await AUDIO.run(
+            openai_client.audio.transcriptions.create,
             model="gpt-4o-mini-transcribe",
             file=(file.filename or "audio.m4a", data, file.content_type or "audio/m4a"),
         )
         return {"text": response.text}
+    except BulkheadFull:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {exc}") from exc
 
 
 @app.get("/food/intake", response_model=DailyIntakeResponse)
-def get_daily_intake(user_id: int, day: Optional[str] = None):
+async def get_daily_intake(user_id: int, day: Optional[str] = None):
     """Return daily calorie intake totals for a user."""
-    _ensure_meal_log_schema()
     target_day = day or date.today().isoformat()
     cache_key = f"daily_intake:{user_id}:{target_day}"
-    cached = _redis_get_json(cache_key)
+    cached = await _aredis_get_json(cache_key)
     if isinstance(cached, dict):
         try:
             return DailyIntakeResponse(**cached)
         except Exception:
             pass
+    # Read generations before the query so a meal logged mid-request cannot
+    # be overwritten by these pre-insert totals for the whole TTL.
+    tags = cache_tags(user_id, "meals", "plan", day=target_day)
+    generations = await _aredis_tag_generations(tags)
     start = f"{target_day}T00:00:00"
     end = f"{target_day}T23:59:59"
-    with get_db_conn() as conn:
+    async with get_async_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT calories, protein_g, carbs_g, fat_g, fiber_g, sugar_g, sodium_mg
-            FROM meal_logs
-            WHERE user_id = ? AND logged_at BETWEEN ? AND ?
-            """,
-            (user_id, start, end),
-        )
-        rows = cur.fetchall()
+        await cur.execute(queries.SELECT_DAILY_MEAL_TOTALS, (user_id, start, end))
+        rows = await cur.fetchall()
     total_calories = sum(row[0] for row in rows)
     total_protein = sum(row[1] for row in rows)
     total_carbs = sum(row[2] for row in rows)
@@ -3321,9 +3396,9 @@ def get_daily_intake(user_id: int, day: Optional[str] = None):
     total_sodium = sum(float(row[6] or 0) for row in rows)
     daily_target = None
     try:
-        from agent.tools.plan_tools import _get_active_plan_bundle_data
+        from agent.tools.plan_tools import _aget_active_plan_bundle_data
 
-        bundle = _get_active_plan_bundle_data(user_id, allow_db_fallback=True)
+        bundle = await _aget_active_plan_bundle_data(user_id, allow_db_fallback=True)
         plan_row = bundle.get("plan")
         if isinstance(plan_row, tuple) and len(plan_row) >= 4:
             daily_target = plan_row[3]
@@ -3346,17 +3421,16 @@ def get_daily_intake(user_id: int, day: Optional[str] = None):
         meals_count=len(rows),
         daily_calorie_target=daily_target,
     )
-    _redis_set_json(cache_key, response.model_dump(), ttl_seconds=180)
+    await _aredis_set_json_if_current(cache_key, response.model_dump(), CACHE_TTL_LONG, tags, generations)
     return response
 
 
 @app.get("/food/logs", response_model=DailyMealLogsResponse)
-def get_food_logs(user_id: int, day: Optional[str] = None):
+async def get_food_logs(user_id: int, day: Optional[str] = None):
     """Return logged meals for a specific day."""
-    _ensure_meal_log_schema()
     target_day = day or date.today().isoformat()
     bucket_key = f"user:{user_id}:meal_logs"
-    cached_bucket = _redis_get_json(bucket_key)
+    cached_bucket = await _aredis_get_json(bucket_key)
     if isinstance(cached_bucket, dict):
         cached_day = cached_bucket.get(target_day)
         if isinstance(cached_day, dict):
@@ -3364,20 +3438,14 @@ def get_food_logs(user_id: int, day: Optional[str] = None):
                 return DailyMealLogsResponse(**cached_day)
             except Exception:
                 pass
+    tags = cache_tags(user_id, "meals")
+    generations = await _aredis_tag_generations(tags)
     start = f"{target_day}T00:00:00"
     end = f"{target_day}T23:59:59"
-    with get_db_conn() as conn:
+    async with get_async_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT description, calories, protein_g, carbs_g, fat_g, fiber_g, sugar_g, sodium_mg, logged_at
-            FROM meal_logs
-            WHERE user_id = ? AND logged_at BETWEEN ? AND ?
-            ORDER BY logged_at DESC
-            """,
-            (user_id, start, end),
-        )
-        rows = cur.fetchall()
+        await cur.execute(queries.SELECT_DAILY_MEAL_LOGS, (user_id, start, end))
+        rows = await cur.fetchall()
     meals = [
         MealLogItem(
             name=row[0] or "Meal",
@@ -3398,17 +3466,17 @@ def get_food_logs(user_id: int, day: Optional[str] = None):
     if len(bucket) > 14:
         for key in sorted(bucket.keys())[:-14]:
             bucket.pop(key, None)
-    _redis_set_json(bucket_key, bucket, ttl_seconds=600)
+    await _aredis_set_json_if_current(bucket_key, bucket, CACHE_TTL_LONG, tags, generations)
     return response
 
 
 @app.get("/plans/today", response_model=PlanDayResponse)
-def get_today_plan(user_id: int, day: Optional[str] = None):
+async def get_today_plan(user_id: int, day: Optional[str] = None):
     """Return the active plan day for a specific date (defaults to today)."""
-    from agent.tools.plan_tools import _get_active_plan_bundle_data
+    from agent.tools.plan_tools import _aget_active_plan_bundle_data
 
     target_day = day or date.today().isoformat()
-    bundle = _get_active_plan_bundle_data(user_id, allow_db_fallback=True)
+    bundle = await _aget_active_plan_bundle_data(user_id, allow_db_fallback=True)
     plan_days = bundle.get("plan_days", []) if isinstance(bundle, dict) else []
     day_data = next((d for d in plan_days if d.get("date") == target_day), None)
     if not day_data:
@@ -3433,13 +3501,11 @@ def get_today_plan(user_id: int, day: Optional[str] = None):
 @app.get("/api/profile")
 def get_profile(user_id: int):
     """Return user profile and preferences."""
-    _ensure_profile_schema()
     return _load_user_profile(user_id)
 
 
 @app.get("/api/coaches", response_model=List[CoachItemResponse])
 def get_coaches():
-    _ensure_coach_schema()
     with get_db_conn() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -3485,8 +3551,6 @@ def get_coaches():
 
 @app.put("/api/profile")
 def update_profile(payload: ProfileUpdateRequest):
-    _ensure_profile_schema()
-    _ensure_coach_schema()
     user_fields: Dict[str, Any] = {}
     weight_updated = False
     if payload.name is not None:
@@ -3590,7 +3654,7 @@ def update_profile(payload: ProfileUpdateRequest):
         conn.commit()
 
     if weight_updated:
-        _invalidate_user_activity_cache(payload.user_id, day=date.today().isoformat())
+        invalidate(payload.user_id, "profile", day=date.today().isoformat())
     _refresh_profile_cache(payload.user_id)
     return _load_user_profile(payload.user_id)
 
@@ -3604,8 +3668,6 @@ def change_user_coach(payload: CoachChangeRequest) -> CoachChangeResponse:
     """
     Change the user's assigned coach
     """
-    _ensure_profile_schema()
-    _ensure_coach_schema()
 
     with get_db_conn() as conn:
         cur = conn.cursor()
@@ -3651,7 +3713,7 @@ def change_user_coach(payload: CoachChangeRequest) -> CoachChangeResponse:
 
     # Refresh caches
     _refresh_profile_cache(payload.user_id)
-    _redis_delete(f"session_hydration:{payload.user_id}")
+    invalidate(payload.user_id, "profile")
 
     return CoachChangeResponse(
         success=True,
@@ -3662,7 +3724,7 @@ def change_user_coach(payload: CoachChangeRequest) -> CoachChangeResponse:
 
 
 @app.get("/api/voice")
-def generate_voice(
+async def generate_voice(
     text: str = Query(..., min_length=1),
     voice: str = Query("alloy"),
     instructions: Optional[str] = Query(None),
@@ -3677,14 +3739,21 @@ def generate_voice(
         }
         if instructions:
             args["instructions"] = instructions
-        response = client.audio.speech.create(**args)
+        response = await AUDIO.run(client.audio.speech.create, **args)
         return Response(content=response.content, media_type="audio/mpeg")
+    except BulkheadFull:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"TTS failed: {exc}") from exc
 
 
+def _heygen_tts(req: urllib.request.Request) -> Dict[str, Any]:
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
 @app.post("/api/voice/heygen")
-def generate_voice_heygen(payload: HeyGenTTSRequest):
+async def generate_voice_heygen(payload: HeyGenTTSRequest):
     """Generate TTS via HeyGen Starfish and return audio URL metadata."""
     if not HEYGEN_API_KEY:
         raise HTTPException(status_code=500, detail="HEYGEN_API_KEY is not configured")
@@ -3718,9 +3787,9 @@ def generate_voice_heygen(payload: HeyGenTTSRequest):
         method="POST",
     )
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            payload_raw = resp.read().decode("utf-8")
-            parsed = json.loads(payload_raw)
+        parsed = await AUDIO.run(_heygen_tts, req)
+    except BulkheadFull:
+        raise
     except urllib.error.HTTPError as exc:
         detail = exc.read().decode("utf-8", errors="ignore")
         raise HTTPException(status_code=502, detail=f"HeyGen TTS HTTPError: {detail or exc.reason}") from exc
@@ -3738,6 +3807,19 @@ def generate_voice_heygen(payload: HeyGenTTSRequest):
     }
 
 
+def _whisper_transcribe(client: OpenAI, audio_bytes: bytes, suffix: str):
+    # The temp file only exists on the bulkhead thread, so a rejected
+    # request never leaves one behind.
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as handle:
+        handle.write(audio_bytes)
+        temp_path = handle.name
+    try:
+        with open(temp_path, "rb") as audio_file:
+            return client.audio.transcriptions.create(model="whisper-1", file=audio_file)
+    finally:
+        os.remove(temp_path)
+
+
 @app.post("/api/voice-to-text")
 async def voice_to_text(
     audio: UploadFile = File(...),
@@ -3748,16 +3830,10 @@ async def voice_to_text(
         client = _get_openai_client()
         audio_bytes = await audio.read()
         suffix = os.path.splitext(audio.filename or "")[1] or ".m4a"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as handle:
-            handle.write(audio_bytes)
-            temp_path = handle.name
-        with open(temp_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-            )
-        os.remove(temp_path)
+        transcript = await AUDIO.run(_whisper_transcribe, client, audio_bytes, suffix)
         return {"transcribed_text": transcript.text, "trainer_id": trainer_id}
+    except BulkheadFull:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Voice-to-text failed: {exc}") from exc
 
@@ -3801,24 +3877,53 @@ def get_user_id(email: str):
 
 
 @app.get("/api/progress")
-def get_progress(user_id: int):
+async def get_progress(user_id: int):
     """Return progress data (checkins, plan, meals, workouts)."""
-    try:
-        from agent.tools.plan_tools import _get_active_plan_bundle_data
+    today = date.today().isoformat()
+    return await aswr_get(
+        f"user:{user_id}:progress:{today}",
+        lambda: _acompute_progress(user_id, today),
+        soft_ttl=CACHE_TTL_SWR_SOFT,
+        hard_ttl=CACHE_TTL_SWR_HARD,
+        tags=cache_tags(user_id, "meals", "workouts", "checkins", "plan", day=today),
+    )
 
-        plan_bundle = _get_active_plan_bundle_data(user_id, allow_db_fallback=True)
-        plan = plan_bundle.get("plan")
-        checkpoints = plan_bundle.get("checkpoints", [])
-    except Exception:
+
+async def _acompute_progress(user_id: int, today: str) -> Dict[str, Any]:
+    from agent.tools.plan_tools import _aget_active_plan_bundle_data
+
+    async def _load_history() -> tuple:
+        # One pool connection for all history reads: a connection runs its
+        # statements one at a time anyway, and fanning out here would let a
+        # single hydrate hold a large share of DB_ASYNC_POOL_MAX.
+        async with get_async_db_conn() as conn:
+            checkins = await _alist_checkins(user_id, conn=conn)
+            meals = await _alist_meal_logs(user_id, conn=conn)
+            workouts = await _alist_workout_sessions(user_id, conn=conn)
+            daily_checklist = await _adaily_checklist_status(user_id, today, conn=conn)
+        return checkins, meals, workouts, daily_checklist
+
+    plan_bundle, history = await asyncio.gather(
+        _aget_active_plan_bundle_data(user_id, allow_db_fallback=True),
+        _load_history(),
+        return_exceptions=True,
+    )
+    if isinstance(history, BaseException):
+        raise history
+    checkins, meals, workouts, daily_checklist = history
+    if isinstance(plan_bundle, BaseException):
         plan = None
         checkpoints = []
+    else:
+        plan = plan_bundle.get("plan")
+        checkpoints = plan_bundle.get("checkpoints", [])
     return {
-        "checkins": _list_checkins(user_id),
+        "checkins": checkins,
         "checkpoints": checkpoints,
         "plan": plan,
-        "meals": _list_meal_logs(user_id),
-        "workouts": _list_workout_sessions(user_id),
-        "daily_checklist": _daily_checklist_status(user_id, date.today().isoformat()),
+        "meals": meals,
+        "workouts": workouts,
+        "daily_checklist": daily_checklist,
     }
 
 
@@ -3889,13 +3994,22 @@ def get_health_activity_impact(
     end_day: Optional[str] = None,
     days: int = 7,
 ):
-    from agent.tools.activity_utils import _estimate_workout_calories
-
     range_end = _coerce_to_date(end_day) or date.today()
     default_start = range_end - timedelta(days=max(1, min(31, int(days))) - 1)
     range_start = _coerce_to_date(start_day) or default_start
     if range_start > range_end:
         range_start, range_end = range_end, range_start
+    return swr_get(
+        f"health_impact:{user_id}:{range_start.isoformat()}:{range_end.isoformat()}",
+        lambda: _compute_health_activity_impact(user_id, range_start, range_end).model_dump(),
+        soft_ttl=CACHE_TTL_SWR_SOFT,
+        hard_ttl=CACHE_TTL_SWR_HARD,
+        tags=cache_tags(user_id, "health_activity", "meals", "plan", "profile"),
+    )
+
+
+def _compute_health_activity_impact(user_id: int, range_start: date, range_end: date) -> HealthActivityImpactResponse:
+    from agent.tools.activity_utils import _estimate_workout_calories
 
     day_cursor = range_start
     day_keys: List[str] = []
@@ -4025,7 +4139,6 @@ def get_gamification(user_id: int):
 
 @app.post("/api/gamification/app-open", response_model=AppOpenStreakResponse)
 def gamification_app_open(user_id: int):
-    _ensure_app_open_schema()
     now = datetime.now()
     inactivity_hours = 0.0
     freeze_prompt_required = False
@@ -4094,7 +4207,6 @@ def gamification_streak_decision(payload: StreakDecisionRequest):
         message = "Streak reset. You can build it back starting today."
 
     refreshed = _gamification_summary(payload.user_id)
-    _ensure_app_open_schema()
     with get_db_conn() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -4125,15 +4237,26 @@ def use_freeze_streak(payload: UseFreezeRequest):
     return _gamification_summary(payload.user_id)
 
 
+def _cached_plan_status(user_id: int) -> Any:
+    """compute_plan_status for the home-screen endpoints, served stale-while-revalidate."""
+    from agent.tools.plan_tools import compute_plan_status
+
+    today = date.today().isoformat()
+    return swr_get(
+        f"plan_status:{user_id}:{today}",
+        lambda: _safe_parse_json(compute_plan_status.func(user_id)),
+        soft_ttl=CACHE_TTL_SWR_SOFT,
+        hard_ttl=CACHE_TTL_SWR_HARD,
+        tags=cache_tags(user_id, "meals", "workouts", "checkins", "plan"),
+    )
+
+
 @app.get("/api/coach-suggestion")
 def get_coach_suggestion(user_id: int):
     """Return a coach suggestion derived from plan status."""
     suggestion = None
     try:
-        from agent.tools.plan_tools import compute_plan_status
-
-        status_raw = compute_plan_status.func(user_id)
-        payload = _safe_parse_json(status_raw)
+        payload = _cached_plan_status(user_id)
         if payload:
             suggestion = _derive_suggestion_from_status(payload)
     except Exception:
@@ -4144,11 +4267,19 @@ def get_coach_suggestion(user_id: int):
 @app.get("/api/status-summary")
 def get_status_summary(user_id: int):
     """Return end-of-day style status summary + actionable suggestions."""
-    try:
-        from agent.tools.plan_tools import compute_plan_status
+    today = date.today().isoformat()
+    return swr_get(
+        f"status_summary:{user_id}:{today}",
+        lambda: _compute_status_summary(user_id),
+        soft_ttl=CACHE_TTL_SWR_SOFT,
+        hard_ttl=CACHE_TTL_SWR_HARD,
+        tags=cache_tags(user_id, "meals", "workouts", "checkins", "plan", "health_activity"),
+    )
 
-        status_raw = compute_plan_status.func(user_id)
-        status = _safe_parse_json(status_raw)
+
+def _compute_status_summary(user_id: int) -> Dict[str, Any]:
+    try:
+        status = _cached_plan_status(user_id)
     except Exception:
         status = {"explanation": "No status available.", "status": "limited"}
 
@@ -4336,19 +4467,25 @@ def delete_reminder_api(reminder_id: int, user_id: int):
 
 
 @app.get("/api/session/hydrate", response_model=SessionHydrationResponse)
-def hydrate_session(user_id: int, day: Optional[str] = None):
+async def hydrate_session(user_id: int, day: Optional[str] = None):
     target_day = day or date.today().isoformat()
-    _ensure_daily_coach_checkin_reminder(user_id)
-    profile = _load_user_profile(user_id)
-    progress = get_progress(user_id)
-    daily_intake = get_daily_intake(user_id, target_day)
-    gamification = _gamification_summary(user_id)
-    coach_suggestion = get_coach_suggestion(user_id)
-    today_plan: Optional[PlanDayResponse] = None
-    try:
-        today_plan = get_today_plan(user_id, target_day)
-    except HTTPException:
+    await run_in_threadpool(_ensure_daily_coach_checkin_reminder, user_id)
+    profile, progress, daily_intake, gamification, coach_suggestion, today_plan = await asyncio.gather(
+        run_in_threadpool(_load_user_profile, user_id),
+        get_progress(user_id),
+        get_daily_intake(user_id, target_day),
+        run_in_threadpool(_gamification_summary, user_id),
+        run_in_threadpool(get_coach_suggestion, user_id),
+        get_today_plan(user_id, target_day),
+        return_exceptions=True,
+    )
+    for result in (profile, progress, daily_intake, gamification, coach_suggestion):
+        if isinstance(result, BaseException):
+            raise result
+    if isinstance(today_plan, HTTPException):
         today_plan = None
+    elif isinstance(today_plan, BaseException):
+        raise today_plan
     return SessionHydrationResponse(
         user_id=user_id,
         date=target_day,
@@ -4373,6 +4510,18 @@ def health_check():
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@app.get("/api/health/session-cache")
+def session_cache_stats():
+    """Size, hit and eviction counters for the in-process session stores."""
+    return {"stores": [store.stats() for store in (SESSION_CACHE, _AGENT_PRELOADED, _PENDING_PLANS)]}
+
+
+@app.get("/api/health/bulkheads")
+async def bulkhead_stats():
+    """Concurrency, queue depth and wait times per workload class."""
+    return {"bulkheads": [DEFAULT_POOL.stats()] + [bulkhead.stats() for bulkhead in BULKHEADS]}
+
+
 def _activate_plan_from_data(user_id: int, plan_data: dict[str, Any]) -> None:
     cache_days = []
     for day in plan_data["plan_days"]:
@@ -4430,39 +4579,36 @@ def _activate_plan_from_data(user_id: int, plan_data: dict[str, Any]) -> None:
             ),
         )
         template_id = cur.fetchone()[0]
-        for day_index in range(cycle_length):
-            day = plan_data["plan_days"][day_index]
-            workout_json = json.dumps({"label": day["workout"]})
-            calorie_delta = day["calorie_target"] - plan_data["calorie_target"]
-            cur.execute(
-                """
-                INSERT INTO plan_template_days (
-                    template_id, day_index, workout_json, calorie_delta, notes
-                ) VALUES (?, ?, ?, ?, ?)
-                """,
+        bulk_insert(
+            cur,
+            "plan_template_days",
+            ("template_id", "day_index", "workout_json", "calorie_delta", "notes"),
+            [
                 (
                     template_id,
                     day_index,
-                    workout_json,
-                    calorie_delta,
+                    json.dumps({"label": day["workout"]}),
+                    day["calorie_target"] - plan_data["calorie_target"],
                     None,
-                ),
-            )
-        for checkpoint in plan_data.get("checkpoints", []):
-            cur.execute(
-                """
-                INSERT INTO plan_checkpoints (
-                    template_id, checkpoint_week, expected_weight_kg, min_weight_kg, max_weight_kg
-                ) VALUES (?, ?, ?, ?, ?)
-                """,
+                )
+                for day_index, day in enumerate(plan_data["plan_days"][:cycle_length])
+            ],
+        )
+        bulk_insert(
+            cur,
+            "plan_checkpoints",
+            ("template_id", "checkpoint_week", "expected_weight_kg", "min_weight_kg", "max_weight_kg"),
+            [
                 (
                     template_id,
                     checkpoint["week"],
                     checkpoint["expected_weight_kg"],
                     checkpoint["min_weight_kg"],
                     checkpoint["max_weight_kg"],
-                ),
-            )
+                )
+                for checkpoint in plan_data.get("checkpoints", [])
+            ],
+        )
         conn.commit()
 
 
@@ -4504,52 +4650,37 @@ def _seed_calendar_blocks_for_plan(user_id: int, plan_data: dict[str, Any]) -> i
     plan_days = plan_data.get("plan_days") if isinstance(plan_data, dict) else None
     if not isinstance(plan_days, list) or not plan_days:
         return 0
-    inserted = 0
+    rows = []
+    for day in plan_days:
+        if not isinstance(day, dict):
+            continue
+        day_date = str(day.get("date") or "").strip()
+        if not day_date:
+            continue
+        workout_title = str(day.get("workout") or "Planned workout").strip()
+        if not workout_title:
+            workout_title = "Planned workout"
+        workout_start = f"{day_date}T18:00:00"
+        workout_end = f"{day_date}T19:00:00"
+        rows.append((user_id, workout_start, workout_end, workout_title, "plan_autosync", "active"))
+
+        meal_title = "Log meals for today"
+        meal_start = f"{day_date}T20:00:00"
+        meal_end = f"{day_date}T20:20:00"
+        rows.append((user_id, meal_start, meal_end, meal_title, "plan_autosync", "active"))
     with get_db_conn() as conn:
         cur = conn.cursor()
         cur.execute(
             "DELETE FROM calendar_blocks WHERE user_id = ? AND source = ?",
             (user_id, "plan_autosync"),
         )
-        for day in plan_days:
-            if not isinstance(day, dict):
-                continue
-            day_date = str(day.get("date") or "").strip()
-            if not day_date:
-                continue
-            workout_title = str(day.get("workout") or "Planned workout").strip()
-            if not workout_title:
-                workout_title = "Planned workout"
-            workout_start = f"{day_date}T18:00:00"
-            workout_end = f"{day_date}T19:00:00"
-            cur.execute(
-                """
-                INSERT INTO calendar_blocks (user_id, start_at, end_at, title, source, status)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (user_id, workout_start, workout_end, workout_title, "plan_autosync", "active"),
-            )
-            inserted += 1
-
-            meal_title = "Log meals for today"
-            meal_start = f"{day_date}T20:00:00"
-            meal_end = f"{day_date}T20:20:00"
-            cur.execute(
-                """
-                INSERT INTO calendar_blocks (user_id, start_at, end_at, title, source, status)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (user_id, meal_start, meal_end, meal_title, "plan_autosync", "active"),
-            )
-            inserted += 1
+        bulk_insert(cur, "calendar_blocks", ("user_id", "start_at", "end_at", "title", "source", "status"), rows)
         conn.commit()
-    return inserted
+    return len(rows)
 
 
 @app.post("/api/onboarding/complete")
 def complete_onboarding(payload: OnboardingCompletePayload):
-    _ensure_coach_schema()
-    _ensure_profile_schema()
     user_id = payload.user_id or 1
     fields = []
     values: list[Any] = []
@@ -4694,7 +4825,7 @@ def complete_onboarding(payload: OnboardingCompletePayload):
                 )
             conn.commit()
     if payload.current_weight_kg is not None:
-        _invalidate_user_activity_cache(user_id, day=date.today().isoformat())
+        invalidate(user_id, "profile", day=date.today().isoformat())
     _refresh_profile_cache(user_id)
     generated_plan = _generate_plan_for_user(
         user_id,
@@ -0,0 +1,255 @@
+"""Per-workload concurrency limits (bulkheads) for slow upstream calls.
+
+Sync endpoints share Starlette's single threadpool, so a burst of meal-photo
+scans or TTS requests can hold every worker thread while cheap DB reads such
+as ``/plans/today`` queue behind them. Slow work is routed through a
+``Bulkhead`` per workload class instead: each one admits at most
+``BULKHEAD_<NAME>_CONCURRENCY`` calls at a time, runs sync callables on its
+own thread pool, and rejects with ``BulkheadFull`` (served as 503) once
+``BULKHEAD_<NAME>_QUEUE`` callers are already waiting.
+
+``Bulkhead.run`` offloads a sync callable; ``Bulkhead.slot`` bounds async work
+(e.g. an awaited LLM call) against the same limit, and ``Bulkhead.acquire``
+does the same for work that outlives one frame, such as a streamed reply.
+``stats`` reports queue depth and wait times for ``/api/health/bulkheads``.
+
+Everything else still runs on the default threadpool; ``DEFAULT_POOL`` times
+how long those calls wait for a thread so the same endpoint can report it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, TypeVar
+from weakref import WeakKeyDictionary
+
+import anyio
+from starlette.concurrency import run_in_threadpool as _starlette_run_in_threadpool
+
+T = TypeVar("T")
+
+# Recent wait samples kept per bulkhead for the percentile figures.
+_WAIT_SAMPLES = 512
+
+
+class BulkheadFull(RuntimeError):
+    """Raised when a bulkhead's wait queue is already at capacity."""
+
+    def __init__(self, name: str, retry_after: int = 1) -> None:
+        super().__init__(f"{name} workload is at capacity; retry shortly")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, str(default)))
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class _WaitStats:
+    """Admission wait times; callers serialize access with their own lock."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    def record(self, waited: float) -> None:
+        self.count += 1
+        self.total += waited
+        self.max = max(self.max, waited)
+        self.samples.append(waited)
+
+    def snapshot(self) -> Dict[str, float]:
+        samples = list(self.samples)
+        return {
+            "wait_ms_avg": round(1000 * self.total / self.count, 1) if self.count else 0.0,
+            "wait_ms_p50": round(1000 * _percentile(samples, 0.50), 1),
+            "wait_ms_p95": round(1000 * _percentile(samples, 0.95), 1),
+            "wait_ms_max": round(1000 * self.max, 1),
+        }
+
+
+class Bulkhead:
+    """Bounded concurrency plus a bounded wait queue for one workload class."""
+
+    def __init__(self, name: str, *, max_concurrency: int, max_queue: int) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"bulkhead-{name}")
+        self._semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._peak_waiting = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._waits = _WaitStats()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._semaphores[loop] = semaphore
+            return semaphore
+
+    async def acquire(self) -> Callable[..., None]:
+        """Take a slot without a ``with`` block; returns its release callable.
+
+        Used when the slot must outlive the caller's frame, e.g. a streaming
+        response. Release is idempotent; pass ``failed=True`` on errors.
+        """
+        semaphore = self._semaphore()
+        with self._lock:
+            if semaphore.locked() and self._waiting >= self.max_queue:
+                self._rejected += 1
+                raise BulkheadFull(self.name)
+            self._waiting += 1
+            self._peak_waiting = max(self._peak_waiting, self._waiting)
+        queued_at = time.monotonic()
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            with self._lock:
+                self._waiting -= 1
+            raise
+        waited = time.monotonic() - queued_at
+        with self._lock:
+            self._waiting -= 1
+            self._active += 1
+            self._waits.record(waited)
+        released = False
+
+        def release(failed: bool = False) -> None:
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+                self._active -= 1
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+            semaphore.release()
+
+        return release
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of this bulkhead's slots for the duration of the block."""
+        release = await self.acquire()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            release(failed)
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run sync ``func`` on this bulkhead's threads once a slot is free."""
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queue_depth": self._waiting,
+                "peak_queue_depth": self._peak_waiting,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                **self._waits.snapshot(),
+            }
+
+
+class DefaultPoolMonitor:
+    """Wait-time accounting for Starlette's shared threadpool.
+
+    ``run_in_threadpool`` is a drop-in for Starlette's: the wait is the time
+    from dispatch until the callable starts on a worker thread. ``install``
+    routes FastAPI's own sync-endpoint dispatch through it as well.
+    """
+
+    name = "default_threadpool"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._waits = _WaitStats()
+
+    async def run_in_threadpool(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        queued_at = time.monotonic()
+
+        def timed() -> T:
+            waited = time.monotonic() - queued_at
+            with self._lock:
+                self._waits.record(waited)
+            return func(*args, **kwargs)
+
+        return await _starlette_run_in_threadpool(timed)
+
+    def install(self) -> None:
+        import fastapi.routing
+
+        fastapi.routing.run_in_threadpool = self.run_in_threadpool
+
+    def stats(self) -> Dict[str, Any]:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        with self._lock:
+            waits = self._waits.snapshot()
+        return {
+            "name": self.name,
+            "max_concurrency": limiter.total_tokens,
+            "active": limiter.borrowed_tokens,
+            "queue_depth": limiter.statistics().tasks_waiting,
+            **waits,
+        }
+
+
+def _bulkhead(name: str, concurrency: int, queue: int) -> Bulkhead:
+    prefix = f"BULKHEAD_{name.upper()}"
+    return Bulkhead(
+        name,
+        max_concurrency=_env_int(f"{prefix}_CONCURRENCY", concurrency),
+        max_queue=_env_int(f"{prefix}_QUEUE", queue),
+    )
+
+
+# Chat-model turns: coach graph, Ashley, onboarding extraction, recipe ideas.
+LLM = _bulkhead("llm", 32, 64)
+# Gemini photo analysis (food scans, meal photos in chat, ingredient photos).
+VISION = _bulkhead("vision", 4, 16)
+# Whisper / transcription, OpenAI TTS and HeyGen.
+AUDIO = _bulkhead("audio", 4, 16)
+# Google Places, YouTube search and Tavily.
+EXTERNAL = _bulkhead("external", 8, 32)
+
+BULKHEADS = (LLM, VISION, AUDIO, EXTERNAL)
+
+DEFAULT_POOL = DefaultPoolMonitor()
+run_in_threadpool = DEFAULT_POOL.run_in_threadpool
@@ -13,6 +13,9 @@ RAG_SOURCES_DIR = BASE_DIR / "sources"
 DEFAULT_USER_ID = int(os.environ.get("DEFAULT_USER_ID", "0"))
 CACHE_TTL_LONG = 6 * 60 * 60
 CACHE_TTL_PLAN = 30 * 60
+# Stale-while-revalidate reads: refresh in the background after SOFT, block after HARD.
+CACHE_TTL_SWR_SOFT = int(os.environ.get("CACHE_TTL_SWR_SOFT", "60"))
+CACHE_TTL_SWR_HARD = int(os.environ.get("CACHE_TTL_SWR_HARD", str(30 * 60)))
 
 
 def _draft_plan_key(user_id: int) -> str:
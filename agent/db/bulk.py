@@ -0,0 +1,109 @@
+"""Batched write helpers.
+
+Use these instead of issuing one INSERT per row inside a Python loop. Every
+call site here talks to a remote Postgres host, so a round trip per row adds
+up quickly.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+from typing import Any, Iterable, List, Optional, Sequence
+
+from psycopg2.extras import execute_values
+
+BULK_PAGE_SIZE = int(os.environ.get("DB_BULK_PAGE_SIZE", "500"))
+# Plain appends at least this large are streamed with COPY instead of INSERT.
+BULK_COPY_THRESHOLD = int(os.environ.get("DB_BULK_COPY_THRESHOLD", "2000"))
+
+
+def _raw_cursor(cur):
+    """Unwrap a CursorAdapter; psycopg2.extras needs the driver cursor."""
+    return getattr(cur, "raw", cur)
+
+
+def _conflict_clause(
+    conflict_columns: Optional[Sequence[str]],
+    update_columns: Optional[Sequence[str]],
+    conflict_where: Optional[str],
+    do_nothing: bool,
+) -> str:
+    if not conflict_columns and not do_nothing:
+        return ""
+    clause = " ON CONFLICT"
+    if conflict_columns:
+        clause += f" ({', '.join(conflict_columns)})"
+        if conflict_where:
+            clause += f" WHERE {conflict_where}"
+    if do_nothing or not update_columns:
+        return clause + " DO NOTHING"
+    assignments = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+    return clause + f" DO UPDATE SET {assignments}"
+
+
+def bulk_insert(
+    cur,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    *,
+    conflict_columns: Optional[Sequence[str]] = None,
+    update_columns: Optional[Sequence[str]] = None,
+    conflict_where: Optional[str] = None,
+    do_nothing: bool = False,
+    returning: Optional[Sequence[str]] = None,
+    page_size: Optional[int] = None,
+) -> List[tuple]:
+    """Insert ``rows`` with multi-row VALUES statements.
+
+    ``conflict_columns`` with ``update_columns`` produces an upsert
+    (``ON CONFLICT (...) DO UPDATE SET col = EXCLUDED.col``); with no update
+    columns, or with ``do_nothing=True``, conflicting rows are skipped. Rows
+    named in ``returning`` are fetched and returned in insert order.
+    """
+    rows = [tuple(row) for row in rows]
+    if not rows:
+        return []
+    is_plain_append = not conflict_columns and not do_nothing and not returning
+    if is_plain_append and len(rows) >= BULK_COPY_THRESHOLD:
+        copy_rows(cur, table, columns, rows)
+        return []
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+    query += _conflict_clause(conflict_columns, update_columns, conflict_where, do_nothing)
+    if returning:
+        query += f" RETURNING {', '.join(returning)}"
+    result = execute_values(
+        _raw_cursor(cur),
+        query,
+        rows,
+        page_size=page_size or BULK_PAGE_SIZE,
+        fetch=bool(returning),
+    )
+    return list(result or [])
+
+
+def _copy_field(value: Any) -> str:
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_rows(cur, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """Stream rows into ``table`` with ``COPY ... FROM STDIN`` (append only)."""
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write(",".join(_copy_field(value) for value in row))
+        buffer.write("\n")
+        count += 1
+    if not count:
+        return 0
+    buffer.seek(0)
+    _raw_cursor(cur).copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+        buffer,
+    )
+    return count
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 from typing import Any, Iterable, Optional
 
 import psycopg2
 from psycopg2.pool import ThreadedConnectionPool
 
+try:
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # pragma: no cover - optional dependency for local dev
+    AsyncConnectionPool = None
+
 
 def _is_connection_closed_error(exc: BaseException) -> bool:
     """Detect if error indicates the DB connection was closed unexpectedly."""
@@ -30,6 +36,38 @@ def invalidate_pool() -> None:
         _POOL = None
 
 
+async def close_async_pool() -> None:
+    global _ASYNC_POOL
+    pool = _ASYNC_POOL
+    _ASYNC_POOL = None
+    if pool is not None:
+        await pool.close()
+
+
+def _db_settings() -> dict[str, Any]:
+    host = os.environ.get("SUPABASE_DB_HOST")
+    user = os.environ.get("SUPABASE_DB_USER")
+    password = os.environ.get("SUPABASE_DB_PASSWORD")
+    dbname = os.environ.get("SUPABASE_DB_NAME")
+    if not host or not user or not password or not dbname:
+        raise RuntimeError(
+            "Supabase/Postgres is required. Set SUPABASE_DB_HOST, SUPABASE_DB_USER, "
+            "SUPABASE_DB_PASSWORD, SUPABASE_DB_NAME, SUPABASE_DB_PORT."
+        )
+    return {
+        "host": host,
+        "user": user,
+        "password": password,
+        "dbname": dbname,
+        "port": int(os.environ.get("SUPABASE_DB_PORT", "5432")),
+        "sslmode": os.environ.get("SUPABASE_DB_SSLMODE", "require"),
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 5,
+    }
+
+
 def _adapt_query(query: str) -> str:
     return query.replace("?", "%s")
 
@@ -57,6 +95,11 @@ class CursorAdapter:
     def fetchall(self):
         return self._cursor.fetchall()
 
+    @property
+    def raw(self):
+        """Underlying psycopg2 cursor, for helpers such as execute_values."""
+        return self._cursor
+
     def __getattr__(self, name: str):
         return getattr(self._cursor, name)
 
@@ -103,39 +146,73 @@ class ConnectionAdapter:
         return False
 
 
+class AsyncCursorAdapter:
+    def __init__(self, cursor, adapt_query: bool = True):
+        self._cursor = cursor
+        self._adapt_query = adapt_query
+
+    async def execute(self, query: str, params: Optional[Iterable[Any]] = None):
+        if self._adapt_query:
+            query = _adapt_query(query)
+        if params is None:
+            return await self._cursor.execute(query)
+        return await self._cursor.execute(query, params)
+
+    async def executemany(self, query: str, params: Iterable[Iterable[Any]]):
+        if self._adapt_query:
+            query = _adapt_query(query)
+        return await self._cursor.executemany(query, params)
+
+    async def fetchone(self):
+        return await self._cursor.fetchone()
+
+    async def fetchall(self):
+        return await self._cursor.fetchall()
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class AsyncConnectionAdapter:
+    def __init__(
+        self,
+        conn,
+        pool: Optional[Any] = None,
+        adapt_query: bool = True,
+    ):
+        self._conn = conn
+        self._pool = pool
+        self._adapt_query = adapt_query
+        self._conn_bad = False
+
+    def cursor(self):
+        return AsyncCursorAdapter(self._conn.cursor(), adapt_query=self._adapt_query)
+
+    async def commit(self) -> None:
+        await self._conn.commit()
+
+    async def rollback(self) -> None:
+        await self._conn.rollback()
+
+    async def close(self) -> None:
+        if self._conn_bad:
+            try:
+                await self._conn.close()
+            except Exception:
+                pass
+        if self._pool is not None:
+            # psycopg_pool discards closed/broken connections on return.
+            await self._pool.putconn(self._conn)
+
+
 @contextmanager
 def get_db_conn():
     global _POOL
     if _POOL is None:
-        host = os.environ.get("SUPABASE_DB_HOST")
-        user = os.environ.get("SUPABASE_DB_USER")
-        password = os.environ.get("SUPABASE_DB_PASSWORD")
-        dbname = os.environ.get("SUPABASE_DB_NAME")
-        port = int(os.environ.get("SUPABASE_DB_PORT", "5432"))
-        sslmode = os.environ.get("SUPABASE_DB_SSLMODE", "require")
+        settings = _db_settings()
         minconn = int(os.environ.get("DB_POOL_MIN", "1"))
         maxconn = int(os.environ.get("DB_POOL_MAX", "15"))
-
-        if not host or not user or not password or not dbname:
-            raise RuntimeError(
-                "Supabase/Postgres is required. Set SUPABASE_DB_HOST, SUPABASE_DB_USER, "
-                "SUPABASE_DB_PASSWORD, SUPABASE_DB_NAME, SUPABASE_DB_PORT."
-            )
-
-        _POOL = ThreadedConnectionPool(
-            minconn=minconn,
-            maxconn=maxconn,
-            host=host,
-            user=user,
-            password=password,
-            dbname=dbname,
-            port=port,
-            sslmode=sslmode,
-            keepalives=1,
-            keepalives_idle=30,
-            keepalives_interval=10,
-            keepalives_count=5,
-        )
+        _POOL = ThreadedConnectionPool(minconn=minconn, maxconn=maxconn, **settings)
 
     conn = _POOL.getconn()
     adapter = ConnectionAdapter(conn, pool=_POOL, adapt_query=True)
@@ -155,4 +232,68 @@ def get_db_conn():
         adapter.close()
 
 
+async def _get_async_pool():
+    global _ASYNC_POOL
+    if AsyncConnectionPool is None:
+        raise RuntimeError("Async Postgres access requires psycopg and psycopg-pool to be installed.")
+    if _ASYNC_POOL is not None:
+        return _ASYNC_POOL
+    async with _ASYNC_POOL_LOCK:
+        if _ASYNC_POOL is None:
+            settings = _db_settings()
+            pool = AsyncConnectionPool(
+                kwargs=settings,
+                min_size=int(os.environ.get("DB_ASYNC_POOL_MIN", "1")),
+                max_size=int(os.environ.get("DB_ASYNC_POOL_MAX", "20")),
+                open=False,
+            )
+            await pool.open()
+            _ASYNC_POOL = pool
+    return _ASYNC_POOL
+
+
+@asynccontextmanager
+async def get_async_db_conn():
+    """Async counterpart of get_db_conn() for `async def` endpoints."""
+    pool = await _get_async_pool()
+    conn = await pool.getconn()
+    adapter = AsyncConnectionAdapter(conn, pool=pool, adapt_query=True)
+    try:
+        yield adapter
+        await adapter.commit()
+    except Exception as e:
+        if _is_connection_closed_error(e):
+            adapter._conn_bad = True
+        try:
+            await adapter.rollback()
+        except Exception:
+            pass  # connection may be dead
+        raise
+    finally:
+        await adapter.close()
+
+
+@asynccontextmanager
+async def use_async_db_conn(conn: Optional[AsyncConnectionAdapter] = None):
+    """Yield ``conn`` if given, else check out a pooled one via get_async_db_conn().
+
+    Lets several helpers share one pool connection. A failure inside the
+    block rolls the shared connection back so later statements still run.
+    """
+    if conn is None:
+        async with get_async_db_conn() as own:
+            yield own
+        return
+    try:
+        yield conn
+    except Exception:
+        try:
+            await conn.rollback()
+        except Exception:
+            pass  # connection may be dead
+        raise
+
+
 _POOL: Optional[ThreadedConnectionPool] = None
+_ASYNC_POOL: Optional[Any] = None
+_ASYNC_POOL_LOCK = asyncio.Lock()
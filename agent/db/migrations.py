@@ -0,0 +1,234 @@
+"""Versioned schema migrations.
+
+Each migration is applied once and recorded in ``schema_version``. Run them at
+startup (see ``agent/app.py``) or manually with ``python -m agent.db.migrations``.
+Request handlers must not probe ``information_schema``; add a new numbered
+migration here instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from typing import List, Sequence, Tuple
+
+from agent.db.connection import get_db_conn
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant key so concurrent workers serialize on the same lock.
+_MIGRATION_LOCK_KEY = 7_310_042
+
+Migration = Tuple[int, str, Sequence[str]]
+
+MIGRATIONS: List[Migration] = [
+    (
+        1,
+        "users_password_hash",
+        [
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS password_hash TEXT NULL",
+        ],
+    ),
+    (
+        2,
+        "profile_columns",
+        [
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS profile_image_base64 TEXT NULL",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS location_shared BOOLEAN NULL",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS location_latitude DOUBLE PRECISION NULL",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS location_longitude DOUBLE PRECISION NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS allergies TEXT NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS preferred_workout_time TEXT NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS menstrual_cycle_notes TEXT NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS trainer_gender_preference TEXT NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS trainer_style_preference TEXT NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS muscle_group_preferences TEXT NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS sports_preferences TEXT NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS location_context TEXT NULL",
+            "ALTER TABLE user_preferences ADD COLUMN IF NOT EXISTS google_calendar_connected BOOLEAN NULL",
+        ],
+    ),
+    (
+        3,
+        "meal_log_micronutrients",
+        [
+            "ALTER TABLE meal_logs ADD COLUMN IF NOT EXISTS fiber_g DOUBLE PRECISION NULL",
+            "ALTER TABLE meal_logs ADD COLUMN IF NOT EXISTS sugar_g DOUBLE PRECISION NULL",
+            "ALTER TABLE meal_logs ADD COLUMN IF NOT EXISTS sodium_mg DOUBLE PRECISION NULL",
+        ],
+    ),
+    (
+        4,
+        "coach_columns",
+        [
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS agent_id BIGINT NULL",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS coach_voice TEXT NULL",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS last_agent_change_at TEXT NULL",
+            # New users default to Marcus (id=1) and his voice, so the old
+            # per-request backfill is no longer needed.
+            "ALTER TABLE users ALTER COLUMN agent_id SET DEFAULT 1",
+            "ALTER TABLE users ALTER COLUMN coach_voice SET DEFAULT 'onyx'",
+            "UPDATE users SET agent_id = 1 WHERE agent_id IS NULL",
+            """
+            UPDATE users
+            SET coach_voice = CASE
+                WHEN agent_id = 1 THEN 'onyx'
+                WHEN agent_id = 2 THEN 'shimmer'
+                WHEN agent_id = 3 THEN 'sage'
+                WHEN agent_id = 4 THEN 'nova'
+                WHEN agent_id = 5 THEN 'echo'
+                WHEN agent_id = 6 THEN 'alloy'
+                WHEN agent_id = 7 THEN 'nova'
+                WHEN agent_id = 8 THEN 'echo'
+                WHEN agent_id = 9 THEN 'shimmer'
+                WHEN agent_id = 10 THEN 'nova'
+                WHEN agent_id = 11 THEN 'alloy'
+                ELSE 'alloy'
+            END
+            WHERE coach_voice IS NULL OR coach_voice = ''
+            """,
+        ],
+    ),
+    (
+        5,
+        "app_open_events",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS app_open_events (
+                user_id INTEGER PRIMARY KEY,
+                last_open_at TEXT NOT NULL
+            )
+            """,
+        ],
+    ),
+    (
+        6,
+        "meal_logs_idempotency_key",
+        [
+            "ALTER TABLE meal_logs ADD COLUMN IF NOT EXISTS idempotency_key TEXT NULL",
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS meal_logs_user_idempotency_key_idx
+            ON meal_logs (user_id, idempotency_key)
+            WHERE idempotency_key IS NOT NULL
+            """,
+        ],
+    ),
+    (
+        7,
+        "checkins_unique_user_date",
+        [
+            # Keep the newest row per day before enforcing one check-in per date.
+            """
+            DELETE FROM checkins c
+            USING checkins newer
+            WHERE c.user_id = newer.user_id
+              AND c.checkin_date = newer.checkin_date
+              AND c.id < newer.id
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS checkins_user_checkin_date_idx
+            ON checkins (user_id, checkin_date)
+            """,
+        ],
+    ),
+    (
+        8,
+        "agent_state",
+        [
+            # Shared agent session state (STATE_BACKEND=postgres), see agent/state.py.
+            """
+            CREATE TABLE IF NOT EXISTS agent_state (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value JSONB NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS agent_state_expires_at_idx ON agent_state (expires_at)",
+        ],
+    ),
+    (
+        9,
+        "agent_state_drop_session_meta_blobs",
+        [
+            # Per-user session_meta blobs held the Google token in plaintext;
+            # fields are now stored per key and the token stays out of Postgres.
+            "DELETE FROM agent_state WHERE namespace = 'session_meta'",
+        ],
+    ),
+]
+
+
+def _ensure_version_table(cur) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+
+
+def current_version() -> int:
+    with get_db_conn() as conn:
+        cur = conn.cursor()
+        _ensure_version_table(cur)
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        row = cur.fetchone()
+    return int(row[0] or 0) if row else 0
+
+
+def apply_migrations() -> List[int]:
+    """Apply pending migrations in order and return the versions applied.
+
+    Everything runs in one transaction under an advisory lock, so workers that
+    start together apply each migration exactly once.
+    """
+    applied: List[int] = []
+    with get_db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_xact_lock(?)", (_MIGRATION_LOCK_KEY,))
+        _ensure_version_table(cur)
+        cur.execute("SELECT version FROM schema_version")
+        done = {int(row[0]) for row in cur.fetchall()}
+        for version, name, statements in sorted(MIGRATIONS, key=lambda item: item[0]):
+            if version in done:
+                continue
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (version, name),
+            )
+            applied.append(version)
+            logger.info("Applied schema migration %s (%s)", version, name)
+    return applied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="Print the current schema version and exit.")
+    args = parser.parse_args()
+    if args.status:
+        latest = max(version for version, _, _ in MIGRATIONS)
+        print(f"schema_version={current_version()} latest={latest}")
+        return
+    applied = apply_migrations()
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print("Schema is up to date.")
+
+
+if __name__ == "__main__":
+    import os
+
+    from dotenv import load_dotenv
+
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    load_dotenv(dotenv_path=os.path.join(root_dir, ".env"))
+    load_dotenv(dotenv_path=os.path.join(root_dir, "agent", ".env"))
+    main()
@@ -43,3 +43,86 @@ FROM plan_checkpoints
 WHERE template_id = ?
 ORDER BY checkpoint_week
 """
+
+SELECT_CHECKINS_FOR_USER = """
+SELECT checkin_date, weight_kg, mood, notes
+FROM checkins
+WHERE user_id = ?
+ORDER BY checkin_date DESC
+"""
+
+SELECT_MEAL_LOGS_FOR_USER = """
+SELECT id, logged_at, photo_path, description, calories, protein_g, carbs_g, fat_g,
+       fiber_g, sugar_g, sodium_mg, confidence, confirmed
+FROM meal_logs
+WHERE user_id = ?
+ORDER BY logged_at DESC
+"""
+
+SELECT_WORKOUT_SESSIONS_FOR_USER = """
+SELECT id, date, workout_type, duration_min, calories_burned, notes, completed, source
+FROM workout_sessions
+WHERE user_id = ?
+ORDER BY date DESC
+"""
+
+SELECT_DAILY_MEAL_TOTALS = """
+SELECT calories, protein_g, carbs_g, fat_g, fiber_g, sugar_g, sodium_mg
+FROM meal_logs
+WHERE user_id = ? AND logged_at BETWEEN ? AND ?
+"""
+
+SELECT_DAILY_MEAL_LOGS = """
+SELECT description, calories, protein_g, carbs_g, fat_g, fiber_g, sugar_g, sodium_mg, logged_at
+FROM meal_logs
+WHERE user_id = ? AND logged_at BETWEEN ? AND ?
+ORDER BY logged_at DESC
+"""
+
+SELECT_MEAL_LOGS_DRAFT = """
+SELECT id, user_id, logged_at, description, calories, protein_g, carbs_g, fat_g, confidence, confirmed,
+       idempotency_key
+FROM meal_logs
+WHERE user_id = ?
+ORDER BY logged_at DESC
+"""
+
+SELECT_CHECKINS_DRAFT = """
+SELECT id, user_id, checkin_date, weight_kg, mood, notes
+FROM checkins
+WHERE user_id = ?
+ORDER BY checkin_date DESC
+"""
+
+SELECT_WORKOUT_SESSIONS_DRAFT = """
+SELECT id, user_id, date, workout_type, duration_min, calories_burned, notes, completed, source
+FROM workout_sessions
+WHERE user_id = ?
+ORDER BY date DESC
+"""
+
+SELECT_HEALTH_ACTIVITY_DRAFT = """
+SELECT id, user_id, date, steps, calories_burned, workouts_summary, source
+FROM health_activity
+WHERE user_id = ?
+ORDER BY date DESC
+"""
+
+SELECT_REMINDERS_DRAFT = """
+SELECT id, user_id, reminder_type, scheduled_at, status, channel, related_plan_override_id
+FROM reminders
+WHERE user_id = ?
+ORDER BY scheduled_at
+"""
+
+SELECT_DAILY_MEAL_COUNT = """
+SELECT COUNT(*) FROM meal_logs WHERE user_id = ? AND logged_at BETWEEN ? AND ?
+"""
+
+SELECT_DAILY_COMPLETED_WORKOUT_COUNT = """
+SELECT COUNT(*) FROM workout_sessions WHERE user_id = ? AND completed = 1 AND date = ?
+"""
+
+SELECT_POINTS_REASON = """
+SELECT 1 FROM points WHERE user_id = ? AND reason = ? LIMIT 1
+"""
@@ -0,0 +1,342 @@
+"""Durable LangGraph checkpointer with retention and tool-output compaction.
+
+``MemorySaver`` keeps every checkpoint of every thread in RAM. The default
+checkpointer is now a SQLite file (``CHECKPOINT_SQLITE_PATH``) that:
+
+- keeps only the last ``CHECKPOINT_KEEP_LAST`` checkpoints per thread;
+- drops threads idle for more than ``CHECKPOINT_MAX_IDLE_DAYS`` (checked at
+  most once per ``CHECKPOINT_PRUNE_INTERVAL_SECONDS``);
+- truncates ToolMessage payloads from earlier turns to
+  ``CHECKPOINT_TOOL_MESSAGE_MAX_CHARS`` before they are stored.
+
+Set ``CHECKPOINT_SQLITE_PATH=""`` to keep threads in memory instead. Report
+and prune storage with ``python -m agent.graph.checkpoint``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage, ToolMessage
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:  # pragma: no cover - optional dependency for local dev
+    SqliteSaver = None
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_SQLITE_PATH = os.getenv(
+    "CHECKPOINT_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "checkpoints.sqlite"),
+)
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_MAX_IDLE_DAYS = float(os.getenv("CHECKPOINT_MAX_IDLE_DAYS", "30"))
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = int(os.getenv("CHECKPOINT_PRUNE_INTERVAL_SECONDS", "3600"))
+CHECKPOINT_TOOL_MESSAGE_MAX_CHARS = int(os.getenv("CHECKPOINT_TOOL_MESSAGE_MAX_CHARS", "2000"))
+
+# 100ns intervals between the Gregorian epoch (UUID clock) and the Unix epoch.
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def _checkpoint_time(checkpoint_id: str) -> Optional[float]:
+    """Unix time encoded in a LangGraph checkpoint id (a version 6 UUID)."""
+    try:
+        value = uuid.UUID(checkpoint_id)
+    except (TypeError, ValueError):
+        return None
+    if value.version != 6:
+        return None
+    bits = value.int
+    ticks = ((bits >> 96) << 28) | (((bits >> 80) & 0xFFFF) << 12) | ((bits >> 64) & 0x0FFF)
+    return (ticks - _UUID_EPOCH_OFFSET) / 10_000_000
+
+
+def _compact_content(content: Any, max_chars: int) -> Any:
+    if not isinstance(content, str) or len(content) <= max_chars:
+        return content
+    return f"{content[:max_chars]}\n...[truncated {len(content) - max_chars} chars]"
+
+
+def compact_messages(messages: List[Any], max_chars: int = CHECKPOINT_TOOL_MESSAGE_MAX_CHARS) -> List[Any]:
+    """Truncate ToolMessage payloads from completed turns.
+
+    Messages after the last HumanMessage belong to the turn in progress (e.g.
+    a generate_plan result awaiting approval) and are kept intact. Returns a
+    new list; the live graph state is never mutated.
+    """
+    last_human = -1
+    for idx, message in enumerate(messages):
+        if isinstance(message, HumanMessage):
+            last_human = idx
+    compacted: List[Any] = []
+    changed = False
+    for idx, message in enumerate(messages):
+        if idx < last_human and isinstance(message, ToolMessage):
+            content = _compact_content(message.content, max_chars)
+            if content is not message.content:
+                message = message.model_copy(update={"content": content})
+                changed = True
+        compacted.append(message)
+    return compacted if changed else messages
+
+
+def _prune_thread(cur: Any, thread_id: str, checkpoint_ns: str, keep_last: int) -> int:
+    cur.execute(
+        """
+        DELETE FROM checkpoints
+        WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+            SELECT checkpoint_id FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC
+            LIMIT ?
+        )
+        """,
+        (thread_id, checkpoint_ns, thread_id, checkpoint_ns, keep_last),
+    )
+    deleted = cur.rowcount
+    if deleted:
+        cur.execute(
+            """
+            DELETE FROM writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+            )
+            """,
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+        )
+    return deleted
+
+
+def _idle_threads(cur: Any, max_idle_days: float) -> List[str]:
+    cutoff = time.time() - max_idle_days * 86400
+    cur.execute("SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id")
+    idle = []
+    for thread_id, latest in cur.fetchall():
+        last_seen = _checkpoint_time(latest)
+        if last_seen is not None and last_seen < cutoff:
+            idle.append(thread_id)
+    return idle
+
+
+def prune(
+    conn: sqlite3.Connection,
+    keep_last: int = CHECKPOINT_KEEP_LAST,
+    max_idle_days: float = CHECKPOINT_MAX_IDLE_DAYS,
+) -> Dict[str, int]:
+    """Apply the retention policy to every thread in the checkpoint database."""
+    cur = conn.cursor()
+    idle = _idle_threads(cur, max_idle_days)
+    for thread_id in idle:
+        cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        cur.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+    trimmed = 0
+    cur.execute("SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints")
+    for thread_id, checkpoint_ns in cur.fetchall():
+        trimmed += _prune_thread(cur, thread_id, checkpoint_ns, keep_last)
+    conn.commit()
+    return {"idle_threads_deleted": len(idle), "checkpoints_trimmed": trimmed}
+
+
+def report(conn: sqlite3.Connection, path: str = CHECKPOINT_SQLITE_PATH, top: int = 10) -> Dict[str, Any]:
+    """Storage summary: totals and the largest threads with their last activity."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT COUNT(DISTINCT thread_id), COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) "
+        "FROM checkpoints"
+    )
+    threads, checkpoints, checkpoint_bytes = cur.fetchone()
+    cur.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM writes")
+    writes, write_bytes = cur.fetchone()
+    cur.execute(
+        """
+        SELECT thread_id, COUNT(*), SUM(LENGTH(checkpoint) + LENGTH(metadata)), MAX(checkpoint_id)
+        FROM checkpoints
+        GROUP BY thread_id
+        ORDER BY 3 DESC
+        LIMIT ?
+        """,
+        (top,),
+    )
+    largest = [
+        {
+            "thread_id": thread_id,
+            "checkpoints": count,
+            "bytes": size,
+            "last_active": _checkpoint_time(latest),
+        }
+        for thread_id, count, size, latest in cur.fetchall()
+    ]
+    return {
+        "path": path,
+        "file_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+        "threads": threads,
+        "checkpoints": checkpoints,
+        "checkpoint_bytes": checkpoint_bytes,
+        "writes": writes,
+        "write_bytes": write_bytes,
+        "largest_threads": largest,
+    }
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    # WAL lets several workers on one node read while another writes.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ThreadedAsyncSaverMixin:
+    """Async checkpointer methods that run the sync ones in a worker thread.
+
+    SqliteSaver and the sync Postgres/Redis savers raise on ``aget_tuple`` and
+    friends, which ``graph.ainvoke``/``astream`` need. Checkpoint I/O is short
+    compared with the LLM calls, so a thread hop is enough to keep the event
+    loop free without a second async connection pool.
+    """
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, **kwargs) -> AsyncIterator[Any]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, **kwargs)))
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, *args, **kwargs):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, *args, **kwargs)
+
+    async def adelete_thread(self, thread_id):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def with_threaded_async(saver_cls: type) -> type:
+    """Subclass of a sync-only saver class with ThreadedAsyncSaverMixin applied."""
+    return type(f"Threaded{saver_cls.__name__}", (ThreadedAsyncSaverMixin, saver_cls), {})
+
+
+if SqliteSaver is not None:
+
+    class PruningSqliteSaver(ThreadedAsyncSaverMixin, SqliteSaver):
+        """SqliteSaver that compacts tool output and enforces retention on write."""
+
+        def __init__(
+            self,
+            conn: sqlite3.Connection,
+            *,
+            keep_last: int = CHECKPOINT_KEEP_LAST,
+            max_idle_days: float = CHECKPOINT_MAX_IDLE_DAYS,
+            tool_message_max_chars: int = CHECKPOINT_TOOL_MESSAGE_MAX_CHARS,
+            prune_interval_seconds: int = CHECKPOINT_PRUNE_INTERVAL_SECONDS,
+        ) -> None:
+            super().__init__(conn)
+            self.keep_last = max(1, keep_last)
+            self.max_idle_days = max_idle_days
+            self.tool_message_max_chars = tool_message_max_chars
+            self.prune_interval_seconds = prune_interval_seconds
+            self._next_idle_prune = 0.0
+            self._prune_lock = threading.Lock()
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            channel_values = checkpoint.get("channel_values") or {}
+            messages = channel_values.get("messages")
+            if isinstance(messages, list):
+                compacted = compact_messages(messages, self.tool_message_max_chars)
+                if compacted is not messages:
+                    checkpoint = {**checkpoint, "channel_values": {**channel_values, "messages": compacted}}
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            configurable = saved.get("configurable", {})
+            # cursor() takes self.lock itself (a plain, non-reentrant Lock).
+            with self.cursor() as cur:
+                _prune_thread(
+                    cur,
+                    str(configurable.get("thread_id")),
+                    configurable.get("checkpoint_ns", ""),
+                    self.keep_last,
+                )
+            self._maybe_prune_idle()
+            return saved
+
+        def _maybe_prune_idle(self) -> None:
+            now = time.monotonic()
+            if now < self._next_idle_prune or not self._prune_lock.acquire(blocking=False):
+                return
+            try:
+                self._next_idle_prune = now + self.prune_interval_seconds
+                with self.lock:
+                    result = prune(self.conn, self.keep_last, self.max_idle_days)
+                if result["idle_threads_deleted"]:
+                    logger.info("Pruned %s idle checkpoint threads", result["idle_threads_deleted"])
+            except Exception as exc:
+                logger.warning("Checkpoint pruning failed: %s", exc)
+            finally:
+                self._prune_lock.release()
+
+else:
+    PruningSqliteSaver = None
+
+
+def build_sqlite_checkpointer(path: str = CHECKPOINT_SQLITE_PATH) -> Optional[Any]:
+    """PruningSqliteSaver on ``path``; None if disabled or langgraph-checkpoint-sqlite is missing."""
+    if not path or PruningSqliteSaver is None:
+        return None
+    saver = PruningSqliteSaver(_connect(path))
+    saver.setup()
+    return saver
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report on and prune LangGraph checkpoint storage.")
+    parser.add_argument("--path", default=CHECKPOINT_SQLITE_PATH, help="SQLite checkpoint database.")
+    parser.add_argument("--prune", action="store_true", help="Apply the retention policy to every thread.")
+    parser.add_argument("--keep-last", type=int, default=CHECKPOINT_KEEP_LAST)
+    parser.add_argument("--max-idle-days", type=float, default=CHECKPOINT_MAX_IDLE_DAYS)
+    parser.add_argument("--vacuum", action="store_true", help="Reclaim free pages after pruning.")
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        print(f"No checkpoint database at {args.path}")
+        return
+    conn = _connect(args.path)
+    try:
+        if args.prune:
+            result = prune(conn, max(1, args.keep_last), args.max_idle_days)
+            print(
+                f"Deleted {result['idle_threads_deleted']} idle threads, "
+                f"trimmed {result['checkpoints_trimmed']} checkpoints"
+            )
+        if args.vacuum:
+            conn.execute("VACUUM")
+        summary = report(conn, args.path)
+    finally:
+        conn.close()
+    print(
+        f"{summary['path']}: {summary['file_bytes']} bytes on disk, {summary['threads']} threads, "
+        f"{summary['checkpoints']} checkpoints ({summary['checkpoint_bytes']} bytes), "
+        f"{summary['writes']} writes ({summary['write_bytes']} bytes)"
+    )
+    for thread in summary["largest_threads"]:
+        last_active = thread["last_active"]
+        last_active_text = time.strftime("%Y-%m-%d %H:%M", time.gmtime(last_active)) if last_active else "?"
+        print(
+            f"  {thread['thread_id']}: {thread['checkpoints']} checkpoints, {thread['bytes']} bytes, "
+            f"last active {last_active_text} UTC"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,53 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Annotated
+from typing import Any, Dict, FrozenSet, List, Optional, Annotated
 
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage, ToolMessage, AIMessage
-from langgraph.graph import StateGraph, START, add_messages
+from langgraph.graph import END, StateGraph, START, add_messages
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import ToolNode, tools_condition
 from typing_extensions import TypedDict
 
-from agent.config.constants import CACHE_TTL_LONG, CACHE_TTL_PLAN, DEFAULT_USER_ID, _draft_plan_key
-from agent.prompts.system_prompt import DEFAULT_AGENT_ID, get_system_prompt
+from agent.config.constants import (
+    CACHE_TTL_LONG,
+    CACHE_TTL_PLAN,
+    DEFAULT_USER_ID,
+    _draft_checkins_key,
+    _draft_health_activity_key,
+    _draft_meal_logs_key,
+    _draft_plan_key,
+    _draft_reminders_key,
+    _draft_workout_sessions_key,
+)
+from agent.prompts.system_prompt import DEFAULT_AGENT_ID, get_system_prompt, get_turn_notes
+from agent.graph.checkpoint import build_sqlite_checkpointer, with_threaded_async
+from agent.graph.history import amanage_history, manage_history, summary_message, window_messages
+from agent.graph.intents import match_intent, render_reply
+from agent.graph.tool_groups import select_groups, tool_names_for
 from agent.rag.rag import _build_rag_index, _retrieve_rag_context, _should_apply_rag
-from agent.state import SESSION_CACHE
+from agent.state import SESSION_CACHE, SESSION_FIELDS, STATE_BACKEND, session_field
 from agent.tools.meal_tools import delete_all_meal_logs, get_meal_logs, log_meal
-from agent.redis.cache import _redis_get_json, _redis_set_json
-from agent.db.connection import get_db_conn
+from agent.redis.cache import _redis_get_json, _redis_mget_json, _redis_set_json, _redis_set_many_json
+from agent.db import queries
+from agent.db.bulk import bulk_insert
+from agent.db.connection import _db_settings, get_db_conn
 from agent.tools.plan_tools import (
+    _checkins_draft_from_rows,
     _compact_context_summary,
+    _health_activity_draft_from_rows,
+    _query_active_plan_bundle,
+    _reminders_draft_from_rows,
     _get_active_plan_bundle_data,
     _invalidate_active_plan_cache,
-    _load_checkins_draft,
-    _load_health_activity_draft,
-    _load_active_plan_draft,
-    _load_reminders_draft,
-    _load_user_context_data,
     apply_plan_patch,
     compute_plan_status,
     generate_plan,
@@ -54,12 +75,31 @@ from agent.tools.workout_tools import (
     log_workout_session,
     remove_workout_exercise,
 )
-from agent.tools.meal_tools import _load_meal_logs_draft
-from agent.tools.workout_tools import _load_workout_sessions_draft
+from agent.tools.meal_tools import _load_meal_logs_draft, _meal_logs_draft_from_rows
+from agent.tools.workout_tools import _load_workout_sessions_draft, _workout_sessions_draft_from_rows
+
+logger = logging.getLogger(__name__)
+
+# Session drafts that map one-to-one onto a single SELECT by user_id.
+_DRAFT_QUERIES = {
+    "workout_sessions": (queries.SELECT_WORKOUT_SESSIONS_DRAFT, _workout_sessions_draft_from_rows),
+    "meal_logs": (queries.SELECT_MEAL_LOGS_DRAFT, _meal_logs_draft_from_rows),
+    "checkins": (queries.SELECT_CHECKINS_DRAFT, _checkins_draft_from_rows),
+    "health_activity": (queries.SELECT_HEALTH_ACTIVITY_DRAFT, _health_activity_draft_from_rows),
+    "reminders": (queries.SELECT_REMINDERS_DRAFT, _reminders_draft_from_rows),
+}
+
+
+_SYSTEM_MESSAGES: Dict[str, SystemMessage] = {}
 
 
 def _system_message(agent_id: str | int | None) -> SystemMessage:
-    return SystemMessage(content=get_system_prompt(agent_id))
+    """Cached static prompt for the persona; it leads every call as the cacheable prefix."""
+    prompt = get_system_prompt(agent_id)
+    message = _SYSTEM_MESSAGES.get(prompt)
+    if message is None:
+        message = _SYSTEM_MESSAGES[prompt] = SystemMessage(content=prompt)
+    return message
 
 
 
@@ -70,6 +110,8 @@ class AgentState(TypedDict):
     active_plan: Optional[Dict[str, Any]]
     proposed_plan: Optional[Dict[str, Any]]
     user_id: Optional[int]
+    # Rolling summary of turns folded out of ``messages`` by manage_history.
+    summary: Optional[str]
 
 
 def _sanitize_messages_for_llm(messages: List[BaseMessage]) -> List[BaseMessage]:
@@ -120,19 +162,71 @@ def _sanitize_messages_for_llm(messages: List[BaseMessage]) -> List[BaseMessage]
     return cleaned
 
 
+def _load_session_drafts(user_id: int) -> Dict[str, Any]:
+    """Load every session draft with one MGET, then fill misses over a single DB connection.
+
+    Mirrors the individual _load_*_draft helpers, including their cache
+    write-backs, which are sent in one pipeline.
+    """
+    keys = {
+        "context": f"user:{user_id}:profile",
+        "active_plan": _draft_plan_key(user_id),
+        "workout_sessions": _draft_workout_sessions_key(user_id),
+        "meal_logs": _draft_meal_logs_key(user_id),
+        "checkins": _draft_checkins_key(user_id),
+        "health_activity": _draft_health_activity_key(user_id),
+        "reminders": _draft_reminders_key(user_id),
+    }
+    plan_key = f"active_plan:{user_id}"
+    legacy_plan_key = f"user:{user_id}:active_plan"
+    names = list(keys)
+    values = _redis_mget_json([keys[name] for name in names] + [plan_key, legacy_plan_key])
+    drafts = {name: value for name, value in zip(names, values) if value}
+    cached_plan, legacy_plan = values[len(names):]
+    missing = [name for name in names if name not in drafts]
+    writes = []
+
+    if "active_plan" in missing and (cached_plan or legacy_plan):
+        drafts["active_plan"] = cached_plan or legacy_plan
+    if any(name not in drafts for name in missing):
+        with get_db_conn() as conn:
+            cur = conn.cursor()
+            if "context" not in drafts:
+                cur.execute(queries.SELECT_USER_PROFILE, (user_id,))
+                user_row = cur.fetchone()
+                cur.execute(queries.SELECT_USER_PREFS, (user_id,))
+                pref_row = cur.fetchone()
+                drafts["context"] = {"user": user_row, "preferences": pref_row}
+            if "active_plan" not in drafts:
+                bundle = _query_active_plan_bundle(cur, user_id)
+                if bundle is None:
+                    bundle = {"plan": None, "plan_days": []}
+                else:
+                    writes.append((plan_key, bundle, CACHE_TTL_PLAN))
+                    writes.append((legacy_plan_key, bundle, CACHE_TTL_PLAN))
+                drafts["active_plan"] = bundle
+            for name, (query, from_rows) in _DRAFT_QUERIES.items():
+                if name not in drafts:
+                    cur.execute(query, (user_id,))
+                    drafts[name] = from_rows(cur.fetchall())
+
+    for name in missing:
+        writes.append((keys[name], drafts[name], CACHE_TTL_LONG))
+    _redis_set_many_json(writes)
+    return drafts
+
+
 def _preload_session_cache(user_id: int) -> Dict[str, Any]:
-    existing = SESSION_CACHE.get(user_id, {})
-    with get_db_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT 1")
-        cur.fetchone()
-    context = _load_user_context_data(user_id)
-    active_plan = _load_active_plan_draft(user_id)
-    workout_sessions = _load_workout_sessions_draft(user_id)
-    meal_logs = _load_meal_logs_draft(user_id)
-    checkins = _load_checkins_draft(user_id)
-    health_activity = _load_health_activity_draft(user_id)
-    reminders = _load_reminders_draft(user_id)
+    # Request fields may have been set on another worker; keep them across the reload.
+    fields = {name: session_field(user_id, name) for name in SESSION_FIELDS}
+    drafts = _load_session_drafts(user_id)
+    context = drafts["context"]
+    active_plan = drafts["active_plan"]
+    workout_sessions = drafts["workout_sessions"]
+    meal_logs = drafts["meal_logs"]
+    checkins = drafts["checkins"]
+    health_activity = drafts["health_activity"]
+    reminders = drafts["reminders"]
     SESSION_CACHE[user_id] = {
         "context": context,
         "active_plan": active_plan,
@@ -141,9 +235,7 @@ def _preload_session_cache(user_id: int) -> Dict[str, Any]:
         "checkins": checkins,
         "health_activity": health_activity,
         "reminders": reminders,
-        "agent_id": existing.get("agent_id"),
-        "google_access_token": existing.get("google_access_token"),
-        "last_user_message": existing.get("last_user_message"),
+        **fields,
     }
     return {
         "context": context,
@@ -156,12 +248,13 @@ def _preload_session_cache(user_id: int) -> Dict[str, Any]:
     }
 
 
-def assistant(state: AgentState):
+def _prepare_assistant_call(state: AgentState):
+    """Load session context (may hit Redis/Postgres) and build the prompt for one assistant call."""
     context = state.get("context")
     active_plan = state.get("active_plan")
     user_id = state.get("user_id") or DEFAULT_USER_ID
     session = SESSION_CACHE.get(user_id, {})
-    agent_id = session.get("agent_id", DEFAULT_AGENT_ID)
+    agent_id = session_field(user_id, "agent_id") or DEFAULT_AGENT_ID
     if session.get("context"):
         context = session["context"]
     if session.get("active_plan"):
@@ -172,42 +265,65 @@ def assistant(state: AgentState):
         preload = _preload_session_cache(user_id)
         context = preload["context"]
         active_plan = preload["active_plan"]
-    if user_id not in SESSION_CACHE:
-        SESSION_CACHE[user_id] = {}
-    if "workout_sessions" not in SESSION_CACHE[user_id]:
-        SESSION_CACHE[user_id]["workout_sessions"] = _load_workout_sessions_draft(user_id)
-    if "meal_logs" not in SESSION_CACHE[user_id]:
-        SESSION_CACHE[user_id]["meal_logs"] = _load_meal_logs_draft(user_id)
-    SESSION_CACHE[user_id]["context"] = context
-    SESSION_CACHE[user_id]["active_plan"] = active_plan
+    # Hold the entry itself: the bounded store may evict the key between lookups.
+    user_session = SESSION_CACHE.setdefault(user_id, {})
+    if "workout_sessions" not in user_session:
+        user_session["workout_sessions"] = _load_workout_sessions_draft(user_id)
+    if "meal_logs" not in user_session:
+        user_session["meal_logs"] = _load_meal_logs_draft(user_id)
+    user_session["context"] = context
+    user_session["active_plan"] = active_plan
     last_user_message = ""
+    turn_seed = None
     for message in reversed(state.get("messages", [])):
         if isinstance(message, HumanMessage):
             last_user_message = message.content
+            turn_seed = message.id or str(message.content)
             break
     rag_context = _retrieve_rag_context(last_user_message) if _should_apply_rag(last_user_message) else ""
+    # Static prompt, summary and history form the cacheable prefix; the
+    # per-turn notes and context go last.
     context_msg = SystemMessage(
         content=(
+            f"Turn notes: {get_turn_notes(agent_id, seed=turn_seed)}\n"
             f"User context (compact): {_compact_context_summary(context, active_plan)}"
             + (f"\nReference excerpts (RAG):\n{rag_context}" if rag_context else "")
         )
     )
-    try:
-        safe_messages = _sanitize_messages_for_llm(state.get("messages", []))
-        response = llm_with_tools.invoke([_system_message(agent_id), context_msg] + safe_messages)
-    except Exception as exc:
-        return {
-            "context": context,
-            "active_plan": active_plan,
-            "messages": [AIMessage(content=f"OpenAI request failed. Try again. Details: {exc}")],
-        }
+    safe_messages = window_messages(_sanitize_messages_for_llm(state.get("messages", [])))
+    summary_msg = summary_message(state.get("summary"))
+    prefix = [_system_message(agent_id)] + ([summary_msg] if summary_msg else [])
+    prompt = prefix + safe_messages + [context_msg]
+    return context, active_plan, _llm_for_groups(select_groups(safe_messages)), prompt
+
+
+def _assistant_failure(context: Any, active_plan: Any, exc: Exception) -> Dict[str, Any]:
     return {
         "context": context,
         "active_plan": active_plan,
-        "messages": [response],
+        "messages": [AIMessage(content=f"OpenAI request failed. Try again. Details: {exc}")],
     }
 
 
+def assistant(state: AgentState):
+    context, active_plan, bound_llm, prompt = _prepare_assistant_call(state)
+    try:
+        response = bound_llm.invoke(prompt)
+    except Exception as exc:
+        return _assistant_failure(context, active_plan, exc)
+    return {"context": context, "active_plan": active_plan, "messages": [response]}
+
+
+async def aassistant(state: AgentState):
+    """Async assistant for graph.ainvoke/astream: awaits the LLM instead of holding a thread."""
+    context, active_plan, bound_llm, prompt = await asyncio.to_thread(_prepare_assistant_call, state)
+    try:
+        response = await bound_llm.ainvoke(prompt)
+    except Exception as exc:
+        return _assistant_failure(context, active_plan, exc)
+    return {"context": context, "active_plan": active_plan, "messages": [response]}
+
+
 tools = [
     get_current_plan_summary,
     get_plan_day,
@@ -238,8 +354,50 @@ tools = [
     delete_workout_from_draft,
 ]
 llm = ChatOpenAI(model="gpt-4o", temperature=0, max_retries=0, request_timeout=30)
-llm_with_tools = llm.bind_tools(tools, parallel_tool_calls=False)
 _tool_node = ToolNode(tools)
+_TOOLS_BY_NAME = {tool.name: tool for tool in tools}
+INTENT_FAST_PATH_ENABLED = os.getenv("INTENT_FAST_PATH", "1") != "0"
+_BOUND_LLMS: Dict[FrozenSet[str], Any] = {}
+_BOUND_LLMS_LOCK = threading.Lock()
+
+
+def _llm_for_groups(groups: FrozenSet[str]):
+    """LLM bound to the tools of ``groups``, built once per tier.
+
+    select_groups only returns core, core plus one domain, or every group, so
+    there are a handful of tool prefixes. Tools keep their order in ``tools``
+    so each tier serializes to the same schema bytes on every call.
+    """
+    bound = _BOUND_LLMS.get(groups)
+    if bound is None:
+        names = tool_names_for(groups)
+        with _BOUND_LLMS_LOCK:
+            bound = _BOUND_LLMS.get(groups)
+            if bound is None:
+                bound = _BOUND_LLMS[groups] = llm.bind_tools([tool for tool in tools if tool.name in names])
+    return bound
+
+
+# Lookups that don't change user data; a batch made only of these runs concurrently.
+_READ_ONLY_TOOL_NAMES = {
+    "get_current_plan_summary",
+    "get_plan_day",
+    "get_realtime_coaching_context",
+    "search_web",
+    "get_weight_checkpoint_for_current_week",
+    "compute_plan_status",
+    "get_reminders",
+    "get_meal_logs",
+    "get_current_date",
+    "get_workout_sessions",
+}
+_TOOL_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AGENT_TOOL_WORKERS", "8")),
+    thread_name_prefix="agent-tools",
+)
+# Striped per-process locks that serialize one user's mutating tool batches
+# across concurrent requests without keeping a lock per user forever.
+_USER_TOOL_LOCKS = [threading.Lock() for _ in range(64)]
 _USER_SCOPED_TOOL_NAMES = {
     "get_current_plan_summary",
     "get_plan_day",
@@ -269,7 +427,33 @@ _USER_SCOPED_TOOL_NAMES = {
 }
 
 
-def execute_tools(state: AgentState) -> Dict[str, Any]:
+def _user_tool_lock(user_id: int) -> threading.Lock:
+    return _USER_TOOL_LOCKS[hash(user_id) % len(_USER_TOOL_LOCKS)]
+
+
+def _run_tool_call(call: Dict[str, Any], config: Optional[RunnableConfig]) -> List[BaseMessage]:
+    # ToolNode keeps its error handling: failures come back as ToolMessages.
+    result = _tool_node.invoke({"messages": [AIMessage(content="", tool_calls=[call])]}, config)
+    return list(result.get("messages", []))
+
+
+def _run_tool_calls(
+    user_id: int,
+    tool_calls: List[Dict[str, Any]],
+    config: Optional[RunnableConfig],
+) -> List[BaseMessage]:
+    """Run read-only batches concurrently; anything that writes runs in order under the user's lock."""
+    if len(tool_calls) > 1 and all(call.get("name") in _READ_ONLY_TOOL_NAMES for call in tool_calls):
+        futures = [_TOOL_POOL.submit(_run_tool_call, call, config) for call in tool_calls]
+        return [message for future in futures for message in future.result()]
+    results: List[BaseMessage] = []
+    with _user_tool_lock(user_id):
+        for call in tool_calls:
+            results.extend(_run_tool_call(call, config))
+    return results
+
+
+def execute_tools(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
     """Enforce active session user_id on all user-scoped tool calls."""
     user_id = state.get("user_id")
     if not user_id:
@@ -277,14 +461,13 @@ def execute_tools(state: AgentState) -> Dict[str, Any]:
 
     messages = list(state.get("messages", []))
     if not messages or not isinstance(messages[-1], AIMessage):
-        return _tool_node.invoke(state)
+        return _tool_node.invoke(state, config)
 
     last_ai = messages[-1]
     tool_calls = last_ai.tool_calls or []
     if not tool_calls:
-        return _tool_node.invoke(state)
+        return _tool_node.invoke(state, config)
 
-    rewritten = False
     patched_calls = []
     for call in tool_calls:
         if not isinstance(call, dict):
@@ -297,36 +480,64 @@ def execute_tools(state: AgentState) -> Dict[str, Any]:
                 args = {}
             if args.get("user_id") != user_id:
                 args = {**args, "user_id": user_id}
-                rewritten = True
             call = {**call, "args": args}
         patched_calls.append(call)
 
-    if rewritten:
-        try:
-            patched_ai = last_ai.model_copy(update={"tool_calls": patched_calls})
-        except Exception:
-            patched_ai = AIMessage(content=last_ai.content, tool_calls=patched_calls)
-        messages[-1] = patched_ai
-        patched_state = dict(state)
-        patched_state["messages"] = messages
-        return _tool_node.invoke(patched_state)
+    return {"messages": _run_tool_calls(user_id, patched_calls, config)}
 
-    return _tool_node.invoke(state)
 
+def _today_workout_types(user_id: int) -> List[str]:
+    draft = SESSION_CACHE.get(user_id, {}).get("workout_sessions") or _load_workout_sessions_draft(user_id)
+    today = datetime.now().date().isoformat()
+    sessions = draft.get("sessions", []) if isinstance(draft, dict) else []
+    return sorted({str(s.get("workout_type")) for s in sessions if s.get("date") == today and s.get("workout_type")})
 
-def _last_tool_name(state: AgentState) -> Optional[str]:
+
+def route_intent(state: AgentState) -> Dict[str, Any]:
+    """Answer structured commands (see agent.graph.intents) without calling the LLM."""
+    if not INTENT_FAST_PATH_ENABLED:
+        return {}
     messages = state.get("messages", [])
-    if len(messages) < 2:
-        return None
-    if isinstance(messages[-1], ToolMessage) and isinstance(messages[-2], AIMessage):
-        tool_calls = messages[-2].tool_calls or []
-        if tool_calls:
-            return tool_calls[0].get("name")
-    return None
+    user_id = state.get("user_id")
+    if not user_id or not messages or not isinstance(messages[-1], HumanMessage):
+        return {}
+    intent = match_intent(str(messages[-1].content), user_id, _today_workout_types)
+    if intent is None:
+        return {}
+    try:
+        tool = _TOOLS_BY_NAME[intent.tool_name]
+        if intent.mutating:
+            with _user_tool_lock(user_id):
+                result = tool.invoke(intent.args)
+        else:
+            result = tool.invoke(intent.args)
+    except Exception as exc:
+        logger.warning("Intent fast path %s failed, deferring to the assistant: %s", intent.name, exc)
+        return {}
+    agent_id = session_field(user_id, "agent_id") or DEFAULT_AGENT_ID
+    return {"messages": [AIMessage(content=render_reply(intent, str(result), agent_id))]}
+
+
+def route_after_intent(state: AgentState) -> str:
+    messages = state.get("messages", [])
+    if messages and isinstance(messages[-1], AIMessage):
+        return END
+    return "manage_history"
+
+
+def _last_tool_names(state: AgentState) -> List[str]:
+    """Names of the tool calls answered by the trailing ToolMessages."""
+    messages = state.get("messages", [])
+    idx = len(messages)
+    while idx > 0 and isinstance(messages[idx - 1], ToolMessage):
+        idx -= 1
+    if idx == len(messages) or idx == 0 or not isinstance(messages[idx - 1], AIMessage):
+        return []
+    return [call.get("name") for call in messages[idx - 1].tool_calls or []]
 
 
 def route_after_tools(state: AgentState) -> str:
-    if _last_tool_name(state) == "generate_plan":
+    if "generate_plan" in _last_tool_names(state):
         return "human_feedback"
     return "assistant"
 
@@ -407,39 +618,36 @@ def apply_plan(state: AgentState) -> AgentState:
             ),
         )
         template_id = cur.fetchone()[0]
-        for day_index in range(cycle_length):
-            day = plan_data["plan_days"][day_index]
-            workout_json = json.dumps({"label": day["workout"]})
-            calorie_delta = day["calorie_target"] - plan_data["calorie_target"]
-            cur.execute(
-                """
-                INSERT INTO plan_template_days (
-                    template_id, day_index, workout_json, calorie_delta, notes
-                ) VALUES (?, ?, ?, ?, ?)
-                """,
+        bulk_insert(
+            cur,
+            "plan_template_days",
+            ("template_id", "day_index", "workout_json", "calorie_delta", "notes"),
+            [
                 (
                     template_id,
                     day_index,
-                    workout_json,
-                    calorie_delta,
+                    json.dumps({"label": day["workout"]}),
+                    day["calorie_target"] - plan_data["calorie_target"],
                     None,
-                ),
-            )
-        for checkpoint in plan_data["checkpoints"]:
-            cur.execute(
-                """
-                INSERT INTO plan_checkpoints (
-                    template_id, checkpoint_week, expected_weight_kg, min_weight_kg, max_weight_kg
-                ) VALUES (?, ?, ?, ?, ?)
-                """,
+                )
+                for day_index, day in enumerate(plan_data["plan_days"][:cycle_length])
+            ],
+        )
+        bulk_insert(
+            cur,
+            "plan_checkpoints",
+            ("template_id", "checkpoint_week", "expected_weight_kg", "min_weight_kg", "max_weight_kg"),
+            [
                 (
                     template_id,
                     checkpoint["week"],
                     checkpoint["expected_weight_kg"],
                     checkpoint["min_weight_kg"],
                     checkpoint["max_weight_kg"],
-                ),
-            )
+                )
+                for checkpoint in plan_data["checkpoints"]
+            ],
+        )
         conn.commit()
     cached_context = SESSION_CACHE.get(user_id, {}).get("context") or _redis_get_json(f"user:{user_id}:profile")
     if isinstance(cached_context, dict) and "preferences" in cached_context:
@@ -452,14 +660,62 @@ def apply_plan(state: AgentState) -> AgentState:
     return {"messages": [AIMessage(content="Plan updated and saved.")]}
 
 
+def _build_checkpointer():
+    """Checkpointer matching STATE_BACKEND so any worker can resume a thread.
+
+    The Postgres and Redis savers are optional packages; without them (or
+    without their connection settings) threads stay in process memory. The
+    default "memory" backend uses the local pruned SQLite file (see
+    agent.graph.checkpoint), which survives restarts but is not shared.
+    """
+    if STATE_BACKEND == "postgres":
+        try:
+            from langgraph.checkpoint.postgres import PostgresSaver
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            logger.warning("STATE_BACKEND=postgres needs langgraph-checkpoint-postgres; using MemorySaver")
+            return MemorySaver()
+        pool = ConnectionPool(
+            kwargs={**_db_settings(), "autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            min_size=1,
+            max_size=int(os.getenv("CHECKPOINT_POOL_MAX", "10")),
+        )
+        saver = with_threaded_async(PostgresSaver)(pool)
+        saver.setup()
+        return saver
+    if STATE_BACKEND == "redis":
+        redis_url = os.getenv("REDIS_URL")
+        try:
+            from langgraph.checkpoint.redis import RedisSaver
+        except ImportError:
+            redis_url = None
+        if not redis_url:
+            logger.warning("STATE_BACKEND=redis needs REDIS_URL and langgraph-checkpoint-redis; using MemorySaver")
+            return MemorySaver()
+        saver = with_threaded_async(RedisSaver)(redis_url=redis_url)
+        saver.setup()
+        return saver
+    saver = build_sqlite_checkpointer()
+    if saver is None:
+        logger.warning("SQLite checkpointer unavailable or disabled; using MemorySaver")
+        return MemorySaver()
+    return saver
+
+
 def build_graph() -> StateGraph:
     builder = StateGraph(AgentState)
-    builder.add_node("assistant", assistant)
+    builder.add_node("route_intent", route_intent)
+    # Sync nodes run in worker threads under ainvoke; these two await the LLM instead.
+    builder.add_node("manage_history", RunnableLambda(manage_history, afunc=amanage_history))
+    builder.add_node("assistant", RunnableLambda(assistant, afunc=aassistant))
     builder.add_node("tools", execute_tools)
     builder.add_node("human_feedback", human_feedback)
     builder.add_node("apply_plan", apply_plan)
 
-    builder.add_edge(START, "assistant")
+    builder.add_edge(START, "route_intent")
+    builder.add_conditional_edges("route_intent", route_after_intent, ["manage_history", END])
+    builder.add_edge("manage_history", "assistant")
     builder.add_conditional_edges(
         "assistant",
         tools_condition,
@@ -467,8 +723,7 @@ def build_graph() -> StateGraph:
     builder.add_conditional_edges("tools", route_after_tools, ["assistant", "human_feedback"])
     builder.add_edge("human_feedback", "apply_plan")
     builder.add_edge("apply_plan", "assistant")
-    memory = MemorySaver()
-    return builder.compile(checkpointer=memory, interrupt_before=["human_feedback"])
+    return builder.compile(checkpointer=_build_checkpointer(), interrupt_before=["human_feedback"])
 
 
 __all__ = [
@@ -0,0 +1,191 @@
+"""Bounded conversation window for the coach assistant.
+
+Threads are keyed ``user:{id}`` and live indefinitely, so the prompt can't be
+the whole history. Before the assistant runs, ``manage_history`` folds turns
+older than the last ``HISTORY_KEEP_TURNS`` into a rolling summary kept in graph
+state, and removes them from the thread with RemoveMessage. Fewer turns are
+kept when they would not fit ``HISTORY_TOKEN_BUDGET``.
+
+Folding costs a summarizer call, so it is batched: it only happens once the
+thread holds ``HISTORY_FOLD_BATCH_TURNS`` more turns than it keeps (or exceeds
+the token budget), and then folds with headroom so the next turns are free.
+
+``window_messages`` then builds the per-call prompt history: tool outputs from
+earlier turns are cut to ``HISTORY_STALE_TOOL_OUTPUT_CHARS`` and, as a last
+resort, the oldest kept turns are dropped to stay within the budget.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_openai import ChatOpenAI
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency for local dev
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+HISTORY_STALE_TOOL_OUTPUT_CHARS = int(os.getenv("HISTORY_STALE_TOOL_OUTPUT_CHARS", "600"))
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+HISTORY_FOLD_BATCH_TURNS = int(os.getenv("HISTORY_FOLD_BATCH_TURNS", "4"))
+# Share of the token budget the kept turns may use right after a fold.
+_FOLD_TOKEN_HEADROOM = 0.75
+# Per-message cap when rendering old turns for the summarizer.
+_SUMMARY_SOURCE_CHARS = 1200
+# Fixed per-message overhead in the chat format (role, separators).
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+_ENCODING = None
+if tiktoken is not None:
+    try:
+        _ENCODING = tiktoken.get_encoding("o200k_base")
+    except Exception:  # pragma: no cover - encoding files unavailable offline
+        _ENCODING = None
+
+_summary_llm = ChatOpenAI(model=HISTORY_SUMMARY_MODEL, temperature=0, max_retries=1, request_timeout=30)
+
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return str(content)
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Approximate prompt tokens for ``messages`` (tiktoken when available, else chars/4)."""
+    total = 0
+    for message in messages:
+        text = _text(message)
+        if isinstance(message, AIMessage) and message.tool_calls:
+            text += "".join(str(call.get("args", "")) for call in message.tool_calls)
+        total += (len(_ENCODING.encode(text)) if _ENCODING is not None else len(text) // 4) + _MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a HumanMessage."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _turns_to_keep(turns: List[List[BaseMessage]], token_budget: float) -> int:
+    keep = min(len(turns), max(1, HISTORY_KEEP_TURNS + 1))  # +1 for the turn in progress
+    while keep > 1 and count_tokens([m for turn in turns[-keep:] for m in turn]) > token_budget:
+        keep -= 1
+    return keep
+
+
+def _render_for_summary(messages: Sequence[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            role = "User"
+        elif isinstance(message, ToolMessage):
+            role = f"Tool {message.name or ''}".strip()
+        elif isinstance(message, AIMessage):
+            role = "Coach"
+            if message.tool_calls and not _text(message):
+                names = ", ".join(str(call.get("name")) for call in message.tool_calls)
+                lines.append(f"Coach called tools: {names}")
+                continue
+        else:
+            continue
+        lines.append(f"{role}: {_text(message)[:_SUMMARY_SOURCE_CHARS]}")
+    return "\n".join(lines)
+
+
+def _summary_prompt(previous: Optional[str], messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    prompt = (
+        "You maintain a running summary of a conversation between a fitness coach and a user. "
+        "Keep facts the coach needs later: goals, preferences, injuries, decisions, plan changes, "
+        "logged data and open questions. Drop small talk and raw tool payloads. "
+        "Reply with the updated summary only, at most 200 words."
+    )
+    body = f"Current summary:\n{previous or '(none)'}\n\nNew messages to fold in:\n{_render_for_summary(messages)}"
+    return [SystemMessage(content=prompt), HumanMessage(content=body)]
+
+
+def _messages_to_fold(state: Dict[str, Any]) -> List[BaseMessage]:
+    turns = split_turns(state.get("messages") or [])
+    over_turns = len(turns) > max(1, HISTORY_KEEP_TURNS + 1) + HISTORY_FOLD_BATCH_TURNS
+    if not over_turns and count_tokens([m for turn in turns for m in turn]) <= HISTORY_TOKEN_BUDGET:
+        return []
+    keep = _turns_to_keep(turns, HISTORY_TOKEN_BUDGET * _FOLD_TOKEN_HEADROOM)
+    return [message for turn in turns[:-keep] for message in turn] if keep < len(turns) else []
+
+
+def _folded(old: Sequence[BaseMessage], summary: str) -> Dict[str, Any]:
+    return {
+        "summary": summary,
+        "messages": [RemoveMessage(id=message.id) for message in old if message.id],
+    }
+
+
+def manage_history(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Graph node: fold turns beyond the window into ``summary`` and drop them."""
+    old = _messages_to_fold(state)
+    if not old:
+        return {}
+    try:
+        response = _summary_llm.invoke(_summary_prompt(state.get("summary"), old))
+    except Exception as exc:
+        # Keep the messages; window_messages still bounds this turn's prompt.
+        logger.warning("History summarization failed: %s", exc)
+        return {}
+    return _folded(old, _text(response).strip())
+
+
+async def amanage_history(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of manage_history used by graph.ainvoke/astream."""
+    old = _messages_to_fold(state)
+    if not old:
+        return {}
+    try:
+        response = await _summary_llm.ainvoke(_summary_prompt(state.get("summary"), old))
+    except Exception as exc:
+        logger.warning("History summarization failed: %s", exc)
+        return {}
+    return _folded(old, _text(response).strip())
+
+
+def _trim_stale_tool_output(message: BaseMessage) -> BaseMessage:
+    text = _text(message)
+    if len(text) <= HISTORY_STALE_TOOL_OUTPUT_CHARS:
+        return message
+    trimmed = f"{text[:HISTORY_STALE_TOOL_OUTPUT_CHARS]}\n...[earlier tool output truncated]"
+    return message.model_copy(update={"content": trimmed})
+
+
+def window_messages(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """History to send with this call, within HISTORY_TOKEN_BUDGET where possible."""
+    turns = split_turns(messages)
+    if not turns:
+        return []
+    windowed = [
+        [_trim_stale_tool_output(m) if isinstance(m, ToolMessage) else m for m in turn] for turn in turns[:-1]
+    ]
+    windowed.append(list(turns[-1]))
+    while len(windowed) > 1 and count_tokens([m for turn in windowed for m in turn]) > HISTORY_TOKEN_BUDGET:
+        windowed.pop(0)
+    return [message for turn in windowed for message in turn]
+
+
+def summary_message(summary: Optional[str]) -> Optional[SystemMessage]:
+    if not summary:
+        return None
+    return SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
@@ -0,0 +1,199 @@
+"""Deterministic fast path for high-frequency structured chat commands.
+
+Messages such as "log 2 eggs and a banana for breakfast" or "what's my workout
+today" don't need the LLM to pick a tool. ``match_intent`` recognises a small
+set of phrasings with compiled patterns and returns the tool and arguments to
+run; ``render_reply`` wraps the tool result in a short persona-styled reply.
+Anything that doesn't match exactly falls through to the assistant node, so
+patterns here should stay conservative.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from agent.prompts.system_prompt import _persona
+from agent.tools.meal_tools import _MEAL_ITEM_CALORIES
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    name: str
+    tool_name: str
+    args: Dict[str, Any]
+    # True when the tool changes user data (serialized like other writes).
+    mutating: bool
+
+
+_MEAL_WORDS = r"breakfast|lunch|dinner|snack"
+
+_LOG_MEAL = re.compile(
+    rf"^(?:please\s+)?log\s+(?:that\s+i\s+(?:ate|had)\s+)?(?P<items>.+?)"
+    rf"(?:\s+(?:for|at)\s+(?P<meal>{_MEAL_WORDS}))?\s*[.!]?$",
+    re.IGNORECASE,
+)
+# "log" is also used for workouts, weight, mood and check-ins; those go to the LLM.
+_NOT_FOOD = re.compile(
+    r"\b(?:workout|exercise|run|ran|walk|lift|session|weight|weigh|kg|lbs?|pounds?|check-?in|steps|sleep|water|"
+    r"mood|minutes?|mins?|hours?|km|k|miles?|reps?|sets?|yoga|swim(?:ming)?|cycling|bike|pushups?|push-ups?|"
+    r"situps?|squats?|it|that|this|my|your|the)\b",
+    re.IGNORECASE,
+)
+_ITEM_SPLIT = re.compile(r"\s*(?:,|\+|&|\band\b|\bwith\b)\s*", re.IGNORECASE)
+# Every item needs an explicit quantity and a food from _MEAL_ITEM_CALORIES,
+# e.g. "2 eggs", "a banana", "3 slices of pizza"; anything vaguer goes to the LLM.
+_MEAL_ITEM = re.compile(
+    r"^(?P<qty>\d{1,2}(?:\.\d)?|an?|one|two|three|four|five|six)\s+"
+    r"(?:(?:slices?|pieces?|servings?|portions?|cups?|bowls?)\s+(?:of\s+)?)?(?P<food>[a-z ]+?)$",
+    re.IGNORECASE,
+)
+_QUANTITY_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+
+_WORKOUT_DAY = re.compile(
+    r"^(?:what(?:'s|\s+is)\s+(?:my\s+workout\s+(?:for\s+)?(?P<when>today|tomorrow)"
+    r"|(?P<when2>today|tomorrow)'?s\s+workout))\s*\??$",
+    re.IGNORECASE,
+)
+
+_ADD_REMINDER = re.compile(
+    r"^(?:please\s+)?(?:add|set)\s+(?:a\s+|an\s+)?(?:(?P<kind>workout|meal|water|check-?in|weigh-?in)\s+)?"
+    r"reminder\s+(?:for\s+|at\s+)(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>am|pm)?"
+    r"(?:\s+(?P<day>today|tomorrow))?\s*[.!]?$",
+    re.IGNORECASE,
+)
+
+_DELETE_TODAY_WORKOUT = re.compile(
+    r"^(?:please\s+)?(?:delete|remove)\s+(?:today'?s|my)\s+workout(?:\s+(?:for\s+)?today)?\s*[.!]?$",
+    re.IGNORECASE,
+)
+
+
+def _day(word: Optional[str]) -> date:
+    today = date.today()
+    return today + timedelta(days=1) if (word or "").lower() == "tomorrow" else today
+
+
+def _item_calories(item: str) -> Optional[int]:
+    match = _MEAL_ITEM.match(item.strip())
+    if not match:
+        return None
+    food = match.group("food").strip().lower()
+    calories = _MEAL_ITEM_CALORIES.get(food)
+    if calories is None and food.endswith("s"):
+        calories = _MEAL_ITEM_CALORIES.get(food[:-1])
+    if calories is None:
+        return None
+    qty = match.group("qty").lower()
+    quantity = _QUANTITY_WORDS.get(qty) or float(qty)
+    if not 0 < quantity <= 12:
+        return None
+    return round(calories * quantity)
+
+
+def _match_log_meal(text: str, user_id: int, today_workouts: Callable[[int], List[str]]) -> Optional[IntentMatch]:
+    match = _LOG_MEAL.match(text)
+    if not match or _NOT_FOOD.search(match.group("items")):
+        return None
+    items = [item.strip() for item in _ITEM_SPLIT.split(match.group("items")) if item.strip()]
+    if not items:
+        return None
+    calories = [_item_calories(item) for item in items]
+    if any(value is None for value in calories):
+        return None
+    args: Dict[str, Any] = {"user_id": user_id, "items": items, "total_calories": sum(calories)}
+    if match.group("meal"):
+        args["consumed_at"] = match.group("meal").lower()
+    return IntentMatch("log_meal", "log_meal", args, mutating=True)
+
+
+def _match_workout_day(text: str, user_id: int, today_workouts: Callable[[int], List[str]]) -> Optional[IntentMatch]:
+    match = _WORKOUT_DAY.match(text)
+    if not match:
+        return None
+    target = _day(match.group("when") or match.group("when2"))
+    return IntentMatch(
+        "workout_day", "get_plan_day", {"user_id": user_id, "date_str": target.isoformat()}, mutating=False
+    )
+
+
+def _match_add_reminder(text: str, user_id: int, today_workouts: Callable[[int], List[str]]) -> Optional[IntentMatch]:
+    match = _ADD_REMINDER.match(text)
+    if not match:
+        return None
+    hour = int(match.group("hour"))
+    minute = int(match.group("minute") or 0)
+    ampm = (match.group("ampm") or "").lower()
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm == "pm" else 0)
+    elif hour <= 12:
+        return None  # "at 7" could be morning or evening; let the coach ask.
+    if hour > 23 or minute > 59:
+        return None
+    now = datetime.now()
+    scheduled = datetime.combine(_day(match.group("day")), datetime.min.time()).replace(hour=hour, minute=minute)
+    if scheduled <= now:
+        if match.group("day"):
+            return None  # An explicit time in the past is ambiguous; let the coach ask.
+        scheduled += timedelta(days=1)
+    kind = (match.group("kind") or "workout").lower().replace("-", "")
+    args = {
+        "user_id": user_id,
+        "reminder_type": kind,
+        "scheduled_at": scheduled.isoformat(timespec="seconds"),
+    }
+    return IntentMatch("add_reminder", "add_reminder", args, mutating=True)
+
+
+def _match_delete_today_workout(
+    text: str, user_id: int, today_workouts: Callable[[int], List[str]]
+) -> Optional[IntentMatch]:
+    if not _DELETE_TODAY_WORKOUT.match(text):
+        return None
+    workouts = today_workouts(user_id)
+    if len(workouts) != 1:
+        return None  # None or several logged today: the coach should ask which one.
+    args = {"user_id": user_id, "date": date.today().isoformat(), "workout_type": workouts[0]}
+    return IntentMatch("delete_today_workout", "delete_workout_from_draft", args, mutating=True)
+
+
+_MATCHERS = (_match_log_meal, _match_workout_day, _match_add_reminder, _match_delete_today_workout)
+
+
+def match_intent(text: str, user_id: int, today_workouts: Callable[[int], List[str]]) -> Optional[IntentMatch]:
+    """Return the structured intent in ``text``, or None to fall through to the LLM.
+
+    ``today_workouts(user_id)`` lists workout types logged today; it is only
+    called for delete requests.
+    """
+    text = (text or "").strip()
+    if not text or "\n" in text or len(text) > 200:
+        return None
+    for matcher in _MATCHERS:
+        match = matcher(text, user_id, today_workouts)
+        if match is not None:
+            return match
+    return None
+
+
+def render_reply(intent: IntentMatch, result: str, agent_id: Optional[str]) -> str:
+    """Short persona-flavoured reply around the tool's own result text."""
+    persona = _persona(agent_id)
+    sign_off = random.choice(persona.signature_phrases) if persona.signature_phrases else ""
+    if intent.name == "log_meal" and result == "Meal logged.":
+        meal = intent.args.get("consumed_at")
+        body = f"Logged {', '.join(intent.args['items'])}" + (f" for {meal}" if meal else "")
+        body += f" (about {intent.args['total_calories']} kcal)."
+    elif intent.name == "workout_day":
+        body = f"Here's your plan: {result}"
+    elif intent.name == "add_reminder" and result == "Reminder added.":
+        when = datetime.fromisoformat(intent.args["scheduled_at"]).strftime("%A at %H:%M")
+        body = f"Done, {intent.args['reminder_type']} reminder set for {when}."
+    else:
+        body = result
+    return f"{body} {sign_off}".strip()
@@ -0,0 +1,125 @@
+"""Per-turn tool selection for the assistant.
+
+Binding all tool schemas costs thousands of input tokens per call, even for
+"thanks!". Tools are grouped by domain; ``select_groups`` picks the groups a
+turn needs from keywords in the user's message and in the coach's previous
+reply, plus the groups of tools already used in this turn and the previous
+one (so "yes, do it" or "chicken and rice" after "what did you have for
+lunch?" keeps the tools that exchange needs). Short messages that match
+nothing get only the core group, unless they answer a coach question; those
+and longer unmatched messages get every group rather than risk a missing tool.
+
+Tool schemas precede the messages, so they are part of the cached prompt
+prefix (see get_system_prompt). To keep that prefix stable the selection is
+snapped to three tiers: core only, core plus exactly one domain group, or
+every group. A turn that needs two domains binds everything, trading some
+input tokens for a prefix that is shared with other multi-domain turns.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Pattern, Sequence, Set, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+CORE_GROUP = "core"
+
+TOOL_GROUPS: Dict[str, Tuple[str, ...]] = {
+    CORE_GROUP: ("get_current_date", "get_current_plan_summary"),
+    "plan": (
+        "get_plan_day",
+        "generate_plan",
+        "shift_active_plan_end_date",
+        "replace_active_plan_workouts",
+        "apply_plan_patch",
+        "propose_plan_corrections",
+        "propose_plan_patch_with_llm",
+    ),
+    "meals": ("log_meal", "get_meal_logs", "delete_all_meal_logs"),
+    "workouts": (
+        "get_plan_day",
+        "log_workout_session",
+        "get_workout_sessions",
+        "remove_workout_exercise",
+        "delete_workout_from_draft",
+    ),
+    "reminders": ("get_reminders", "add_reminder", "update_reminder", "delete_reminder"),
+    "calendar": ("add_google_calendar_events",),
+    "status": (
+        "compute_plan_status",
+        "get_weight_checkpoint_for_current_week",
+        "get_realtime_coaching_context",
+        "log_checkin",
+        "delete_checkin",
+    ),
+    "web": ("search_web",),
+}
+
+_GROUP_PATTERNS: Dict[str, Pattern[str]] = {
+    name: re.compile(pattern, re.IGNORECASE)
+    for name, pattern in {
+        "plan": r"\b(?:plan|program|schedule|week|skip|pause|extend|shift|move|swap|replace|change|adjust|"
+        r"goal|rest day|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b",
+        "meals": r"\b(?:ate|eat|eating|meal|food|breakfast|lunch|dinner|snack|calorie|calories|kcal|protein|"
+        r"carbs?|fat|macros?|diet|log(?:ged)?)\b",
+        "workouts": r"\b(?:workout|exercise|training|train|session|gym|run|ran|lift|sets?|reps?|cardio|"
+        r"squat|bench|deadlift|today)\b",
+        "reminders": r"\b(?:remind(?:er|ers)?|notify|notification|alarm|nudge)\b",
+        "calendar": r"\b(?:calendar|google|event|invite)\b",
+        "status": r"\b(?:progress|status|on track|how am i|doing|weigh|weight|kg|lbs|check-?in|adherence|"
+        r"streak|sleep|steps|weather|today)\b",
+        "web": r"\b(?:search|research|study|studies|article|source|evidence|look up|google it)\b",
+    }.items()
+}
+
+# Unmatched messages up to this many words are treated as chit-chat.
+_SMALL_TALK_MAX_WORDS = 4
+
+
+def _turn_bounds(messages: Sequence[BaseMessage]) -> List[int]:
+    return [idx for idx, message in enumerate(messages) if isinstance(message, HumanMessage)]
+
+
+def _groups_for_tools(names: Iterable[str]) -> FrozenSet[str]:
+    names = set(names)
+    return frozenset(group for group, tools in TOOL_GROUPS.items() if names.intersection(tools))
+
+
+def _previous_reply(messages: Sequence[BaseMessage], before: int) -> str:
+    for message in reversed(messages[:before]):
+        if isinstance(message, AIMessage) and isinstance(message.content, str) and message.content.strip():
+            return message.content.strip()
+    return ""
+
+
+def _groups_for_text(text: str) -> Set[str]:
+    return {name for name, pattern in _GROUP_PATTERNS.items() if pattern.search(text)}
+
+
+def select_groups(messages: Sequence[BaseMessage]) -> FrozenSet[str]:
+    """Tool groups to bind for the assistant call over ``messages``."""
+    starts = _turn_bounds(messages)
+    if not starts:
+        return frozenset(TOOL_GROUPS)
+    text = str(messages[starts[-1]].content or "")
+    previous_reply = _previous_reply(messages, starts[-1])
+    recent_from = starts[-2] if len(starts) > 1 else starts[-1]
+    used = [
+        str(call.get("name"))
+        for message in messages[recent_from:]
+        if isinstance(message, AIMessage)
+        for call in message.tool_calls or []
+    ]
+    groups = _groups_for_text(text) | _groups_for_text(previous_reply)
+    groups |= _groups_for_tools(used)
+    groups.discard(CORE_GROUP)
+    if not groups and (len(text.split()) > _SMALL_TALK_MAX_WORDS or previous_reply.endswith("?")):
+        return frozenset(TOOL_GROUPS)
+    if len(groups) > 1:
+        return frozenset(TOOL_GROUPS)
+    return frozenset(groups | {CORE_GROUP})
+
+
+def tool_names_for(groups: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(name for group in groups for name in TOOL_GROUPS[group])
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 import random
 from typing import Dict, List
 from dotenv import load_dotenv
@@ -376,10 +377,14 @@ def _resolve_agent_id(agent_id: str | int | None) -> str:
     return AGENT_ID_ALIASES.get(normalized, normalized)
 
 
-def _persona_block(agent_id: str | int | None) -> str:
+def _persona(agent_id: str | int | None) -> AgentPersona:
     resolved = _resolve_agent_id(agent_id)
-    persona = AGENT_PROFILES.get(resolved) or AGENT_PROFILES.get(DEFAULT_AGENT_ID) or next(iter(AGENT_PROFILES.values()))
-    quote = random.choice(persona.quotes)
+    return AGENT_PROFILES.get(resolved) or AGENT_PROFILES.get(DEFAULT_AGENT_ID) or next(iter(AGENT_PROFILES.values()))
+
+
+def _persona_block(agent_id: str | int | None) -> str:
+    # Must stay deterministic: it is part of the cached prompt prefix.
+    persona = _persona(agent_id)
     return (
         "Persona:\n"
         f"- Name: {persona.name} ({persona.pronouns})\n"
@@ -392,7 +397,7 @@ def _persona_block(agent_id: str | int | None) -> str:
         f"- Voice style: {persona.voice_style}\n"
         f"- Style rules: {persona.style_rules}\n"
         f"- Signature phrases (use 0-2 per response, ~80% of the time): {', '.join(persona.signature_phrases)}\n"
-        f"- Signature quote (use sparingly): \"{quote}\"\n"
+        "- Signature quote: use the one given in the turn notes, sparingly.\n"
         "- Vary wording and avoid repeating the same signature phrase in consecutive replies.\n"
         "- Add brief, relevant personal anecdotes tied to this persona's background when it "
         "helps the user feel supported. Keep stories short (1-3 sentences) and practical.\n"
@@ -491,9 +496,30 @@ If no draft state exists, the assistant must ask to load or confirm an editable
 
 
 def get_system_prompt(agent_id: str | int | None = None) -> str:
+    """Static system prompt for the persona, byte-identical across calls.
+
+    Providers cache prompt prefixes, so anything that varies per call belongs
+    in ``get_turn_notes`` (sent after this prompt) instead.
+    """
+    return _static_system_prompt(_resolve_agent_id(agent_id))
+
+
+def get_turn_notes(agent_id: str | int | None = None, seed: str | None = None) -> str:
+    """Per-turn persona material that must not be part of the cached prefix.
+
+    Pass the same ``seed`` for every call in a turn (e.g. the user message id)
+    so the tool loop re-sends identical bytes.
+    """
+    quotes = _persona(agent_id).quotes
+    quote = random.Random(seed).choice(quotes) if seed else random.choice(quotes)
+    return f"Signature quote for this reply (use sparingly): \"{quote}\""
+
+
+@lru_cache(maxsize=None)
+def _static_system_prompt(resolved_agent_id: str) -> str:
     return (
         "You are an AI Trainer assistant.\n\n"
-        + _persona_block(agent_id)
+        + _persona_block(resolved_agent_id)
         + "\nGuardrails:\n"
         "- Keep tone aligned to the persona. Light flirtation is allowed only if user-initiated and "
         "never sexual, suggestive, racist, discriminatory, coercive, or demeaning.\n"
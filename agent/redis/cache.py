@@ -1,24 +1,147 @@
 from __future__ import annotations
 
 import asyncio
+import base64
 import json
+import logging
 import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
 from datetime import date, datetime
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from weakref import WeakKeyDictionary
 
 from dotenv import load_dotenv
 
 try:
+    import redis as SyncRedis
     import redis.asyncio as AsyncRedis
 except ImportError:  # pragma: no cover - optional dependency for local dev
+    SyncRedis = None
     AsyncRedis = None
 try:
     from upstash_redis import Redis as UpstashRedis
 except ImportError:  # pragma: no cover - optional dependency for local dev
     UpstashRedis = None
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+from agent.redis.local import LocalRedis, LocalResponseError
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+L1_CACHE_ENABLED = os.getenv("CACHE_L1_ENABLED", "1").lower() not in {"0", "false", "no"}
+L1_CACHE_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "2048"))
+L1_CACHE_TTL_SECONDS = float(os.getenv("CACHE_L1_TTL_SECONDS", "30"))
+# Without pub/sub (Upstash REST) other workers cannot evict us, so stay short.
+L1_CACHE_TTL_NO_PUBSUB_SECONDS = float(os.getenv("CACHE_L1_TTL_NO_PUBSUB_SECONDS", "3"))
+L1_INVALIDATION_CHANNEL = os.getenv("CACHE_L1_CHANNEL", "cache:l1:invalidate")
+
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_POOL_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT_SECONDS = float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", "5"))
+REDIS_ASYNC_POOL_MAX_CONNECTIONS = int(os.getenv("REDIS_ASYNC_POOL_MAX_CONNECTIONS", "50"))
+
+# Used when neither REDIS_URL nor the Upstash variables are set; "0" disables it.
+CACHE_LOCAL_BACKEND = os.getenv("CACHE_LOCAL_BACKEND", "1").lower() not in {"0", "false", "no"}
+CACHE_LOCAL_MAX_BYTES = int(os.getenv("CACHE_LOCAL_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Append-only logs (RPUSH) keep at most this many of their newest entries.
+CACHE_APPEND_MAX_LEN = int(os.getenv("CACHE_APPEND_MAX_LEN", "500"))
+# Tag index sets must outlive the entries they point at; stale members are harmless.
+CACHE_TAG_INDEX_TTL_SECONDS = int(os.getenv("CACHE_TAG_INDEX_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+
+# "json" (orjson when installed) or "msgpack". msgpack keeps non-string dict
+# keys as-is, unlike JSON, so only switch once readers do not rely on that.
+CACHE_CODEC = os.getenv("CACHE_CODEC", "json").lower()
+# "zstd" (falls back to zlib when zstandard is missing), "zlib" or "none".
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zstd").lower()
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+CACHE_ZSTD_LEVEL = int(os.getenv("CACHE_ZSTD_LEVEL", "3"))
+CACHE_ZLIB_LEVEL = int(os.getenv("CACHE_ZLIB_LEVEL", "6"))
+
+# Wire format. Encoded values start with _CODEC_MAGIC and one format byte
+# (serializer | compression); anything else is plain JSON, which is also what
+# older workers wrote. Plain uncompressed JSON is still written without a
+# header so small values stay readable across a rolling deploy. 0xFE never
+# starts valid UTF-8, so it cannot collide with a JSON document.
+_CODEC_MAGIC = b"\xfe"
+_SER_JSON = 0x00
+_SER_MSGPACK = 0x10
+_COMP_NONE = 0x00
+_COMP_ZLIB = 0x01
+_COMP_ZSTD = 0x02
+# Upstash REST only carries text, so binary payloads are base64'd behind this prefix.
+_TEXT_BINARY_PREFIX = "~"
+
+Payload = Union[str, bytes]
+
+
+class _L1Cache:
+    """Bounded in-process TTL/LRU cache of raw Redis payloads.
+
+    Encoded payloads are stored so every read decodes a fresh object; callers
+    are free to mutate what _redis_get_json returns.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, Payload]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Payload]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def set(self, key: str, raw: Payload, ttl_seconds: float) -> None:
+        if ttl_seconds <= 0:
+            self.discard([key])
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+L1_CACHE = _L1Cache(L1_CACHE_MAX_ENTRIES)
+_L1_ORIGIN = uuid.uuid4().hex
+_L1_LISTENER: Optional[threading.Thread] = None
+_L1_LISTENER_LOCK = threading.Lock()
+_ASYNC_CLIENTS: "WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = WeakKeyDictionary()
+
 
 def _json_default(value: Any) -> Any:
     if isinstance(value, (date, datetime)):
@@ -26,60 +149,704 @@ def _json_default(value: Any) -> Any:
     raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
 
 
+def _serialize(value: Any) -> Tuple[int, bytes]:
+    if CACHE_CODEC == "msgpack" and msgpack is not None:
+        return _SER_MSGPACK, msgpack.packb(value, default=_json_default, use_bin_type=True)
+    if orjson is not None:
+        return _SER_JSON, orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return _SER_JSON, json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def _compress(body: bytes) -> Tuple[int, bytes]:
+    if CACHE_COMPRESSION == "none" or len(body) < CACHE_COMPRESS_MIN_BYTES:
+        return _COMP_NONE, body
+    if CACHE_COMPRESSION == "zstd" and zstandard is not None:
+        # Compressor objects are not thread-safe; they are cheap to create.
+        return _COMP_ZSTD, zstandard.ZstdCompressor(level=CACHE_ZSTD_LEVEL).compress(body)
+    return _COMP_ZLIB, zlib.compress(body, CACHE_ZLIB_LEVEL)
+
+
+def _encode_value(value: Any) -> Payload:
+    """Encode a value for the active Redis client (bytes for TCP, text for Upstash)."""
+    serializer, body = _serialize(value)
+    compression, body = _compress(body)
+    if serializer == _SER_JSON and compression == _COMP_NONE:
+        return body if _binary_safe_client() else body.decode("utf-8")
+    payload = _CODEC_MAGIC + bytes([serializer | compression]) + body
+    if _binary_safe_client():
+        return payload
+    return _TEXT_BINARY_PREFIX + base64.b64encode(payload).decode("ascii")
+
+
+def _decode_value(raw: Optional[Payload]) -> Optional[Any]:
+    if not raw:
+        return None
+    try:
+        if isinstance(raw, str):
+            if not raw.startswith(_TEXT_BINARY_PREFIX):
+                return json.loads(raw)
+            raw = base64.b64decode(raw[len(_TEXT_BINARY_PREFIX):])
+        serializer, compression, body = _SER_JSON, _COMP_NONE, raw
+        if raw[:1] == _CODEC_MAGIC:
+            fmt = raw[1]
+            serializer, compression, body = fmt & 0xF0, fmt & 0x0F, raw[2:]
+        if compression == _COMP_ZSTD:
+            if zstandard is None:
+                logger.warning("Cached value is zstd-compressed but zstandard is not installed")
+                return None
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif compression == _COMP_ZLIB:
+            body = zlib.decompress(body)
+        if serializer == _SER_MSGPACK:
+            if msgpack is None:
+                logger.warning("Cached value is msgpack-encoded but msgpack is not installed")
+                return None
+            return msgpack.unpackb(body, raw=False, strict_map_key=False)
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body)
+    except Exception as exc:
+        logger.warning("Failed to decode cached value: %s", exc)
+        return None
+
+
+def _binary_safe_client() -> bool:
+    return isinstance(REDIS, LocalRedis) or _supports_scripts()
+
+
+def _supports_scripts() -> bool:
+    return SyncRedis is not None and isinstance(REDIS, SyncRedis.Redis)
+
+
+_WRONGTYPE_ERRORS: Tuple[type, ...] = (LocalResponseError,) + ((SyncRedis.ResponseError,) if SyncRedis else ())
+
+
 def _redis_client() -> Optional[Any]:
+    """Sync client for threaded callers: pooled redis-py, else Upstash REST, else in-process."""
     tcp_url = os.getenv("REDIS_URL")
-    if tcp_url and AsyncRedis is not None:
-        return AsyncRedis.from_url(tcp_url, decode_responses=True)
-    if UpstashRedis is None:
-        return None
+    if tcp_url and SyncRedis is not None:
+        pool = SyncRedis.BlockingConnectionPool.from_url(
+            tcp_url,
+            max_connections=REDIS_POOL_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT_SECONDS,
+        )
+        return SyncRedis.Redis(connection_pool=pool)
     url = os.getenv("UPSTASH_REDIS_REST_URL")
     token = os.getenv("UPSTASH_REDIS_REST_TOKEN")
-    if not url or not token:
+    if UpstashRedis is not None and url and token:
+        return UpstashRedis(url=url, token=token)
+    if CACHE_LOCAL_BACKEND:
+        logger.info("No Redis configured; using the in-process cache backend")
+        return LocalRedis(CACHE_LOCAL_MAX_BYTES)
+    return None
+
+
+def _async_redis_client() -> Optional[Any]:
+    """Native asyncio client for the running loop, or None to fall back to threads.
+
+    redis.asyncio connections are bound to the loop that created them, so one
+    client (and pool) is kept per loop.
+    """
+    tcp_url = os.getenv("REDIS_URL")
+    if not tcp_url or AsyncRedis is None:
         return None
-    return UpstashRedis(url=url, token=token)
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None:
+        client = AsyncRedis.Redis.from_url(
+            tcp_url,
+            max_connections=REDIS_ASYNC_POOL_MAX_CONNECTIONS,
+        )
+        _ASYNC_CLIENTS[loop] = client
+    return client
+
+
+def _pubsub_url() -> Optional[str]:
+    tcp_url = os.getenv("REDIS_URL")
+    if tcp_url and SyncRedis is not None:
+        return tcp_url
+    return None
+
+
+def _l1_ttl(ttl_seconds: float) -> float:
+    limit = L1_CACHE_TTL_SECONDS if _pubsub_url() else L1_CACHE_TTL_NO_PUBSUB_SECONDS
+    return min(float(ttl_seconds), limit)
+
+
+def _l1_fill(key: str, raw: Payload, pttl_ms: Optional[int]) -> None:
+    """Copy a value read from Redis into L1 without outliving the Redis key.
+
+    ``pttl_ms`` None (not fetched) falls back to the _l1_ttl cap alone.
+    """
+    if pttl_ms is None or int(pttl_ms) == -1:  # -1: key has no expiry
+        ttl_seconds = L1_CACHE_TTL_SECONDS
+    elif int(pttl_ms) > 0:
+        ttl_seconds = min(L1_CACHE_TTL_SECONDS, int(pttl_ms) / 1000)
+    else:
+        return  # expired between GET and PTTL
+    L1_CACHE.set(key, raw, _l1_ttl(ttl_seconds))
+
+
+def _listen_for_invalidations(url: str) -> None:
+    backoff = 1.0
+    while True:
+        try:
+            client = SyncRedis.Redis.from_url(url, decode_responses=True)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(L1_INVALIDATION_CHANNEL)
+            # Anything published while we were disconnected is lost.
+            L1_CACHE.clear()
+            backoff = 1.0
+            for message in pubsub.listen():
+                try:
+                    payload = json.loads(message.get("data") or "{}")
+                except (TypeError, json.JSONDecodeError):
+                    continue
+                if payload.get("o") == _L1_ORIGIN:
+                    continue
+                L1_CACHE.discard(payload.get("k") or [])
+        except Exception as exc:
+            logger.warning("L1 cache invalidation listener error: %s", exc)
+            L1_CACHE.clear()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+def _ensure_l1_listener() -> None:
+    global _L1_LISTENER
+    if _L1_LISTENER is not None or not L1_CACHE_ENABLED:
+        return
+    url = _pubsub_url()
+    if not url:
+        return
+    with _L1_LISTENER_LOCK:
+        if _L1_LISTENER is None:
+            thread = threading.Thread(
+                target=_listen_for_invalidations,
+                args=(url,),
+                name="redis-l1-invalidation",
+                daemon=True,
+            )
+            thread.start()
+            _L1_LISTENER = thread
+
+
+def _invalidation_message(keys: Iterable[str]) -> str:
+    return json.dumps({"o": _L1_ORIGIN, "k": list(keys)})
 
 
-def _run_async(coro):
+def _publish_invalidation(keys: Iterable[str]) -> None:
+    if not _pubsub_url() or not L1_CACHE_ENABLED:
+        return
+    try:
+        REDIS.publish(L1_INVALIDATION_CHANNEL, _invalidation_message(keys))
+    except Exception as exc:
+        logger.warning("L1 cache invalidation publish failed: %s", exc)
+
+
+async def _apublish_invalidation(client: Any, keys: Iterable[str]) -> None:
+    if not L1_CACHE_ENABLED:
+        return
     try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        return asyncio.run(coro)
-    return loop.run_until_complete(coro)
+        await client.publish(L1_INVALIDATION_CHANNEL, _invalidation_message(keys))
+    except Exception as exc:
+        logger.warning("L1 cache invalidation publish failed: %s", exc)
 
 
 def _redis_get_json(key: str) -> Optional[Any]:
     if not REDIS:
         return None
-    if AsyncRedis and isinstance(REDIS, AsyncRedis.Redis):
-        raw = _run_async(REDIS.get(key))
-    else:
-        raw = REDIS.get(key)
-    if not raw:
-        return None
-    try:
-        return json.loads(raw)
-    except json.JSONDecodeError:
-        return None
+    if not L1_CACHE_ENABLED:
+        return _decode_value(REDIS.get(key))
+    raw = L1_CACHE.get(key)
+    if raw is None:
+        _ensure_l1_listener()
+        if _binary_safe_client():
+            pipe = REDIS.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            raw, pttl_ms = pipe.execute()
+        else:
+            # REST clients: one request per call, and _l1_ttl already caps L1
+            # at L1_CACHE_TTL_NO_PUBSUB_SECONDS, so skip the PTTL lookup.
+            raw = REDIS.get(key)
+            pttl_ms = None
+        if not raw:
+            return None
+        _l1_fill(key, raw, pttl_ms)
+    return _decode_value(raw)
 
 
-def _redis_set_json(key: str, value: Any, ttl_seconds: int) -> None:
+def _tag_index_key(tag: str) -> str:
+    return f"tagidx:{tag}"
+
+
+def _tag_generation_key(tag: str) -> str:
+    return f"taggen:{tag}"
+
+
+def _redis_set_json(key: str, value: Any, ttl_seconds: int, tags: Sequence[str] = ()) -> None:
+    """SETEX a value; ``tags`` register the key for _redis_invalidate."""
     if not REDIS:
         return
-    payload = json.dumps(value, default=_json_default)
-    if AsyncRedis and isinstance(REDIS, AsyncRedis.Redis):
-        _run_async(REDIS.setex(key, ttl_seconds, payload))
+    payload = _encode_value(value)
+    if tags and _binary_safe_client():
+        pipe = REDIS.pipeline(transaction=False)
+        pipe.setex(key, ttl_seconds, payload)
+        for tag in tags:
+            pipe.sadd(_tag_index_key(tag), key)
+            pipe.expire(_tag_index_key(tag), max(ttl_seconds, CACHE_TAG_INDEX_TTL_SECONDS))
+        pipe.execute()
     else:
         REDIS.setex(key, ttl_seconds, payload)
+        for tag in tags:
+            REDIS.sadd(_tag_index_key(tag), key)
+            REDIS.expire(_tag_index_key(tag), max(ttl_seconds, CACHE_TAG_INDEX_TTL_SECONDS))
+    if L1_CACHE_ENABLED:
+        L1_CACHE.set(key, payload, _l1_ttl(ttl_seconds))
+        _publish_invalidation([key])
 
 
 def _redis_delete(key: str) -> None:
     if not REDIS:
         return
-    if AsyncRedis and isinstance(REDIS, AsyncRedis.Redis):
-        _run_async(REDIS.delete(key))
+    if L1_CACHE_ENABLED:
+        L1_CACHE.discard([key])
+    REDIS.delete(key)
+    if L1_CACHE_ENABLED:
+        _publish_invalidation([key])
+
+
+# KEYS[1..ARGV[1]] are plain keys, the rest are tag index sets whose members
+# are deleted along with the index. Returns every data key that was targeted.
+# KEYS: plain keys, tag index keys, tag generation keys (one per index key).
+# ARGV: number of plain keys, number of tags, generation TTL.
+_INVALIDATE_SCRIPT = """
+local plain = tonumber(ARGV[1])
+local tags = tonumber(ARGV[2])
+local targeted = {}
+for i = 1, plain + tags do
+    local key = KEYS[i]
+    if i <= plain then
+        targeted[#targeted + 1] = key
+        redis.call('del', key)
+    else
+        for _, member in ipairs(redis.call('smembers', key)) do
+            targeted[#targeted + 1] = member
+            redis.call('del', member)
+        end
+        redis.call('del', key)
+        local generation = KEYS[i + tags]
+        redis.call('incr', generation)
+        redis.call('expire', generation, ARGV[3])
+    end
+end
+return targeted
+"""
+
+# Compare-and-set for values computed from tagged data: store only if no
+# invalidation bumped a tag generation since the caller read them.
+# KEYS: target, generation keys, tag index keys.
+# ARGV: payload, ttl, index ttl, number of generations, expected generations.
+_SET_IF_CURRENT_SCRIPT = """
+local count = tonumber(ARGV[4])
+for i = 1, count do
+    if (redis.call('get', KEYS[1 + i]) or '') ~= ARGV[4 + i] then
+        return 0
+    end
+end
+redis.call('setex', KEYS[1], ARGV[2], ARGV[1])
+for i = 2 + count, #KEYS do
+    redis.call('sadd', KEYS[i], KEYS[1])
+    redis.call('expire', KEYS[i], ARGV[3])
+end
+return 1
+"""
+
+
+def _invalidate_script_args(keys: Sequence[str], tags: Sequence[str]) -> List[Any]:
+    index_keys = [_tag_index_key(tag) for tag in tags]
+    generation_keys = [_tag_generation_key(tag) for tag in tags]
+    return [
+        len(keys) + 2 * len(tags),
+        *keys,
+        *index_keys,
+        *generation_keys,
+        len(keys),
+        len(tags),
+        CACHE_TAG_INDEX_TTL_SECONDS,
+    ]
+
+
+def _redis_invalidate(keys: Sequence[str], tags: Sequence[str] = ()) -> None:
+    """Delete ``keys`` plus every key registered under ``tags`` in one round trip."""
+    if not REDIS or not (keys or tags):
+        return
+    if _supports_scripts():
+        targeted = REDIS.eval(_INVALIDATE_SCRIPT, *_invalidate_script_args(keys, tags))
     else:
+        index_keys = [_tag_index_key(tag) for tag in tags]
+        targeted = list(keys)
+        for index_key in index_keys:
+            targeted.extend(REDIS.smembers(index_key) or [])
+        REDIS.delete(*targeted, *index_keys)
+        for tag in tags:
+            REDIS.incr(_tag_generation_key(tag))
+            REDIS.expire(_tag_generation_key(tag), CACHE_TAG_INDEX_TTL_SECONDS)
+    _discard_l1(targeted or [])
+
+
+def _redis_tag_generations(tags: Sequence[str]) -> List[Any]:
+    """Current invalidation generation of each tag; pass to _redis_set_json_if_current."""
+    if not REDIS or not tags:
+        return []
+    return [raw or b"" for raw in REDIS.mget(*[_tag_generation_key(tag) for tag in tags])]
+
+
+def _generation_values(generations: Sequence[Any]) -> List[str]:
+    return [value.decode("utf-8") if isinstance(value, bytes) else str(value) for value in generations]
+
+
+def _redis_set_json_if_current(
+    key: str, value: Any, ttl_seconds: int, tags: Sequence[str], generations: Sequence[Any]
+) -> bool:
+    """SETEX like _redis_set_json unless a tag was invalidated after ``generations`` was read.
+
+    Atomic on redis-py; other clients re-check the generations before the
+    write, which leaves only a one-round-trip window.
+    """
+    if not REDIS:
+        return False
+    if not tags:
+        _redis_set_json(key, value, ttl_seconds)
+        return True
+    if not _supports_scripts():
+        if _generation_values(_redis_tag_generations(tags)) != _generation_values(generations):
+            return False
+        _redis_set_json(key, value, ttl_seconds, tags=tags)
+        return True
+    payload = _encode_value(value)
+    stored = REDIS.eval(
+        _SET_IF_CURRENT_SCRIPT,
+        1 + 2 * len(tags),
+        key,
+        *[_tag_generation_key(tag) for tag in tags],
+        *[_tag_index_key(tag) for tag in tags],
+        payload,
+        ttl_seconds,
+        max(ttl_seconds, CACHE_TAG_INDEX_TTL_SECONDS),
+        len(tags),
+        *generations,
+    )
+    if not stored:
+        return False
+    if L1_CACHE_ENABLED:
+        L1_CACHE.set(key, payload, _l1_ttl(ttl_seconds))
+        _publish_invalidation([key])
+    return True
+
+
+def _discard_l1(keys: Iterable[Payload]) -> None:
+    if not L1_CACHE_ENABLED:
+        return
+    names = [key.decode("utf-8") if isinstance(key, bytes) else key for key in keys]
+    if names:
+        L1_CACHE.discard(names)
+        _publish_invalidation(names)
+
+
+def _redis_append_json(key: str, item: Any, ttl_seconds: int, max_len: int = CACHE_APPEND_MAX_LEN) -> None:
+    """Append ``item`` to a capped per-key log in one round trip.
+
+    Redis lists via RPUSH + LTRIM + EXPIRE; the Upstash REST client keeps the
+    older JSON-array read-modify-write. Keys still holding a JSON array from
+    before are converted on first append.
+    """
+    if not REDIS:
+        return
+    if not _binary_safe_client():
+        items = _decode_value(REDIS.get(key))
+        items = items if isinstance(items, list) else []
+        items.append(item)
+        REDIS.setex(key, ttl_seconds, _encode_value(items[-max_len:]))
+        return
+    payload = _encode_value(item)
+    try:
+        _rpush_capped(key, [payload], ttl_seconds, max_len)
+    except _WRONGTYPE_ERRORS as exc:
+        if "WRONGTYPE" not in str(exc):
+            raise
+        legacy = _decode_value(REDIS.get(key))
+        entries = [_encode_value(entry) for entry in legacy] if isinstance(legacy, list) else []
         REDIS.delete(key)
+        _rpush_capped(key, entries + [payload], ttl_seconds, max_len)
+    if L1_CACHE_ENABLED:
+        L1_CACHE.discard([key])
+
+
+def _rpush_capped(key: str, payloads: List[Payload], ttl_seconds: int, max_len: int) -> None:
+    pipe = REDIS.pipeline(transaction=False)
+    pipe.rpush(key, *payloads)
+    pipe.ltrim(key, -max_len, -1)
+    pipe.expire(key, ttl_seconds)
+    pipe.execute()
+
+
+def _redis_mget_json(keys: Sequence[str]) -> List[Optional[Any]]:
+    """Fetch several keys with one MGET; L1 hits are not sent to Redis."""
+    if not REDIS or not keys:
+        return [None] * len(keys)
+    raws: List[Optional[Payload]] = [L1_CACHE.get(key) if L1_CACHE_ENABLED else None for key in keys]
+    missing = [idx for idx, raw in enumerate(raws) if raw is None]
+    if missing:
+        _ensure_l1_listener()
+        names = [keys[idx] for idx in missing]
+        pttls: List[Optional[int]] = [None] * len(names)
+        if L1_CACHE_ENABLED and _binary_safe_client():
+            pipe = REDIS.pipeline(transaction=False)
+            pipe.mget(*names)
+            for name in names:
+                pipe.pttl(name)
+            fetched, *pttls = pipe.execute()
+        else:
+            fetched = REDIS.mget(*names)
+        for pos, (idx, raw) in enumerate(zip(missing, fetched or [])):
+            if not raw:
+                continue
+            raws[idx] = raw
+            if L1_CACHE_ENABLED:
+                _l1_fill(keys[idx], raw, pttls[pos])
+    return [_decode_value(raw) for raw in raws]
+
+
+def _redis_set_many_json(items: Iterable[Tuple[str, Any, int]]) -> None:
+    """SETEX several (key, value, ttl_seconds) entries in one pipelined round-trip."""
+    if not REDIS:
+        return
+    # The same object is often written under several keys; encode it once.
+    encoded: Dict[int, Payload] = {}
+    payloads = []
+    for key, value, ttl in items:
+        if id(value) not in encoded:
+            encoded[id(value)] = _encode_value(value)
+        payloads.append((key, encoded[id(value)], ttl))
+    if not payloads:
+        return
+    if _binary_safe_client():
+        pipe = REDIS.pipeline(transaction=False)
+        for key, payload, ttl in payloads:
+            pipe.setex(key, ttl, payload)
+        pipe.execute()
+    else:
+        for key, payload, ttl in payloads:
+            REDIS.setex(key, ttl, payload)
+    if L1_CACHE_ENABLED:
+        for key, payload, ttl in payloads:
+            L1_CACHE.set(key, payload, _l1_ttl(ttl))
+        _publish_invalidation([key for key, _, _ in payloads])
+
+
+async def _aredis_get_json(key: str) -> Optional[Any]:
+    """Async variant of _redis_get_json for `async def` callers."""
+    if not REDIS:
+        return None
+    client = _async_redis_client()
+    if client is None:
+        return await _offload(_redis_get_json, key)
+    if not L1_CACHE_ENABLED:
+        return _decode_value(await client.get(key))
+    raw = L1_CACHE.get(key)
+    if raw is None:
+        _ensure_l1_listener()
+        pipe = client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        raw, pttl_ms = await pipe.execute()
+        if not raw:
+            return None
+        _l1_fill(key, raw, pttl_ms)
+    return _decode_value(raw)
+
+
+async def _aredis_set_json(key: str, value: Any, ttl_seconds: int, tags: Sequence[str] = ()) -> None:
+    if not REDIS:
+        return
+    client = _async_redis_client()
+    if client is None:
+        await _offload(_redis_set_json, key, value, ttl_seconds, tags)
+        return
+    payload = _encode_value(value)
+    pipe = client.pipeline(transaction=False)
+    pipe.setex(key, ttl_seconds, payload)
+    for tag in tags:
+        pipe.sadd(_tag_index_key(tag), key)
+        pipe.expire(_tag_index_key(tag), max(ttl_seconds, CACHE_TAG_INDEX_TTL_SECONDS))
+    await pipe.execute()
+    if L1_CACHE_ENABLED:
+        L1_CACHE.set(key, payload, _l1_ttl(ttl_seconds))
+        await _apublish_invalidation(client, [key])
+
+
+async def _aredis_delete(key: str) -> None:
+    if not REDIS:
+        return
+    client = _async_redis_client()
+    if client is None:
+        await _offload(_redis_delete, key)
+        return
+    if L1_CACHE_ENABLED:
+        L1_CACHE.discard([key])
+    await client.delete(key)
+    if L1_CACHE_ENABLED:
+        await _apublish_invalidation(client, [key])
+
+
+async def _aredis_invalidate(keys: Sequence[str], tags: Sequence[str] = ()) -> None:
+    if not REDIS or not (keys or tags):
+        return
+    client = _async_redis_client()
+    if client is None:
+        await _offload(_redis_invalidate, keys, tags)
+        return
+    targeted = await client.eval(_INVALIDATE_SCRIPT, *_invalidate_script_args(keys, tags))
+    if L1_CACHE_ENABLED and targeted:
+        names = [key.decode("utf-8") if isinstance(key, bytes) else key for key in targeted]
+        L1_CACHE.discard(names)
+        await _apublish_invalidation(client, names)
+
+
+async def _aredis_tag_generations(tags: Sequence[str]) -> List[Any]:
+    if not REDIS or not tags:
+        return []
+    client = _async_redis_client()
+    if client is None:
+        return await _offload(_redis_tag_generations, tags)
+    return [raw or b"" for raw in await client.mget(*[_tag_generation_key(tag) for tag in tags])]
+
+
+async def _aredis_set_json_if_current(
+    key: str, value: Any, ttl_seconds: int, tags: Sequence[str], generations: Sequence[Any]
+) -> bool:
+    if not REDIS:
+        return False
+    client = _async_redis_client()
+    if client is None:
+        return await _offload(_redis_set_json_if_current, key, value, ttl_seconds, tags, generations)
+    if not tags:
+        await _aredis_set_json(key, value, ttl_seconds)
+        return True
+    payload = _encode_value(value)
+    stored = await client.eval(
+        _SET_IF_CURRENT_SCRIPT,
+        1 + 2 * len(tags),
+        key,
+        *[_tag_generation_key(tag) for tag in tags],
+        *[_tag_index_key(tag) for tag in tags],
+        payload,
+        ttl_seconds,
+        max(ttl_seconds, CACHE_TAG_INDEX_TTL_SECONDS),
+        len(tags),
+        *generations,
+    )
+    if not stored:
+        return False
+    if L1_CACHE_ENABLED:
+        L1_CACHE.set(key, payload, _l1_ttl(ttl_seconds))
+        await _apublish_invalidation(client, [key])
+    return True
+
+
+# Deletes the lease only if we still own it, so a slow holder whose lease
+# expired cannot release someone else's.
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _redis_acquire_lease(key: str, ttl_seconds: int) -> Optional[str]:
+    """SET NX EX a random token; return it if acquired, None if someone else holds the lease.
+
+    Without Redis there is nobody to coordinate with, so the lease is always granted.
+    """
+    token = uuid.uuid4().hex
+    if not REDIS:
+        return token
+    try:
+        acquired = REDIS.set(key, token, nx=True, ex=ttl_seconds)
+    except Exception as exc:
+        logger.warning("Lease acquire failed for %s: %s", key, exc)
+        return token
+    return token if acquired else None
+
+
+def _redis_release_lease(key: str, token: str) -> None:
+    if not REDIS:
+        return
+    try:
+        if _supports_scripts():
+            REDIS.eval(_RELEASE_LEASE_SCRIPT, 1, key, token)
+        elif REDIS.get(key) == token:
+            # Upstash REST / local backend: not atomic, but the lease TTL bounds any overlap.
+            REDIS.delete(key)
+    except Exception as exc:
+        logger.warning("Lease release failed for %s: %s", key, exc)
+
+
+def _redis_lease_held(key: str) -> bool:
+    if not REDIS:
+        return False
+    try:
+        return bool(REDIS.exists(key))
+    except Exception:
+        return False
+
+
+async def _aredis_acquire_lease(key: str, ttl_seconds: int) -> Optional[str]:
+    client = _async_redis_client() if REDIS else None
+    if client is None:
+        return await _offload(_redis_acquire_lease, key, ttl_seconds)
+    token = uuid.uuid4().hex
+    try:
+        acquired = await client.set(key, token, nx=True, ex=ttl_seconds)
+    except Exception as exc:
+        logger.warning("Lease acquire failed for %s: %s", key, exc)
+        return token
+    return token if acquired else None
+
+
+async def _aredis_release_lease(key: str, token: str) -> None:
+    client = _async_redis_client() if REDIS else None
+    if client is None:
+        await _offload(_redis_release_lease, key, token)
+        return
+    try:
+        await client.eval(_RELEASE_LEASE_SCRIPT, 1, key, token)
+    except Exception as exc:
+        logger.warning("Lease release failed for %s: %s", key, exc)
+
+
+async def _aredis_lease_held(key: str) -> bool:
+    client = _async_redis_client() if REDIS else None
+    if client is None:
+        return await _offload(_redis_lease_held, key)
+    try:
+        return bool(await client.exists(key))
+    except Exception:
+        return False
+
+
+async def _offload(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a sync cache call from async code; the in-process backend never blocks."""
+    if isinstance(REDIS, LocalRedis):
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
 
 
 REDIS = _redis_client()
+if isinstance(REDIS, LocalRedis):
+    # The backend already lives in this process; an L1 in front of it only duplicates memory.
+    L1_CACHE_ENABLED = False
 
@@ -0,0 +1,87 @@
+"""Declarative cache invalidation.
+
+Writers say which data they touched (``invalidate(user_id, "meals", day=...)``)
+instead of deleting keys by hand. Two kinds of dependents are dropped, in a
+single round trip:
+
+- fixed per-user keys listed in ``DEPENDENT_KEYS`` for each touched domain;
+- keys cached with ``tags=`` (see ``cache_tags``), found through the tag
+  index, which covers composite keys such as ``daily_intake:{id}:{day}``.
+
+Tags look like ``user:{id}:meals`` or ``user:{id}:day:{date}``.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from agent.redis.cache import _aredis_invalidate, _redis_invalidate
+
+KeyBuilder = Callable[[int], str]
+
+# Fixed per-user keys derived from each domain. Draft keys are write-through
+# state owned by their writers and are not listed here.
+DEPENDENT_KEYS: Dict[str, Tuple[KeyBuilder, ...]] = {
+    "meals": (
+        lambda user_id: f"user:{user_id}:meal_logs",
+        lambda user_id: f"session_hydration:{user_id}",
+    ),
+    "workouts": (
+        lambda user_id: "workout:latest",
+        lambda user_id: f"session_hydration:{user_id}",
+    ),
+    "checkins": (lambda user_id: f"session_hydration:{user_id}",),
+    "health_activity": (lambda user_id: f"session_hydration:{user_id}",),
+    "reminders": (lambda user_id: f"session_hydration:{user_id}",),
+    "plan": (
+        lambda user_id: f"active_plan:{user_id}",
+        lambda user_id: f"user:{user_id}:active_plan",
+    ),
+    "profile": (lambda user_id: f"session_hydration:{user_id}",),
+}
+
+
+def domain_tag(user_id: int, domain: str) -> str:
+    if domain not in DEPENDENT_KEYS:
+        raise ValueError(f"Unknown cache domain: {domain}")
+    return f"user:{user_id}:{domain}"
+
+
+def day_tag(user_id: int, day: str) -> str:
+    return f"user:{user_id}:day:{day[:10]}"
+
+
+def cache_tags(user_id: int, *domains: str, day: Optional[str] = None) -> List[str]:
+    """Tags for a cached read that depends on ``domains`` (and on ``day``, if given)."""
+    tags = [domain_tag(user_id, domain) for domain in domains]
+    if day:
+        tags.append(day_tag(user_id, day))
+    return tags
+
+
+def _plan_invalidation(
+    user_id: int,
+    domains: Sequence[str],
+    day: Optional[str],
+    keys: Sequence[str],
+) -> Tuple[List[str], List[str]]:
+    targeted = list(keys)
+    for domain in domains:
+        for build in DEPENDENT_KEYS[domain]:
+            key = build(user_id)
+            if key not in targeted:
+                targeted.append(key)
+    return targeted, cache_tags(user_id, *domains, day=day)
+
+
+def invalidate(user_id: int, *domains: str, day: Optional[str] = None, keys: Sequence[str] = ()) -> None:
+    """Drop every cache entry that depends on ``domains`` for this user.
+
+    ``day`` also drops entries tagged for that date; ``keys`` are extra keys
+    (usually the writer's own draft) deleted in the same call.
+    """
+    _redis_invalidate(*_plan_invalidation(user_id, domains, day, keys))
+
+
+async def ainvalidate(user_id: int, *domains: str, day: Optional[str] = None, keys: Sequence[str] = ()) -> None:
+    await _aredis_invalidate(*_plan_invalidation(user_id, domains, day, keys))
@@ -0,0 +1,249 @@
+"""In-process stand-in for Redis when no server is configured.
+
+Implements the subset of the redis-py client that agent.redis.cache uses
+(strings with TTL, sets, lists, pipelines) so dev, CI and single-node setups
+keep draft caching, idempotency keys and leases without a Redis server. State
+is per process: with several workers each one has its own copy.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class LocalResponseError(Exception):
+    """Mirrors redis.ResponseError (e.g. WRONGTYPE) for the local backend."""
+
+
+_WRONGTYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+# Rough per-key bookkeeping cost used for the memory budget.
+_KEY_OVERHEAD_BYTES = 64
+
+
+def _sizeof(value: Any) -> int:
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, (list, set)):
+        return sum(_sizeof(item) for item in value)
+    return len(str(value))
+
+
+class LocalRedis:
+    """Thread-safe TTL store with LRU eviction once ``max_bytes`` is exceeded."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max(1, max_bytes)
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._used_bytes = 0
+        self._lock = threading.RLock()
+
+    # -- internals -----------------------------------------------------------
+
+    def _live(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _typed(self, key: str, kind: Any) -> Optional[Any]:
+        value = self._live(key)
+        if value is not None and not isinstance(value, kind):
+            raise LocalResponseError(_WRONGTYPE)
+        return value
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        self._remove(key)
+        size = _sizeof(value) + len(key) + _KEY_OVERHEAD_BYTES
+        self._entries[key] = (expires_at, value)
+        self._sizes[key] = size
+        self._used_bytes += size
+        self._evict()
+
+    def _resize(self, key: str) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        size = _sizeof(entry[1]) + len(key) + _KEY_OVERHEAD_BYTES
+        self._used_bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._evict()
+
+    def _remove(self, key: str) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        self._used_bytes -= self._sizes.pop(key, 0)
+        return True
+
+    def _evict(self) -> None:
+        while self._used_bytes > self._max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    # -- strings -------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._typed(key, (bytes, str))
+
+    def mget(self, *keys: str) -> List[Optional[Any]]:
+        with self._lock:
+            values = []
+            for key in keys:
+                value = self._live(key)
+                values.append(value if isinstance(value, (bytes, str)) else None)
+            return values
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+        xx: bool = False,
+    ) -> Optional[bool]:
+        with self._lock:
+            exists = self._live(key) is not None
+            if (nx and exists) or (xx and not exists):
+                return None
+            ttl = ex if ex is not None else (px / 1000.0 if px is not None else None)
+            self._store(key, value, time.monotonic() + ttl if ttl is not None else None)
+            return True
+
+    def setex(self, key: str, ttl_seconds: int, value: Any) -> bool:
+        return bool(self.set(key, value, ex=ttl_seconds))
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            current = self._typed(key, (bytes, str))
+            try:
+                value = int(current or 0) + 1
+            except ValueError:
+                raise LocalResponseError("ERR value is not an integer or out of range") from None
+            expires_at = entry[0] if entry is not None and current is not None else None
+            self._store(key, str(value).encode("utf-8"), expires_at)
+            return value
+
+    # -- keys ----------------------------------------------------------------
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._live(key) is not None and self._remove(key))
+
+    def exists(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._live(key) is not None)
+
+    def expire(self, key: str, ttl_seconds: int) -> bool:
+        with self._lock:
+            value = self._live(key)
+            if value is None:
+                return False
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            return True
+
+    # -- sets ----------------------------------------------------------------
+
+    def sadd(self, key: str, *members: Any) -> int:
+        with self._lock:
+            current = self._typed(key, set)
+            if current is None:
+                current = set()
+                self._store(key, current, None)
+            added = len(set(members) - current)
+            current.update(members)
+            self._resize(key)
+            return added
+
+    def smembers(self, key: str) -> set:
+        with self._lock:
+            return set(self._typed(key, set) or ())
+
+    # -- lists ---------------------------------------------------------------
+
+    def rpush(self, key: str, *values: Any) -> int:
+        with self._lock:
+            current = self._typed(key, list)
+            if current is None:
+                current = []
+                self._store(key, current, None)
+            current.extend(values)
+            self._resize(key)
+            return len(current)
+
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        with self._lock:
+            current = self._typed(key, list)
+            if current is None:
+                return True
+            current[:] = current[_redis_slice(len(current), start, end)]
+            if not current:
+                self._remove(key)
+            else:
+                self._resize(key)
+            return True
+
+    def lrange(self, key: str, start: int, end: int) -> List[Any]:
+        with self._lock:
+            current = self._typed(key, list) or []
+            return list(current[_redis_slice(len(current), start, end)])
+
+    # -- misc ----------------------------------------------------------------
+
+    def publish(self, channel: str, message: Any) -> int:
+        # No other processes share this store, so there is nobody to notify.
+        return 0
+
+    def pipeline(self, transaction: bool = False) -> "LocalPipeline":
+        return LocalPipeline(self)
+
+
+def _redis_slice(length: int, start: int, end: int) -> slice:
+    """Translate Redis inclusive (possibly negative) indexes to a Python slice."""
+    if start < 0:
+        start = max(0, length + start)
+    if end < 0:
+        end = length + end
+    return slice(start, max(start, end + 1))
+
+
+class LocalPipeline:
+    """Queues commands and runs them under the store lock on execute()."""
+
+    def __init__(self, store: LocalRedis) -> None:
+        self._store = store
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if not hasattr(self._store, name):
+            raise AttributeError(name)
+
+        def queue(*args: Any, **kwargs: Any) -> "LocalPipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> List[Any]:
+        results: List[Any] = []
+        with self._store._lock:
+            for name, args, kwargs in self._commands:
+                results.append(getattr(self._store, name)(*args, **kwargs))
+        self._commands = []
+        return results
+
+    def __enter__(self) -> "LocalPipeline":
+        return self
+
+    def __exit__(self, *exc_info: Iterable[Any]) -> None:
+        self._commands = []
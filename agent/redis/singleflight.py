@@ -0,0 +1,159 @@
+"""Request coalescing for expensive cache-miss rebuilds.
+
+``single_flight`` lets one caller per key in this process run the loader while
+concurrent callers wait for its result. Across workers the leader also takes a
+short Redis lease; workers that lose the race poll the cache instead of running
+the same queries. If the lease holder dies or is slow, waiters give up after
+``SINGLE_FLIGHT_WAIT_SECONDS`` and load for themselves.
+
+Loaders are expected to write the cache themselves; ``recheck`` reads it back
+and returns a falsy value on a miss.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from weakref import WeakKeyDictionary
+
+from agent.redis.cache import (
+    _aredis_acquire_lease,
+    _aredis_lease_held,
+    _aredis_release_lease,
+    _redis_acquire_lease,
+    _redis_lease_held,
+    _redis_release_lease,
+)
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.getenv("SINGLE_FLIGHT_LEASE_SECONDS", "10"))
+SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv("SINGLE_FLIGHT_WAIT_SECONDS", "5"))
+SINGLE_FLIGHT_POLL_SECONDS = float(os.getenv("SINGLE_FLIGHT_POLL_SECONDS", "0.05"))
+
+# Result placeholder when the leader raised; waiters then load for themselves.
+_FAILED = object()
+
+
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = _FAILED
+
+
+_FLIGHTS: Dict[str, _Flight] = {}
+_FLIGHTS_LOCK = threading.Lock()
+_ASYNC_FLIGHTS: "WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Future]]" = WeakKeyDictionary()
+
+
+def _lease_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+def single_flight(
+    key: str,
+    load: Callable[[], T],
+    recheck: Optional[Callable[[], Optional[T]]] = None,
+) -> T:
+    """Run ``load`` once per ``key`` across concurrent callers.
+
+    Waiters get a deep copy of the leader's result, so callers may mutate what
+    they receive just like a fresh cache read.
+    """
+    with _FLIGHTS_LOCK:
+        flight = _FLIGHTS.get(key)
+        is_leader = flight is None
+        if is_leader:
+            flight = _FLIGHTS[key] = _Flight()
+    if not is_leader:
+        if flight.done.wait(SINGLE_FLIGHT_WAIT_SECONDS) and flight.result is not _FAILED:
+            return copy.deepcopy(flight.result)
+        return load()
+    try:
+        flight.result = _load_with_lease(key, load, recheck)
+        return flight.result
+    finally:
+        with _FLIGHTS_LOCK:
+            _FLIGHTS.pop(key, None)
+        flight.done.set()
+
+
+def _load_with_lease(key: str, load: Callable[[], T], recheck: Optional[Callable[[], Optional[T]]]) -> T:
+    if recheck is None:
+        return load()
+    lease_key = _lease_key(key)
+    token = _redis_acquire_lease(lease_key, SINGLE_FLIGHT_LEASE_SECONDS)
+    if token is not None:
+        try:
+            # Another worker may have finished between our miss and the lease.
+            return recheck() or load()
+        finally:
+            _redis_release_lease(lease_key, token)
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+        cached = recheck()
+        if cached:
+            return cached
+        if not _redis_lease_held(lease_key):
+            break
+    return load()
+
+
+async def asingle_flight(
+    key: str,
+    load: Callable[[], Awaitable[T]],
+    recheck: Optional[Callable[[], Awaitable[Optional[T]]]] = None,
+) -> T:
+    """Async variant of single_flight; coalesces callers on the running loop."""
+    loop = asyncio.get_running_loop()
+    flights = _ASYNC_FLIGHTS.setdefault(loop, {})
+    pending = flights.get(key)
+    if pending is not None:
+        try:
+            result = await asyncio.wait_for(asyncio.shield(pending), SINGLE_FLIGHT_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            result = _FAILED
+        if result is not _FAILED:
+            return copy.deepcopy(result)
+        return await load()
+    future = loop.create_future()
+    flights[key] = future
+    result = _FAILED
+    try:
+        result = await _aload_with_lease(key, load, recheck)
+        return result
+    finally:
+        flights.pop(key, None)
+        future.set_result(result)
+
+
+async def _aload_with_lease(
+    key: str,
+    load: Callable[[], Awaitable[T]],
+    recheck: Optional[Callable[[], Awaitable[Optional[T]]]],
+) -> T:
+    if recheck is None:
+        return await load()
+    lease_key = _lease_key(key)
+    token = await _aredis_acquire_lease(lease_key, SINGLE_FLIGHT_LEASE_SECONDS)
+    if token is not None:
+        try:
+            return await recheck() or await load()
+        finally:
+            await _aredis_release_lease(lease_key, token)
+    deadline = time.monotonic() + SINGLE_FLIGHT_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+        cached = await recheck()
+        if cached:
+            return cached
+        if not await _aredis_lease_held(lease_key):
+            break
+    return await load()
@@ -0,0 +1,165 @@
+"""Stale-while-revalidate reads for expensive composite responses.
+
+Values are stored as ``{"v": value, "t": written_at}`` with ``hard_ttl`` as
+the Redis expiry. Inside ``soft_ttl`` a hit is returned as-is. Past it the
+stale value is still returned immediately and one background refresh starts
+(once per process, and once across workers via a Redis lease). Only a miss
+blocks, and concurrent misses are coalesced with single_flight.
+
+Pass ``tags`` (see agent.redis.invalidation.cache_tags) so writes drop the
+entry outright instead of waiting for a refresh. Each invalidation also bumps
+the tags' generation counters; a load or refresh reads them before computing
+and skips its write if they moved, so a value computed from pre-write data is
+never stored after the write dropped the entry.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set
+
+from agent.redis.cache import (
+    _aredis_acquire_lease,
+    _aredis_get_json,
+    _aredis_release_lease,
+    _aredis_set_json_if_current,
+    _aredis_tag_generations,
+    _redis_acquire_lease,
+    _redis_get_json,
+    _redis_release_lease,
+    _redis_set_json_if_current,
+    _redis_tag_generations,
+)
+from agent.redis.singleflight import SINGLE_FLIGHT_LEASE_SECONDS, asingle_flight, single_flight
+
+logger = logging.getLogger(__name__)
+
+SWR_REFRESH_WORKERS = int(os.getenv("SWR_REFRESH_WORKERS", "4"))
+
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=SWR_REFRESH_WORKERS, thread_name_prefix="swr-refresh")
+_REFRESHING: Set[str] = set()
+_REFRESHING_LOCK = threading.Lock()
+# Strong references so pending refresh tasks are not garbage collected.
+_BACKGROUND_TASKS: Set[asyncio.Task] = set()
+
+
+def _envelope(value: Any) -> Dict[str, Any]:
+    return {"v": value, "t": time.time()}
+
+
+def _valid_envelope(raw: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(raw, dict) and "v" in raw and isinstance(raw.get("t"), (int, float)):
+        return raw
+    return None
+
+
+def _is_stale(envelope: Dict[str, Any], soft_ttl: float) -> bool:
+    return time.time() - float(envelope["t"]) >= soft_ttl
+
+
+def _claim_refresh(key: str) -> bool:
+    with _REFRESHING_LOCK:
+        if key in _REFRESHING:
+            return False
+        _REFRESHING.add(key)
+        return True
+
+
+def _release_refresh(key: str) -> None:
+    with _REFRESHING_LOCK:
+        _REFRESHING.discard(key)
+
+
+def swr_get(
+    key: str,
+    compute: Callable[[], Any],
+    *,
+    soft_ttl: float,
+    hard_ttl: int,
+    tags: Sequence[str] = (),
+) -> Any:
+    """Return the cached value for ``key``, refreshing it in the background once stale."""
+    envelope = _valid_envelope(_redis_get_json(key))
+    if envelope is not None:
+        if _is_stale(envelope, soft_ttl) and _claim_refresh(key):
+            try:
+                _REFRESH_POOL.submit(_refresh, key, compute, hard_ttl, tags)
+            except RuntimeError:
+                _release_refresh(key)
+        return envelope["v"]
+
+    def _load() -> Dict[str, Any]:
+        generations = _redis_tag_generations(tags)
+        fresh = _envelope(compute())
+        _redis_set_json_if_current(key, fresh, hard_ttl, tags, generations)
+        return fresh
+
+    return single_flight(key, _load, recheck=lambda: _valid_envelope(_redis_get_json(key)))["v"]
+
+
+def _refresh(key: str, compute: Callable[[], Any], hard_ttl: int, tags: Sequence[str]) -> None:
+    lease_key = f"lock:swr:{key}"
+    try:
+        token = _redis_acquire_lease(lease_key, SINGLE_FLIGHT_LEASE_SECONDS)
+        if token is None:
+            return  # Another worker is already refreshing this key.
+        try:
+            generations = _redis_tag_generations(tags)
+            _redis_set_json_if_current(key, _envelope(compute()), hard_ttl, tags, generations)
+        finally:
+            _redis_release_lease(lease_key, token)
+    except Exception as exc:
+        logger.warning("Background refresh of %s failed: %s", key, exc)
+    finally:
+        _release_refresh(key)
+
+
+async def aswr_get(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    *,
+    soft_ttl: float,
+    hard_ttl: int,
+    tags: Sequence[str] = (),
+) -> Any:
+    """Async variant of swr_get; the refresh runs as a task on the current loop."""
+    envelope = _valid_envelope(await _aredis_get_json(key))
+    if envelope is not None:
+        if _is_stale(envelope, soft_ttl) and _claim_refresh(key):
+            task = asyncio.create_task(_arefresh(key, compute, hard_ttl, tags))
+            _BACKGROUND_TASKS.add(task)
+            task.add_done_callback(_BACKGROUND_TASKS.discard)
+        return envelope["v"]
+
+    async def _load() -> Dict[str, Any]:
+        generations = await _aredis_tag_generations(tags)
+        fresh = _envelope(await compute())
+        await _aredis_set_json_if_current(key, fresh, hard_ttl, tags, generations)
+        return fresh
+
+    async def _recheck() -> Optional[Dict[str, Any]]:
+        return _valid_envelope(await _aredis_get_json(key))
+
+    return (await asingle_flight(key, _load, recheck=_recheck))["v"]
+
+
+async def _arefresh(key: str, compute: Callable[[], Awaitable[Any]], hard_ttl: int, tags: Sequence[str]) -> None:
+    lease_key = f"lock:swr:{key}"
+    try:
+        token = await _aredis_acquire_lease(lease_key, SINGLE_FLIGHT_LEASE_SECONDS)
+        if token is None:
+            return
+        try:
+            generations = await _aredis_tag_generations(tags)
+            await _aredis_set_json_if_current(key, _envelope(await compute()), hard_ttl, tags, generations)
+        finally:
+            await _aredis_release_lease(lease_key, token)
+    except Exception as exc:
+        logger.warning("Background refresh of %s failed: %s", key, exc)
+    finally:
+        _release_refresh(key)
@@ -1,5 +1,412 @@
 from __future__ import annotations
 
-from typing import Dict, Any
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, MutableMapping, Optional, Set
 
-SESSION_CACHE: Dict[int, Dict[str, Any]] = {}
+logger = logging.getLogger(__name__)
+
+
+def _approx_size(value: Any, _seen: Optional[Set[int]] = None) -> int:
+    """Approximate deep size of plain containers (dict/list/tuple/set) in bytes."""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += _approx_size(key, seen) + _approx_size(item, seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _approx_size(item, seen)
+    return size
+
+
+class SessionStore(MutableMapping):
+    """Dict-like per-process store with sliding TTL, LRU eviction and a byte budget.
+
+    Callers mutate values in place (``store.setdefault(uid, {})["x"] = ...``),
+    so entries are re-measured lazily: every access marks the entry dirty and
+    the next write re-sizes dirty entries before enforcing the budget.
+    """
+
+    def __init__(self, name: str, *, max_entries: int, max_bytes: int, ttl_seconds: float) -> None:
+        self.name = name
+        self._max_entries = max(1, max_entries)
+        self._max_bytes = max(1, max_bytes)
+        self._ttl_seconds = ttl_seconds
+        # key -> [expires_at, value, approx_bytes]
+        self._entries: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._dirty: Set[Hashable] = set()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _live(self, key: Hashable) -> Optional[list]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._drop(key)
+            self._expirations += 1
+            return None
+        entry[0] = time.monotonic() + self._ttl_seconds
+        self._entries.move_to_end(key)
+        self._dirty.add(key)
+        return entry
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+        self._dirty.discard(key)
+
+    def _store(self, key: Hashable, value: Any, ttl_seconds: Optional[float]) -> None:
+        self._drop(key)
+        ttl = self._ttl_seconds if ttl_seconds is None else ttl_seconds
+        size = _approx_size(value)
+        self._entries[key] = [time.monotonic() + ttl, value, size]
+        self._bytes += size
+        self._enforce_budget(keep=key)
+
+    def _enforce_budget(self, keep: Hashable) -> None:
+        for key in list(self._dirty):
+            entry = self._entries.get(key)
+            if entry is not None:
+                size = _approx_size(entry[1])
+                self._bytes += size - entry[2]
+                entry[2] = size
+        self._dirty.clear()
+        while len(self._entries) > 1 and (
+            len(self._entries) > self._max_entries or self._bytes > self._max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._drop(oldest)
+            self._evictions += 1
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                self._misses += 1
+                raise KeyError(key)
+            self._hits += 1
+            return entry[1]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._store(key, value, None)
+
+    def __delitem__(self, key: Hashable) -> None:
+        with self._lock:
+            if self._live(key) is None:
+                raise KeyError(key)
+            self._drop(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return self._live(key) is not None
+
+    def __iter__(self) -> Iterator[Hashable]:
+        with self._lock:
+            now = time.monotonic()
+            return iter([key for key, entry in self._entries.items() if entry[0] > now])
+
+    def __len__(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            return sum(1 for entry in self._entries.values() if entry[0] > now)
+
+    def setdefault(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._live(key)
+            if entry is not None:
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+            self._store(key, default, None)
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store ``value`` with its own TTL instead of the store default."""
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dirty.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "approx_bytes": self._bytes,
+                "max_entries": self._max_entries,
+                "max_bytes": self._max_bytes,
+                "ttl_seconds": self._ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, str(default)))
+
+
+# Drafts here are write-through copies of Redis/Postgres state, so an evicted
+# user is simply reloaded on the next request.
+SESSION_CACHE: SessionStore = SessionStore(
+    "session_cache",
+    max_entries=_env_int("SESSION_CACHE_MAX_ENTRIES", 5000),
+    max_bytes=_env_int("SESSION_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+    ttl_seconds=_env_int("SESSION_CACHE_TTL_SECONDS", 2 * 60 * 60),
+)
+
+
+# -- shared state --------------------------------------------------------------
+#
+# State that must survive a restart or be visible to every worker (pending plan
+# approvals, per-user session fields) goes through a StateBackend chosen by
+# STATE_BACKEND: "memory" (default, per process), "redis" or "postgres". The
+# LangGraph checkpointer follows the same setting, see agent.graph.graph.
+
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "memory").strip().lower()
+
+
+class MemoryStateBackend:
+    """Per-process backend: one bounded SessionStore per namespace."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._stores: Dict[str, SessionStore] = {}
+        self._lock = threading.Lock()
+
+    def store(self, namespace: str, *, max_entries: int, max_bytes: int, ttl_seconds: int) -> SessionStore:
+        with self._lock:
+            store = self._stores.get(namespace)
+            if store is None:
+                store = self._stores[namespace] = SessionStore(
+                    namespace, max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds
+                )
+            return store
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        store = self._stores.get(namespace)
+        return store.get(key) if store is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: int) -> None:
+        self._stores[namespace].set(key, value, ttl_seconds)
+
+    def delete(self, namespace: str, key: str) -> None:
+        store = self._stores.get(namespace)
+        if store is not None:
+            store.pop(key, None)
+
+
+class RedisStateBackend:
+    """Stores values as ``state:{namespace}:{key}`` through agent.redis.cache."""
+
+    name = "redis"
+
+    @staticmethod
+    def _key(namespace: str, key: str) -> str:
+        return f"state:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        from agent.redis.cache import _redis_get_json
+
+        return _redis_get_json(self._key(namespace, key))
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: int) -> None:
+        from agent.redis.cache import _redis_set_json
+
+        _redis_set_json(self._key(namespace, key), value, ttl_seconds=ttl_seconds)
+
+    def delete(self, namespace: str, key: str) -> None:
+        from agent.redis.cache import _redis_delete
+
+        _redis_delete(self._key(namespace, key))
+
+
+class PostgresStateBackend:
+    """Stores values in the ``agent_state`` table (schema migration 8)."""
+
+    name = "postgres"
+
+    def __init__(self) -> None:
+        # Expired rows are filtered on read and deleted by a purge that runs
+        # at most once per interval per process, on the next write.
+        self._purge_interval = _env_int("AGENT_STATE_PURGE_INTERVAL_SECONDS", 300)
+        self._next_purge = 0.0
+        self._purge_lock = threading.Lock()
+
+    def _purge_due(self) -> bool:
+        now = time.monotonic()
+        with self._purge_lock:
+            if now < self._next_purge:
+                return False
+            self._next_purge = now + self._purge_interval
+            return True
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        from agent.db.connection import get_db_conn
+
+        with get_db_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT value FROM agent_state WHERE namespace = ? AND key = ? AND expires_at > NOW()",
+                (namespace, key),
+            )
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: int) -> None:
+        from agent.db.connection import get_db_conn
+
+        with get_db_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT INTO agent_state (namespace, key, value, expires_at)
+                VALUES (?, ?, CAST(? AS JSONB), NOW() + (? * INTERVAL '1 second'))
+                ON CONFLICT (namespace, key)
+                DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+                """,
+                (namespace, key, json.dumps(value, default=str), int(ttl_seconds)),
+            )
+            if self._purge_due():
+                cur.execute("DELETE FROM agent_state WHERE expires_at <= NOW()")
+
+    def delete(self, namespace: str, key: str) -> None:
+        from agent.db.connection import get_db_conn
+
+        with get_db_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM agent_state WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+def _state_backend_from_env() -> Any:
+    if STATE_BACKEND == "redis":
+        return RedisStateBackend()
+    if STATE_BACKEND == "postgres":
+        return PostgresStateBackend()
+    if STATE_BACKEND != "memory":
+        logger.warning("Unknown STATE_BACKEND=%r; using in-process state", STATE_BACKEND)
+    return MemoryStateBackend()
+
+
+STATE: Any = _state_backend_from_env()
+
+
+class SharedState:
+    """Dict-style view of one namespace in the configured state backend.
+
+    Values must be JSON-serializable. Reads return a fresh copy with the redis
+    and postgres backends, so write back with ``state[key] = value`` rather than
+    mutating what ``get`` returned.
+    """
+
+    def __init__(self, namespace: str, *, ttl_seconds: int, max_entries: int, max_bytes: int) -> None:
+        self.namespace = namespace
+        self._ttl_seconds = ttl_seconds
+        # The limits only apply to the in-process backend; Redis and Postgres
+        # rely on the TTL alone.
+        self._local: Optional[SessionStore] = None
+        if isinstance(STATE, MemoryStateBackend):
+            self._local = STATE.store(
+                namespace, max_entries=max_entries, max_bytes=max_bytes, ttl_seconds=ttl_seconds
+            )
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = STATE.get(self.namespace, str(key))
+        return default if value is None else value
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = STATE.get(self.namespace, str(key))
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        STATE.set(self.namespace, str(key), value, self._ttl_seconds)
+
+    def __delitem__(self, key: Hashable) -> None:
+        STATE.delete(self.namespace, str(key))
+
+    def __contains__(self, key: object) -> bool:
+        return STATE.get(self.namespace, str(key)) is not None
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = STATE.get(self.namespace, str(key))
+        if value is None:
+            return default
+        STATE.delete(self.namespace, str(key))
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        if self._local is not None:
+            return {**self._local.stats(), "backend": STATE.name}
+        return {"name": self.namespace, "backend": STATE.name, "ttl_seconds": self._ttl_seconds}
+
+
+# Request-scoped fields other workers need to serve the same user: the chosen
+# coach, the Google token used by calendar tools and the last message. Each
+# field is its own key (``{user_id}:{field}``) so concurrent turns on different
+# workers don't overwrite each other's fields.
+SESSION_FIELDS = ("agent_id", "google_access_token", "last_user_message")
+# Bearer credentials are never written to the Postgres backend; the client
+# sends them with every chat request, so the serving worker always has them.
+_SECRET_SESSION_FIELDS = frozenset({"google_access_token"})
+
+SESSION_META = SharedState(
+    "session_meta",
+    ttl_seconds=_env_int("SESSION_CACHE_TTL_SECONDS", 2 * 60 * 60),
+    max_entries=_env_int("SESSION_CACHE_MAX_ENTRIES", 5000),
+    max_bytes=_env_int("SESSION_META_MAX_BYTES", 16 * 1024 * 1024),
+)
+
+
+def _shared_field(name: str) -> bool:
+    return not (name in _SECRET_SESSION_FIELDS and isinstance(STATE, PostgresStateBackend))
+
+
+def remember_session_fields(user_id: int, **fields: Any) -> None:
+    """Set SESSION_FIELDS for ``user_id`` locally and in the shared backend."""
+    SESSION_CACHE.setdefault(user_id, {}).update(fields)
+    for name, value in fields.items():
+        if _shared_field(name):
+            SESSION_META[f"{user_id}:{name}"] = value
+
+
+def session_field(user_id: int, name: str) -> Any:
+    """Read a session field, preferring the shared value over this worker's copy.
+
+    Another worker may have stored a newer value (e.g. a coach switch); the
+    local copy is only used when the shared backend has none, which is always
+    the case for fields kept out of it.
+    """
+    if _shared_field(name):
+        value = SESSION_META.get(f"{user_id}:{name}")
+        if value is not None:
+            session = SESSION_CACHE.setdefault(user_id, {})
+            if session.get(name) != value:
+                session[name] = value
+            return value
+    return (SESSION_CACHE.get(user_id) or {}).get(name)
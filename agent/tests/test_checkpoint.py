@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+from langgraph.checkpoint.base import empty_checkpoint  # noqa: E402
+
+from agent.graph.checkpoint import PruningSqliteSaver, _connect  # noqa: E402
+
+
+def _put(saver, config, step):
+    checkpoint = empty_checkpoint()
+    return saver.put(config, checkpoint, {"source": "loop", "step": step}, {})
+
+
+def test_put_trims_thread_to_keep_last(tmp_path):
+    saver = PruningSqliteSaver(_connect(str(tmp_path / "checkpoints.sqlite")), keep_last=1)
+    saver.setup()
+    config = {"configurable": {"thread_id": "user:1", "checkpoint_ns": ""}}
+
+    first = _put(saver, config, 0)
+    second = _put(saver, first, 1)
+
+    stored = list(saver.list({"configurable": {"thread_id": "user:1"}}))
+    assert [item.config["configurable"]["checkpoint_id"] for item in stored] == [
+        second["configurable"]["checkpoint_id"]
+    ]
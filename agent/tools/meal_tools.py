@@ -3,14 +3,18 @@ from __future__ import annotations
 import hashlib
 import json
 import re
+import uuid
 from datetime import date, datetime, timedelta
 from typing import List, Optional
 
 from langchain_core.tools import tool
 
 from agent.config.constants import CACHE_TTL_LONG, _draft_meal_logs_key
-from agent.redis.cache import _redis_delete, _redis_get_json, _redis_set_json
+from agent.redis.cache import _redis_get_json, _redis_set_json
+from agent.redis.invalidation import invalidate
 from agent.state import SESSION_CACHE
+from agent.db import queries
+from agent.db.bulk import bulk_insert
 from agent.db.connection import get_db_conn
 
 
@@ -51,33 +55,40 @@ def _apply_daily_checklist_completion_bonus(user_id: int, target_day: str) -> No
         conn.commit()
 
 
+# Typical calories per serving/piece, also used by the chat fast path.
+_MEAL_ITEM_CALORIES = {
+    "egg": 78,
+    "eggs": 78,
+    "chicken breast": 165,
+    "chicken": 180,
+    "rice": 200,
+    "pasta": 220,
+    "salad": 120,
+    "apple": 95,
+    "banana": 105,
+    "oatmeal": 150,
+    "yogurt": 120,
+    "greek yogurt": 130,
+    "protein shake": 200,
+    "sandwich": 350,
+    "burger": 550,
+    "pizza": 285,
+    "steak": 400,
+    "fish": 250,
+    "tuna": 200,
+    "tofu": 180,
+    "beans": 220,
+    "avocado": 240,
+}
+
+
+# Returned when a retry is recognised and nothing new was stored.
+_DUPLICATE_MEAL_MESSAGE = "That meal was already logged, so I didn't add it again."
+
+
 def _estimate_meal_item_calories(item: str) -> int:
-    lookup = {
-        "egg": 78,
-        "eggs": 78,
-        "chicken breast": 165,
-        "chicken": 180,
-        "rice": 200,
-        "pasta": 220,
-        "salad": 120,
-        "apple": 95,
-        "banana": 105,
-        "oatmeal": 150,
-        "yogurt": 120,
-        "greek yogurt": 130,
-        "protein shake": 200,
-        "sandwich": 350,
-        "burger": 550,
-        "pizza": 285,
-        "steak": 400,
-        "fish": 250,
-        "tuna": 200,
-        "tofu": 180,
-        "beans": 220,
-        "avocado": 240,
-    }
     lowered = item.lower()
-    for key, calories in lookup.items():
+    for key, calories in _MEAL_ITEM_CALORIES.items():
         if key in lowered:
             return calories
     return 150
@@ -162,6 +173,26 @@ def _estimate_macros_from_calories(total_calories: int) -> dict[str, int]:
     }
 
 
+def _meal_logs_draft_from_rows(rows: List[tuple]) -> dict:
+    meals = [
+        {
+            "id": row[0],
+            "user_id": row[1],
+            "logged_at": row[2],
+            "description": row[3],
+            "calories": row[4],
+            "protein_g": row[5],
+            "carbs_g": row[6],
+            "fat_g": row[7],
+            "confidence": row[8],
+            "confirmed": row[9],
+            "idempotency_key": row[10],
+        }
+        for row in rows
+    ]
+    return {"meals": meals}
+
+
 def _load_meal_logs_draft(user_id: int) -> dict:
     draft_key = _draft_meal_logs_key(user_id)
     cached = _redis_get_json(draft_key)
@@ -169,89 +200,94 @@ def _load_meal_logs_draft(user_id: int) -> dict:
         return cached
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT id, user_id, logged_at, description, calories, protein_g, carbs_g, fat_g, confidence, confirmed
-            FROM meal_logs
-            WHERE user_id = ?
-            ORDER BY logged_at DESC
-            """,
-            (user_id,),
-        )
-        meals = [
-            {
-                "id": row[0],
-                "user_id": row[1],
-                "logged_at": row[2],
-                "description": row[3],
-                "calories": row[4],
-                "protein_g": row[5],
-                "carbs_g": row[6],
-                "fat_g": row[7],
-                "confidence": row[8],
-                "confirmed": row[9],
-            }
-            for row in cur.fetchall()
-        ]
-    draft = {"meals": meals}
+        cur.execute(queries.SELECT_MEAL_LOGS_DRAFT, (user_id,))
+        draft = _meal_logs_draft_from_rows(cur.fetchall())
     _redis_set_json(draft_key, draft, ttl_seconds=CACHE_TTL_LONG)
     return draft
 
 
-def _sync_meal_logs_to_db(user_id: int, meals: List[dict]) -> None:
+_MEAL_LOG_COLUMNS = (
+    "user_id", "logged_at", "photo_path", "description", "calories",
+    "protein_g", "carbs_g", "fat_g", "confidence", "confirmed", "idempotency_key",
+)
+
+
+def _meal_log_row(user_id: int, meal: dict) -> Optional[tuple]:
+    logged_at = meal.get("logged_at")
+    description = meal.get("description")
+    if not logged_at or not description:
+        return None
+    logged_at = _normalize_meal_time(str(logged_at))
+    calories = int(float(meal.get("calories", 0) or 0))
+    if calories <= 0:
+        # Never persist meals without a valid calorie estimate.
+        return None
+    protein_g = int(float(meal.get("protein_g", 0) or 0))
+    carbs_g = int(float(meal.get("carbs_g", 0) or 0))
+    fat_g = int(float(meal.get("fat_g", 0) or 0))
+    confidence = float(meal.get("confidence", 0.5) or 0.5)
+    confirmed_raw = meal.get("confirmed", 1)
+    if isinstance(confirmed_raw, bool):
+        confirmed = 1 if confirmed_raw else 0
+    else:
+        try:
+            confirmed = int(confirmed_raw)
+        except (TypeError, ValueError):
+            confirmed = 1
+    return (
+        user_id, logged_at, None, description, calories, protein_g, carbs_g, fat_g,
+        confidence, confirmed, meal.get("idempotency_key"),
+    )
+
+
+def _sync_meal_logs_to_db(user_id: int, meals: List[dict]) -> set[str]:
+    """Write draft meals that have not reached the database yet.
+
+    Only entries with ``id`` None and an ``idempotency_key`` are pending;
+    existing rows are never rewritten. Drafts written before idempotency keys
+    existed were persisted wholesale, so key-less entries are skipped.
+    Assigned ids are set on the entries in place. Returns the keys of rows
+    that were newly inserted; keys already in the table are left untouched.
+    """
+    pending: dict[str, tuple[dict, tuple]] = {}
+    for meal in meals:
+        key = meal.get("idempotency_key")
+        if meal.get("id") is not None or not key:
+            continue
+        row = _meal_log_row(user_id, meal)
+        if row is not None:
+            pending[key] = (meal, row)
+    if not pending:
+        return set()
+    existing: dict[str, int] = {}
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute("DELETE FROM meal_logs WHERE user_id = ?", (user_id,))
-        for meal in meals:
-            logged_at = meal.get("logged_at")
-            description = meal.get("description")
-            if not logged_at or not description:
-                continue
-            logged_at = _normalize_meal_time(str(logged_at))
-            calories = int(float(meal.get("calories", 0) or 0))
-            if calories <= 0:
-                # Never persist meals without a valid calorie estimate.
-                continue
-            protein_g = int(float(meal.get("protein_g", 0) or 0))
-            carbs_g = int(float(meal.get("carbs_g", 0) or 0))
-            fat_g = int(float(meal.get("fat_g", 0) or 0))
-            confidence = float(meal.get("confidence", 0.5) or 0.5)
-            confirmed_raw = meal.get("confirmed", 1)
-            if isinstance(confirmed_raw, bool):
-                confirmed = 1 if confirmed_raw else 0
-            else:
-                try:
-                    confirmed = int(confirmed_raw)
-                except (TypeError, ValueError):
-                    confirmed = 1
+        inserted = bulk_insert(
+            cur,
+            "meal_logs",
+            _MEAL_LOG_COLUMNS,
+            [row for _, row in pending.values()],
+            conflict_columns=("user_id", "idempotency_key"),
+            conflict_where="idempotency_key IS NOT NULL",
+            do_nothing=True,
+            returning=("id", "idempotency_key"),
+        )
+        inserted_ids = {key: row_id for row_id, key in inserted}
+        missing = [key for key in pending if key not in inserted_ids]
+        if missing:
             cur.execute(
-                """
-                INSERT INTO meal_logs (
-                    user_id, logged_at, photo_path, description, calories, protein_g, carbs_g, fat_g, confidence, confirmed
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    user_id,
-                    logged_at,
-                    None,
-                    description,
-                    calories,
-                    protein_g,
-                    carbs_g,
-                    fat_g,
-                    confidence,
-                    confirmed,
-                ),
+                "SELECT id, idempotency_key FROM meal_logs WHERE user_id = ? AND idempotency_key = ANY(?)",
+                (user_id, missing),
             )
+            existing = {key: row_id for row_id, key in cur.fetchall()}
         conn.commit()
+    for key, (meal, _) in pending.items():
+        meal["id"] = inserted_ids.get(key, existing.get(key))
+    return set(inserted_ids)
 
 
 def _invalidate_meal_cache(user_id: int, day: Optional[str]) -> None:
-    _redis_delete(_draft_meal_logs_key(user_id))
-    _redis_delete(f"user:{user_id}:meal_logs")
-    _redis_delete(f"session_hydration:{user_id}")
-    if day:
-        _redis_delete(f"daily_intake:{user_id}:{day}")
+    invalidate(user_id, "meals", day=day, keys=[_draft_meal_logs_key(user_id)])
 
 
 def _idempotency_key_for_meal(
@@ -264,6 +300,11 @@ def _idempotency_key_for_meal(
     fat_g: int,
     explicit_key: Optional[str],
 ) -> str:
+    """Key for the short-lived retry check in Redis.
+
+    Auto keys hash the meal's content, so they must never be stored in
+    ``meal_logs``: the same snack logged twice in a day is two real meals.
+    """
     if explicit_key and explicit_key.strip():
         return explicit_key.strip()
     payload = {
@@ -328,11 +369,17 @@ def log_meal(
     idem_cache_key = f"idem:tool:meal:{user_id}:{idem_key}"
     cached = _redis_get_json(idem_cache_key)
     if isinstance(cached, dict) and cached.get("message"):
-        return str(cached["message"])
+        return _DUPLICATE_MEAL_MESSAGE
+    # Only caller-supplied keys are enforced by the meal_logs unique index;
+    # otherwise each call gets a fresh key so the row is always inserted.
+    stored_key = idem_key if idempotency_key and idempotency_key.strip() else f"auto:{uuid.uuid4().hex}"
     description = ", ".join(meal_items)
     if notes:
         description = f"{description}. Notes: {notes}"
     draft = _load_meal_logs_draft(user_id)
+    meals = draft.setdefault("meals", [])
+    if any(meal.get("idempotency_key") == stored_key for meal in meals):
+        return _DUPLICATE_MEAL_MESSAGE
     new_entry = {
         "id": None,
         "user_id": user_id,
@@ -344,11 +391,17 @@ def log_meal(
         "fat_g": macros["fat_g"],
         "confidence": 0.5,
         "confirmed": 1,
+        "idempotency_key": stored_key,
     }
-    draft.setdefault("meals", []).insert(0, new_entry)
+    meals.insert(0, new_entry)
+    inserted = _sync_meal_logs_to_db(user_id, meals)
+    if stored_key not in inserted:
+        # A concurrent retry already stored this meal; keep a single copy.
+        meals.remove(new_entry)
+        _invalidate_meal_cache(user_id, logged_at[:10])
+        return _DUPLICATE_MEAL_MESSAGE
     _redis_set_json(_draft_meal_logs_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
     SESSION_CACHE.setdefault(user_id, {})["meal_logs"] = draft
-    _sync_meal_logs_to_db(user_id, draft.get("meals", []))
     _invalidate_meal_cache(user_id, logged_at[:10])
     _award_points(user_id, 5, f"meal_log:{logged_at}")
     _apply_daily_checklist_completion_bonus(user_id, logged_at[:10])
@@ -382,6 +435,9 @@ def delete_all_meal_logs(user_id: int) -> str:
     draft = {"meals": []}
     _redis_set_json(_draft_meal_logs_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
     SESSION_CACHE.setdefault(user_id, {})["meal_logs"] = draft
-    _sync_meal_logs_to_db(user_id, [])
+    with get_db_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM meal_logs WHERE user_id = ?", (user_id,))
+        conn.commit()
     _invalidate_meal_cache(user_id, None)
     return "All meal logs deleted."
@@ -30,10 +30,21 @@ from agent.config.constants import (
 from agent.config.constants import _draft_meal_logs_key, _draft_workout_sessions_key
 from agent.db import queries
 from agent.plan.plan_generation import _build_plan_data, _format_plan_text, _macro_split, generate_workout_plan
-from agent.redis.cache import _redis_delete, _redis_get_json, _redis_set_json
-from agent.state import SESSION_CACHE
+from agent.redis.cache import (
+    _aredis_get_json,
+    _redis_append_json,
+    _aredis_set_json,
+    _redis_get_json,
+    _redis_mget_json,
+    _redis_set_json,
+    _redis_set_many_json,
+)
+from agent.redis.invalidation import invalidate
+from agent.redis.singleflight import asingle_flight, single_flight
+from agent.state import SESSION_CACHE, session_field
 from agent.tools.activity_utils import _estimate_workout_calories, _is_cardio_exercise
-from agent.db.connection import get_db_conn
+from agent.db.bulk import bulk_insert
+from agent.db.connection import get_async_db_conn, get_db_conn
 from google.oauth2 import service_account
 from google.oauth2.credentials import Credentials as GoogleUserCredentials
 from googleapiclient.discovery import build
@@ -120,8 +131,7 @@ def _coerce_to_date(value: Any) -> date:
 
 def _google_calendar_service(user_id: Optional[int] = None):
     if user_id is not None:
-        session = SESSION_CACHE.get(user_id) or {}
-        user_token = str(session.get("google_access_token") or "").strip()
+        user_token = str(session_field(user_id, "google_access_token") or "").strip()
         _calendar_trace(f"session lookup user_id={user_id} token={_mask_token(user_token)}")
         if user_token:
             creds = GoogleUserCredentials(token=user_token, scopes=["https://www.googleapis.com/auth/calendar.events"])
@@ -396,7 +406,7 @@ def get_realtime_coaching_context(user_id: int) -> str:
         if "cold_weather_risk" in weather_warnings:
             advisories.append("Cold conditions; advise extended warm-up or indoor options.")
 
-    last_user_message = str((SESSION_CACHE.get(user_id) or {}).get("last_user_message") or "")
+    last_user_message = str(session_field(user_id, "last_user_message") or "")
     lowered = last_user_message.lower()
     time_points = _extract_time_points_from_text(last_user_message)
     mentions_run = any(k in lowered for k in ["run", "jog", "sprint"])
@@ -524,6 +534,15 @@ def _load_user_context_data(user_id: int) -> Dict[str, Any]:
     cached = _redis_get_json(cache_key)
     if cached:
         return cached
+    return single_flight(
+        cache_key,
+        lambda: _rebuild_user_context_data(user_id),
+        recheck=lambda: _redis_get_json(cache_key),
+    )
+
+
+def _rebuild_user_context_data(user_id: int) -> Dict[str, Any]:
+    cache_key = f"user:{user_id}:profile"
     with get_db_conn() as conn:
         cur = conn.cursor()
         cur.execute(queries.SELECT_USER_PROFILE, (user_id,))
@@ -535,67 +554,56 @@ def _load_user_context_data(user_id: int) -> Dict[str, Any]:
     return data
 
 
-def _get_active_plan_bundle_data(user_id: int, allow_db_fallback: bool = True) -> Dict[str, Any]:
-    cache_key = f"active_plan:{user_id}"
-    legacy_key = f"user:{user_id}:active_plan"
-    cached = _redis_get_json(cache_key) or _redis_get_json(legacy_key)
-    if cached:
-        return cached
-    if not allow_db_fallback:
-        return {"plan": None, "plan_days": []}
-    with get_db_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(queries.SELECT_ACTIVE_PLAN, (user_id,))
-        plan_row = cur.fetchone()
-        if not plan_row:
-            return {"plan": None, "plan_days": []}
-        template_id = plan_row[0]
-        start_date = plan_row[2]
-        end_date = plan_row[3]
-        daily_calorie_target = plan_row[4]
-        protein_g = plan_row[5]
-        carbs_g = plan_row[6]
-        fat_g = plan_row[7]
-        status = plan_row[8]
-        cycle_length = plan_row[9] or 7
-        default_calories = plan_row[11] or daily_calorie_target
-        default_macros = {
-            "protein_g": plan_row[12] or protein_g,
-            "carbs_g": plan_row[13] or carbs_g,
-            "fat_g": plan_row[14] or fat_g,
+def _assemble_active_plan_bundle(
+    plan_row: tuple,
+    template_rows: List[tuple],
+    override_rows: List[tuple],
+    checkpoint_rows: List[tuple],
+) -> Dict[str, Any]:
+    template_id = plan_row[0]
+    start_date = plan_row[2]
+    end_date = plan_row[3]
+    daily_calorie_target = plan_row[4]
+    protein_g = plan_row[5]
+    carbs_g = plan_row[6]
+    fat_g = plan_row[7]
+    status = plan_row[8]
+    cycle_length = plan_row[9] or 7
+    default_calories = plan_row[11] or daily_calorie_target
+    default_macros = {
+        "protein_g": plan_row[12] or protein_g,
+        "carbs_g": plan_row[13] or carbs_g,
+        "fat_g": plan_row[14] or fat_g,
+    }
+    template_days = {row[0]: {"workout_json": row[1], "calorie_delta": row[2]} for row in template_rows}
+    overrides = {
+        row[0]: {
+            "override_type": row[1],
+            "workout_json": row[2],
+            "calorie_target": row[3],
+            "calorie_delta": row[4],
         }
-        cur.execute(queries.SELECT_TEMPLATE_DAYS, (template_id,))
-        template_days = {row[0]: {"workout_json": row[1], "calorie_delta": row[2]} for row in cur.fetchall()}
-        cur.execute(queries.SELECT_PLAN_OVERRIDES, (template_id, start_date, end_date))
-        overrides = {
-            row[0]: {
-                "override_type": row[1],
-                "workout_json": row[2],
-                "calorie_target": row[3],
-                "calorie_delta": row[4],
-            }
-            for row in cur.fetchall()
+        for row in override_rows
+    }
+    plan_days = _render_plan_days(
+        start_date=start_date,
+        end_date=end_date,
+        cycle_length=cycle_length,
+        default_calories=default_calories,
+        default_macros=default_macros,
+        template_days=template_days,
+        overrides=overrides,
+    )
+    checkpoints = [
+        {
+            "week": row[0],
+            "expected_weight_kg": row[1],
+            "min_weight_kg": row[2],
+            "max_weight_kg": row[3],
         }
-        plan_days = _render_plan_days(
-            start_date=start_date,
-            end_date=end_date,
-            cycle_length=cycle_length,
-            default_calories=default_calories,
-            default_macros=default_macros,
-            template_days=template_days,
-            overrides=overrides,
-        )
-        cur.execute(queries.SELECT_PLAN_CHECKPOINTS, (template_id,))
-        checkpoints = [
-            {
-                "week": row[0],
-                "expected_weight_kg": row[1],
-                "min_weight_kg": row[2],
-                "max_weight_kg": row[3],
-            }
-            for row in cur.fetchall()
-        ]
-    bundle = {
+        for row in checkpoint_rows
+    ]
+    return {
         "plan": {
             "id": template_id,
             "start_date": start_date,
@@ -609,8 +617,94 @@ def _get_active_plan_bundle_data(user_id: int, allow_db_fallback: bool = True) -
         "plan_days": plan_days,
         "checkpoints": checkpoints,
     }
-    _redis_set_json(cache_key, bundle, ttl_seconds=CACHE_TTL_PLAN)
-    _redis_set_json(legacy_key, bundle, ttl_seconds=CACHE_TTL_PLAN)
+
+
+def _query_active_plan_bundle(cur, user_id: int) -> Optional[Dict[str, Any]]:
+    """Load and render the active plan on an open cursor; None when there is no active plan."""
+    cur.execute(queries.SELECT_ACTIVE_PLAN, (user_id,))
+    plan_row = cur.fetchone()
+    if not plan_row:
+        return None
+    template_id = plan_row[0]
+    cur.execute(queries.SELECT_TEMPLATE_DAYS, (template_id,))
+    template_rows = cur.fetchall()
+    cur.execute(queries.SELECT_PLAN_OVERRIDES, (template_id, plan_row[2], plan_row[3]))
+    override_rows = cur.fetchall()
+    cur.execute(queries.SELECT_PLAN_CHECKPOINTS, (template_id,))
+    checkpoint_rows = cur.fetchall()
+    return _assemble_active_plan_bundle(plan_row, template_rows, override_rows, checkpoint_rows)
+
+
+def _cached_active_plan_bundle(user_id: int) -> Optional[Dict[str, Any]]:
+    cached, legacy = _redis_mget_json([f"active_plan:{user_id}", f"user:{user_id}:active_plan"])
+    return cached or legacy
+
+
+async def _acached_active_plan_bundle(user_id: int) -> Optional[Dict[str, Any]]:
+    return await _aredis_get_json(f"active_plan:{user_id}") or await _aredis_get_json(f"user:{user_id}:active_plan")
+
+
+def _get_active_plan_bundle_data(user_id: int, allow_db_fallback: bool = True) -> Dict[str, Any]:
+    cached = _cached_active_plan_bundle(user_id)
+    if cached:
+        return cached
+    if not allow_db_fallback:
+        return {"plan": None, "plan_days": []}
+    # Expiry of this key fans out across every plan-aware endpoint; rebuild once.
+    return single_flight(
+        f"active_plan:{user_id}",
+        lambda: _rebuild_active_plan_bundle(user_id),
+        recheck=lambda: _cached_active_plan_bundle(user_id),
+    )
+
+
+def _rebuild_active_plan_bundle(user_id: int) -> Dict[str, Any]:
+    with get_db_conn() as conn:
+        bundle = _query_active_plan_bundle(conn.cursor(), user_id)
+    if bundle is None:
+        return {"plan": None, "plan_days": []}
+    _redis_set_many_json(
+        [
+            (f"active_plan:{user_id}", bundle, CACHE_TTL_PLAN),
+            (f"user:{user_id}:active_plan", bundle, CACHE_TTL_PLAN),
+        ]
+    )
+    return bundle
+
+
+async def _aget_active_plan_bundle_data(user_id: int, allow_db_fallback: bool = True) -> Dict[str, Any]:
+    """Async variant of _get_active_plan_bundle_data for `async def` endpoints."""
+    cached = await _acached_active_plan_bundle(user_id)
+    if cached:
+        return cached
+    if not allow_db_fallback:
+        return {"plan": None, "plan_days": []}
+    return await asingle_flight(
+        f"active_plan:{user_id}",
+        lambda: _arebuild_active_plan_bundle(user_id),
+        recheck=lambda: _acached_active_plan_bundle(user_id),
+    )
+
+
+async def _arebuild_active_plan_bundle(user_id: int) -> Dict[str, Any]:
+    cache_key = f"active_plan:{user_id}"
+    legacy_key = f"user:{user_id}:active_plan"
+    async with get_async_db_conn() as conn:
+        cur = conn.cursor()
+        await cur.execute(queries.SELECT_ACTIVE_PLAN, (user_id,))
+        plan_row = await cur.fetchone()
+        if not plan_row:
+            return {"plan": None, "plan_days": []}
+        template_id = plan_row[0]
+        await cur.execute(queries.SELECT_TEMPLATE_DAYS, (template_id,))
+        template_rows = await cur.fetchall()
+        await cur.execute(queries.SELECT_PLAN_OVERRIDES, (template_id, plan_row[2], plan_row[3]))
+        override_rows = await cur.fetchall()
+        await cur.execute(queries.SELECT_PLAN_CHECKPOINTS, (template_id,))
+        checkpoint_rows = await cur.fetchall()
+    bundle = _assemble_active_plan_bundle(plan_row, template_rows, override_rows, checkpoint_rows)
+    await _aredis_set_json(cache_key, bundle, ttl_seconds=CACHE_TTL_PLAN)
+    await _aredis_set_json(legacy_key, bundle, ttl_seconds=CACHE_TTL_PLAN)
     return bundle
 
 
@@ -692,31 +786,43 @@ def _load_active_plan_draft(user_id: int) -> Dict[str, Any]:
         return cached
     bundle = _get_active_plan_bundle_data(user_id, allow_db_fallback=True)
     _redis_set_json(draft_key, bundle, ttl_seconds=CACHE_TTL_LONG)
-    if _redis_get_json(_draft_plan_patches_key(user_id)) is None:
-        _redis_set_json(_draft_plan_patches_key(user_id), [], ttl_seconds=CACHE_TTL_LONG)
     return bundle
 
 
 def _set_active_plan_cache(user_id: int, bundle: Dict[str, Any]) -> None:
-    _redis_set_json(_draft_plan_key(user_id), bundle, ttl_seconds=CACHE_TTL_LONG)
-    _redis_set_json(f"active_plan:{user_id}", bundle, ttl_seconds=CACHE_TTL_PLAN)
-    _redis_set_json(f"user:{user_id}:active_plan", bundle, ttl_seconds=CACHE_TTL_PLAN)
+    # Drop plan-dependent reads (e.g. daily intake targets) before writing through.
+    invalidate(user_id, "plan")
+    _redis_set_many_json(
+        [
+            (_draft_plan_key(user_id), bundle, CACHE_TTL_LONG),
+            (f"active_plan:{user_id}", bundle, CACHE_TTL_PLAN),
+            (f"user:{user_id}:active_plan", bundle, CACHE_TTL_PLAN),
+        ]
+    )
     SESSION_CACHE.setdefault(user_id, {})["active_plan"] = bundle
 
 
 def _append_plan_patch(user_id: int, patch: Dict[str, Any]) -> None:
-    patches = _redis_get_json(_draft_plan_patches_key(user_id))
-    if not isinstance(patches, list):
-        patches = []
-    patches.append(patch)
-    _redis_set_json(_draft_plan_patches_key(user_id), patches, ttl_seconds=CACHE_TTL_LONG)
+    _redis_append_json(_draft_plan_patches_key(user_id), patch, ttl_seconds=CACHE_TTL_LONG)
 
 
 def _invalidate_active_plan_cache(user_id: int) -> None:
-    _redis_delete(f"active_plan:{user_id}")
-    _redis_delete(f"user:{user_id}:active_plan")
-    _redis_delete(_draft_plan_key(user_id))
-    _redis_delete(_draft_plan_patches_key(user_id))
+    invalidate(user_id, "plan", keys=[_draft_plan_key(user_id), _draft_plan_patches_key(user_id)])
+
+
+def _checkins_draft_from_rows(rows: List[tuple]) -> Dict[str, Any]:
+    checkins = [
+        {
+            "id": row[0],
+            "user_id": row[1],
+            "checkin_date": row[2],
+            "weight_kg": row[3],
+            "mood": row[4],
+            "notes": row[5],
+        }
+        for row in rows
+    ]
+    return {"checkins": checkins}
 
 
 def _load_checkins_draft(user_id: int) -> Dict[str, Any]:
@@ -726,60 +832,87 @@ def _load_checkins_draft(user_id: int) -> Dict[str, Any]:
         return cached
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT id, user_id, checkin_date, weight_kg, mood, notes
-            FROM checkins
-            WHERE user_id = ?
-            ORDER BY checkin_date DESC
-            """,
-            (user_id,),
-        )
-        checkins = [
-            {
-                "id": row[0],
-                "user_id": row[1],
-                "checkin_date": row[2],
-                "weight_kg": row[3],
-                "mood": row[4],
-                "notes": row[5],
-            }
-            for row in cur.fetchall()
-        ]
-    draft = {"checkins": checkins}
+        cur.execute(queries.SELECT_CHECKINS_DRAFT, (user_id,))
+        draft = _checkins_draft_from_rows(cur.fetchall())
     _redis_set_json(draft_key, draft, ttl_seconds=CACHE_TTL_LONG)
     return draft
 
 
-def _sync_checkins_to_db(user_id: int, checkins: List[Dict[str, Any]]) -> None:
+def _upsert_checkins_to_db(user_id: int, checkins: List[Dict[str, Any]]) -> None:
+    """Upsert the given check-ins on (user_id, checkin_date) and set their ids in place."""
+    by_date = {checkin["checkin_date"]: checkin for checkin in checkins if checkin.get("checkin_date")}
+    if not by_date:
+        return
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute("DELETE FROM checkins WHERE user_id = ?", (user_id,))
-        for checkin in checkins:
-            checkin_date = checkin.get("checkin_date")
-            weight_kg = checkin.get("weight_kg")
-            if not checkin_date:
-                continue
-            cur.execute(
-                """
-                INSERT INTO checkins (
-                    user_id, checkin_date, weight_kg, mood, notes
-                ) VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    user_id,
-                    checkin_date,
-                    weight_kg,
-                    checkin.get("mood"),
-                    checkin.get("notes"),
-                ),
-            )
+        rows = bulk_insert(
+            cur,
+            "checkins",
+            ("user_id", "checkin_date", "weight_kg", "mood", "notes"),
+            [
+                (user_id, day, checkin.get("weight_kg"), checkin.get("mood"), checkin.get("notes"))
+                for day, checkin in by_date.items()
+            ],
+            conflict_columns=("user_id", "checkin_date"),
+            update_columns=("weight_kg", "mood", "notes"),
+            returning=("id", "checkin_date"),
+        )
         conn.commit()
+    for row_id, day in rows:
+        if day in by_date:
+            by_date[day]["id"] = row_id
+
 
+def _replace_plan_overrides(cur, template_id: int, overrides: List[Dict[str, Any]]) -> None:
+    """Replace overrides for the given dates with one DELETE and one batched INSERT."""
+    by_date: Dict[str, Dict[str, Any]] = {}
+    for override in overrides:
+        if override.get("date"):
+            by_date[override["date"]] = override
+    if not by_date:
+        return
+    cur.execute(
+        "DELETE FROM plan_overrides WHERE template_id = ? AND date = ANY(?)",
+        (template_id, list(by_date.keys())),
+    )
+    created_at = datetime.now().isoformat(timespec="seconds")
+    bulk_insert(
+        cur,
+        "plan_overrides",
+        ("template_id", "date", "override_type", "workout_json", "calorie_target", "calorie_delta", "created_at"),
+        [
+            (
+                template_id,
+                day,
+                override.get("override_type", "adjust"),
+                override.get("workout_json"),
+                override.get("calorie_target"),
+                override.get("calorie_delta"),
+                created_at,
+            )
+            for day, override in by_date.items()
+        ],
+    )
 
-def _invalidate_checkins_cache(user_id: int) -> None:
-    _redis_delete(_draft_checkins_key(user_id))
-    _redis_delete(f"session_hydration:{user_id}")
+
+def _invalidate_checkins_cache(user_id: int, day: Optional[str] = None) -> None:
+    invalidate(user_id, "checkins", day=day, keys=[_draft_checkins_key(user_id)])
+
+
+def _health_activity_draft_from_rows(rows: List[tuple]) -> Dict[str, Any]:
+    activity = [
+        {
+            "id": row[0],
+            "user_id": row[1],
+            "date": row[2],
+            "steps": row[3],
+            "calories_burned": row[4],
+            "workouts_summary": row[5],
+            "source": row[6],
+        }
+        for row in rows
+    ]
+    return {"activity": activity}
 
 
 def _load_health_activity_draft(user_id: int) -> Dict[str, Any]:
@@ -789,28 +922,8 @@ def _load_health_activity_draft(user_id: int) -> Dict[str, Any]:
         return cached
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT id, user_id, date, steps, calories_burned, workouts_summary, source
-            FROM health_activity
-            WHERE user_id = ?
-            ORDER BY date DESC
-            """,
-            (user_id,),
-        )
-        activity = [
-            {
-                "id": row[0],
-                "user_id": row[1],
-                "date": row[2],
-                "steps": row[3],
-                "calories_burned": row[4],
-                "workouts_summary": row[5],
-                "source": row[6],
-            }
-            for row in cur.fetchall()
-        ]
-    draft = {"activity": activity}
+        cur.execute(queries.SELECT_HEALTH_ACTIVITY_DRAFT, (user_id,))
+        draft = _health_activity_draft_from_rows(cur.fetchall())
     _redis_set_json(draft_key, draft, ttl_seconds=CACHE_TTL_LONG)
     return draft
 
@@ -826,31 +939,27 @@ def _load_reminders_draft(user_id: int) -> Dict[str, Any]:
     return draft
 
 
+def _reminders_draft_from_rows(rows: List[tuple]) -> Dict[str, Any]:
+    reminders = [
+        {
+            "id": row[0],
+            "user_id": row[1],
+            "reminder_type": row[2],
+            "scheduled_at": row[3],
+            "status": row[4],
+            "channel": row[5],
+            "related_plan_override_id": row[6],
+        }
+        for row in rows
+    ]
+    return {"reminders": reminders}
+
+
 def _load_reminders_from_db(user_id: int) -> Dict[str, Any]:
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT id, user_id, reminder_type, scheduled_at, status, channel, related_plan_override_id
-            FROM reminders
-            WHERE user_id = ?
-            ORDER BY scheduled_at
-            """,
-            (user_id,),
-        )
-        reminders = [
-            {
-                "id": row[0],
-                "user_id": row[1],
-                "reminder_type": row[2],
-                "scheduled_at": row[3],
-                "status": row[4],
-                "channel": row[5],
-                "related_plan_override_id": row[6],
-            }
-            for row in cur.fetchall()
-        ]
-    return {"reminders": reminders}
+        cur.execute(queries.SELECT_REMINDERS_DRAFT, (user_id,))
+        return _reminders_draft_from_rows(cur.fetchall())
 
 
 def _refresh_reminders_cache(user_id: int) -> Dict[str, Any]:
@@ -1074,7 +1183,7 @@ def add_google_calendar_events(
     success_count = 0
     failed = 0
     first_error: Optional[str] = None
-    last_user_message = str((SESSION_CACHE.get(user_id) or {}).get("last_user_message") or "")
+    last_user_message = str(session_field(user_id, "last_user_message") or "")
     created_event_summaries: List[str] = []
     total_events = len(prepared_events)
     with get_db_conn() as conn:
@@ -1300,24 +1409,19 @@ def shift_active_plan_end_date(
         if calorie_delta is None:
             calorie_delta = 100 if goal_type == "lose" else 0
 
-        for day in dates:
-            cur.execute("DELETE FROM plan_overrides WHERE template_id = ? AND date = ?", (template_id, day))
-            cur.execute(
-                """
-                INSERT INTO plan_overrides (
-                    template_id, date, override_type, workout_json, calorie_target, calorie_delta, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    template_id,
-                    day,
-                    "pause",
-                    json.dumps({"label": "Rest day"}),
-                    None,
-                    calorie_delta,
-                    datetime.now().isoformat(timespec="seconds"),
-                ),
-            )
+        _replace_plan_overrides(
+            cur,
+            template_id,
+            [
+                {
+                    "date": day,
+                    "override_type": "pause",
+                    "workout_json": json.dumps({"label": "Rest day"}),
+                    "calorie_delta": calorie_delta,
+                }
+                for day in dates
+            ],
+        )
 
         cur.execute("UPDATE plan_templates SET end_date = ? WHERE id = ?", (new_end, template_id))
         conn.commit()
@@ -1633,27 +1737,18 @@ def replace_active_plan_workouts(
                     }
                 )
 
-        for override in overrides:
-            cur.execute(
-                "DELETE FROM plan_overrides WHERE template_id = ? AND date = ?",
-                (template_id, override["date"]),
-            )
-            cur.execute(
-                """
-                INSERT INTO plan_overrides (
-                    template_id, date, override_type, workout_json, calorie_target, calorie_delta, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    template_id,
-                    override["date"],
-                    override["override_type"],
-                    override["workout_json"],
-                    None,
-                    None,
-                    datetime.now().isoformat(timespec="seconds"),
-                ),
-            )
+        _replace_plan_overrides(
+            cur,
+            template_id,
+            [
+                {
+                    "date": override["date"],
+                    "override_type": override["override_type"],
+                    "workout_json": override["workout_json"],
+                }
+                for override in overrides
+            ],
+        )
         conn.commit()
 
     if overrides:
@@ -2445,27 +2540,7 @@ def apply_plan_patch(user_id: int, patch: Dict[str, Any]) -> str:
         template_id = row[0]
         if new_end_date:
             cur.execute("UPDATE plan_templates SET end_date = ? WHERE id = ?", (new_end_date, template_id))
-        for override in overrides:
-            cur.execute(
-                "DELETE FROM plan_overrides WHERE template_id = ? AND date = ?",
-                (template_id, override["date"]),
-            )
-            cur.execute(
-                """
-                INSERT INTO plan_overrides (
-                    template_id, date, override_type, workout_json, calorie_target, calorie_delta, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    template_id,
-                    override.get("date"),
-                    override.get("override_type", "adjust"),
-                    override.get("workout_json"),
-                    override.get("calorie_target"),
-                    override.get("calorie_delta"),
-                    datetime.now().isoformat(timespec="seconds"),
-                ),
-            )
+        _replace_plan_overrides(cur, template_id, overrides)
         conn.commit()
     message = "Plan patch applied."
     _redis_set_json(idem_key, {"message": message}, ttl_seconds=600)
@@ -2575,31 +2650,26 @@ def log_checkin(
     checkin_date = _normalize_checkin_date(checkin_date)
     draft = _load_checkins_draft(user_id)
     checkins = draft.get("checkins", [])
-    updated = False
-    for entry in checkins:
-        if entry.get("checkin_date") == checkin_date:
-            entry["weight_kg"] = weight_kg
-            entry["mood"] = mood
-            entry["notes"] = notes
-            updated = True
-            break
-    if not updated:
-        checkins.insert(
-            0,
-            {
-                "id": None,
-                "user_id": user_id,
-                "checkin_date": checkin_date,
-                "weight_kg": weight_kg,
-                "mood": mood,
-                "notes": notes,
-            },
-        )
+    entry = next((c for c in checkins if c.get("checkin_date") == checkin_date), None)
+    if entry is not None:
+        entry["weight_kg"] = weight_kg
+        entry["mood"] = mood
+        entry["notes"] = notes
+    else:
+        entry = {
+            "id": None,
+            "user_id": user_id,
+            "checkin_date": checkin_date,
+            "weight_kg": weight_kg,
+            "mood": mood,
+            "notes": notes,
+        }
+        checkins.insert(0, entry)
+    _upsert_checkins_to_db(user_id, [entry])
     draft["checkins"] = checkins
     _redis_set_json(_draft_checkins_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
     SESSION_CACHE.setdefault(user_id, {})["checkins"] = draft
-    _sync_checkins_to_db(user_id, checkins)
-    _invalidate_checkins_cache(user_id)
+    _invalidate_checkins_cache(user_id, checkin_date)
     reason = f"checkin_log:{checkin_date}"
     if not _has_points_reason(user_id, reason):
         _award_points(user_id, 5, reason)
@@ -2635,5 +2705,5 @@ def delete_checkin(user_id: int, checkin_date: str) -> str:
         cur = conn.cursor()
         cur.execute("DELETE FROM checkins WHERE user_id = ? AND checkin_date = ?", (user_id, checkin_date))
         conn.commit()
-    _invalidate_checkins_cache(user_id)
+    _invalidate_checkins_cache(user_id, checkin_date)
     return "Check-in deleted."
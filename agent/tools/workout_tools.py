@@ -8,10 +8,12 @@ from typing import Any, Dict, List, Optional
 from langchain_core.tools import tool
 
 from agent.config.constants import CACHE_TTL_LONG, _draft_workout_sessions_key, _draft_workout_sessions_ops_key
-from agent.redis.cache import _redis_delete, _redis_get_json, _redis_set_json
+from agent.redis.cache import _redis_append_json, _redis_get_json, _redis_set_json
+from agent.redis.invalidation import invalidate
 from agent.state import SESSION_CACHE
 from agent.tools.activity_utils import _estimate_workout_calories, _is_cardio_exercise
 from agent.tools.plan_tools import _load_user_context_data
+from agent.db import queries
 from agent.db.connection import get_db_conn
 
 
@@ -73,11 +75,25 @@ def _apply_daily_checklist_completion_bonus(user_id: int, target_day: str) -> No
 
 
 def _append_workout_session_op(user_id: int, op: Dict[str, Any]) -> None:
-    ops = _redis_get_json(_draft_workout_sessions_ops_key(user_id))
-    if not isinstance(ops, list):
-        ops = []
-    ops.append(op)
-    _redis_set_json(_draft_workout_sessions_ops_key(user_id), ops, ttl_seconds=CACHE_TTL_LONG)
+    _redis_append_json(_draft_workout_sessions_ops_key(user_id), op, ttl_seconds=CACHE_TTL_LONG)
+
+
+def _workout_sessions_draft_from_rows(rows: List[tuple]) -> Dict[str, Any]:
+    sessions = [
+        {
+            "id": row[0],
+            "user_id": row[1],
+            "date": row[2],
+            "workout_type": row[3],
+            "duration_min": row[4],
+            "calories_burned": row[5],
+            "notes": row[6],
+            "completed": row[7],
+            "source": row[8],
+        }
+        for row in rows
+    ]
+    return {"sessions": sessions, "new_sessions": []}
 
 
 def _load_workout_sessions_draft(user_id: int) -> Dict[str, Any]:
@@ -87,33 +103,9 @@ def _load_workout_sessions_draft(user_id: int) -> Dict[str, Any]:
         return cached
     with get_db_conn() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT id, user_id, date, workout_type, duration_min, calories_burned, notes, completed, source
-            FROM workout_sessions
-            WHERE user_id = ?
-            ORDER BY date DESC
-            """,
-            (user_id,),
-        )
-        sessions = [
-            {
-                "id": row[0],
-                "user_id": row[1],
-                "date": row[2],
-                "workout_type": row[3],
-                "duration_min": row[4],
-                "calories_burned": row[5],
-                "notes": row[6],
-                "completed": row[7],
-                "source": row[8],
-            }
-            for row in cur.fetchall()
-        ]
-    draft = {"sessions": sessions, "new_sessions": []}
+        cur.execute(queries.SELECT_WORKOUT_SESSIONS_DRAFT, (user_id,))
+        draft = _workout_sessions_draft_from_rows(cur.fetchall())
     _redis_set_json(draft_key, draft, ttl_seconds=CACHE_TTL_LONG)
-    if _redis_get_json(_draft_workout_sessions_ops_key(user_id)) is None:
-        _redis_set_json(_draft_workout_sessions_ops_key(user_id), [], ttl_seconds=CACHE_TTL_LONG)
     return draft
 
 
@@ -163,12 +155,8 @@ def _sync_workout_sessions_to_db(user_id: int, sessions: List[Dict[str, Any]]) -
         conn.commit()
 
 
-def _invalidate_workout_cache(user_id: int) -> None:
-    _redis_delete(_draft_workout_sessions_key(user_id))
-    _redis_delete("workout:latest")
-    _redis_delete(f"session_hydration:{user_id}")
-    _redis_delete(f"user:{user_id}:progress")
-    _redis_delete(f"user:{user_id}:meal_logs")
+def _invalidate_workout_cache(user_id: int, day: Optional[str] = None) -> None:
+    invalidate(user_id, "workouts", day=day, keys=[_draft_workout_sessions_key(user_id)])
 
 
 def _idempotency_key_for_workout(
@@ -383,7 +371,7 @@ def log_workout_session(
             },
         )
         _sync_workout_sessions_to_db(user_id, draft.get("sessions", []))
-        _invalidate_workout_cache(user_id)
+        _invalidate_workout_cache(user_id, session_date)
         _award_points(user_id, 5, f"workout_log:{datetime.now().isoformat(timespec='seconds')}")
         _apply_daily_checklist_completion_bonus(user_id, session_date)
         message = "Workout session updated for this session."
@@ -414,7 +402,7 @@ def log_workout_session(
         },
     )
     _sync_workout_sessions_to_db(user_id, draft.get("sessions", []))
-    _invalidate_workout_cache(user_id)
+    _invalidate_workout_cache(user_id, session_date)
     _award_points(user_id, 5, f"workout_log:{datetime.now().isoformat(timespec='seconds')}")
     _apply_daily_checklist_completion_bonus(user_id, session_date)
     message = "Workout session logged for this session."
@@ -529,7 +517,7 @@ def remove_workout_exercise(
             },
         )
         _sync_workout_sessions_to_db(user_id, draft.get("sessions", []))
-        _invalidate_workout_cache(user_id)
+        _invalidate_workout_cache(user_id, session_date)
         return f"Removed {label} from {session_date}."
     return "No matching exercise found for that date."
 
@@ -595,5 +583,5 @@ def delete_workout_from_draft(
         },
     )
     _sync_workout_sessions_to_db(user_id, draft.get("sessions", []))
-    _invalidate_workout_cache(user_id)
+    _invalidate_workout_cache(user_id, date)
     return f"Removed {workout_type} on {date}."
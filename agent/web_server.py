@@ -42,7 +42,8 @@ from agent.tools.plan_tools import (
     _set_active_plan_cache,
     compute_plan_status,
 )
-from agent.redis.cache import _redis_delete, _redis_get_json, _redis_set_json
+from agent.redis.cache import _redis_get_json, _redis_set_json
+from agent.redis.invalidation import invalidate
 from agent.state import SESSION_CACHE
 from agent.plan.plan_generation import _build_plan_data
 from agent.tools.activity_utils import _estimate_workout_calories, _is_cardio_exercise
@@ -449,20 +450,15 @@ def _update_onboarding_preferences(user_id: int, payload: dict[str, Any]) -> Non
             )
         if current_weight_kg is not None:
             today = datetime.now().date().isoformat()
+            # Keep an existing check-in for today; only seed one if missing.
             cur.execute(
                 """
-                SELECT 1 FROM checkins WHERE user_id = ? AND checkin_date = ?
+                INSERT INTO checkins (user_id, checkin_date, weight_kg, mood, notes)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, checkin_date) DO NOTHING
                 """,
-                (user_id, today),
+                (user_id, today, current_weight_kg, "onboarding", "Initial check-in"),
             )
-            if not cur.fetchone():
-                cur.execute(
-                    """
-                    INSERT INTO checkins (user_id, checkin_date, weight_kg, mood, notes)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (user_id, today, current_weight_kg, "onboarding", "Initial check-in"),
-                )
         # User preferences mapping intentionally omitted for now.
         conn.commit()
 
@@ -1356,6 +1352,7 @@ def create_handler(agent_service: AgentService):
                             _draft_meal_logs_key(user_id), cached, ttl_seconds=CACHE_TTL_LONG
                         )
                         SESSION_CACHE.setdefault(user_id, {})["meal_logs"] = cached
+                    invalidate(user_id, "meals", day=logged_at)
                     _send_json(
                         self,
                         200,
@@ -1403,7 +1400,7 @@ def create_handler(agent_service: AgentService):
                     cur = conn.cursor()
                     if reset:
                         cur.execute("DELETE FROM checkins WHERE user_id = ?", (user_id,))
-                        _redis_delete(_draft_checkins_key(user_id))
+                        invalidate(user_id, "checkins", keys=[_draft_checkins_key(user_id)])
                         SESSION_CACHE.setdefault(user_id, {})["checkins"] = {"checkins": []}
                     else:
                         cur.execute(
@@ -1438,33 +1435,19 @@ def create_handler(agent_service: AgentService):
                                 return
                     cur.execute(
                         """
-                        SELECT 1 FROM checkins WHERE user_id = ? AND checkin_date = ?
+                        INSERT INTO checkins (user_id, checkin_date, weight_kg, mood, notes)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (user_id, checkin_date) DO UPDATE
+                        SET weight_kg = EXCLUDED.weight_kg, mood = EXCLUDED.mood, notes = EXCLUDED.notes
                         """,
-                        (user_id, parsed_date.isoformat()),
+                        (
+                            user_id,
+                            parsed_date.isoformat(),
+                            weight_kg,
+                            "manual",
+                            "Manual log",
+                        ),
                     )
-                    if cur.fetchone():
-                        cur.execute(
-                            """
-                            UPDATE checkins
-                            SET weight_kg = ?, mood = ?, notes = ?
-                            WHERE user_id = ? AND checkin_date = ?
-                            """,
-                            (weight_kg, "manual", "Manual log", user_id, parsed_date.isoformat()),
-                        )
-                    else:
-                        cur.execute(
-                            """
-                            INSERT INTO checkins (user_id, checkin_date, weight_kg, mood, notes)
-                            VALUES (?, ?, ?, ?, ?)
-                            """,
-                            (
-                                user_id,
-                                parsed_date.isoformat(),
-                                weight_kg,
-                                "manual",
-                                "Manual log",
-                            ),
-                        )
                     cur.execute("UPDATE users SET weight_kg = ? WHERE id = ?", (weight_kg, user_id))
                     conn.commit()
                 draft = {
@@ -3,7 +3,8 @@ from datetime import datetime, timedelta
 from api._shared import json_response, read_json, require_user_id
 from agent.db.connection import get_db_conn
 from agent.config.constants import CACHE_TTL_LONG, _draft_checkins_key
-from agent.redis.cache import _redis_delete, _redis_set_json
+from agent.redis.cache import _redis_set_json
+from agent.redis.invalidation import invalidate
 from agent.state import SESSION_CACHE
 
 
@@ -37,7 +38,7 @@ def handler(request):
         cur = conn.cursor()
         if reset:
             cur.execute("DELETE FROM checkins WHERE user_id = ?", (user_id,))
-            _redis_delete(_draft_checkins_key(user_id))
+            invalidate(user_id, "checkins", keys=[_draft_checkins_key(user_id)])
             SESSION_CACHE.setdefault(user_id, {})["checkins"] = {"checkins": []}
         else:
             cur.execute(
@@ -69,32 +70,20 @@ def handler(request):
                         status=400,
                     )
         cur.execute(
-            "SELECT 1 FROM checkins WHERE user_id = ? AND checkin_date = ?",
-            (user_id, parsed_date.isoformat()),
+            """
+            INSERT INTO checkins (user_id, checkin_date, weight_kg, mood, notes)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, checkin_date) DO UPDATE
+            SET weight_kg = EXCLUDED.weight_kg, mood = EXCLUDED.mood, notes = EXCLUDED.notes
+            """,
+            (
+                user_id,
+                parsed_date.isoformat(),
+                weight_kg,
+                "manual",
+                "Manual log",
+            ),
         )
-        if cur.fetchone():
-            cur.execute(
-                """
-                UPDATE checkins
-                SET weight_kg = ?, mood = ?, notes = ?
-                WHERE user_id = ? AND checkin_date = ?
-                """,
-                (weight_kg, "manual", "Manual log", user_id, parsed_date.isoformat()),
-            )
-        else:
-            cur.execute(
-                """
-                INSERT INTO checkins (user_id, checkin_date, weight_kg, mood, notes)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    user_id,
-                    parsed_date.isoformat(),
-                    weight_kg,
-                    "manual",
-                    "Manual log",
-                ),
-            )
         cur.execute("UPDATE users SET weight_kg = ? WHERE id = ?", (weight_kg, user_id))
         conn.commit()
     draft = {
@@ -109,4 +98,5 @@ def handler(request):
     }
     _redis_set_json(_draft_checkins_key(user_id), draft, ttl_seconds=CACHE_TTL_LONG)
     SESSION_CACHE.setdefault(user_id, {})["checkins"] = draft
+    invalidate(user_id, "checkins", "profile", day=parsed_date.isoformat())
     return json_response({"ok": True})
@@ -14,6 +14,7 @@ from api._shared import (
 )
 from agent.config.constants import CACHE_TTL_LONG, _draft_meal_logs_key
 from agent.redis.cache import _redis_get_json, _redis_set_json
+from agent.redis.invalidation import invalidate
 from agent.state import SESSION_CACHE
 from agent.db.connection import get_db_conn
 
@@ -94,6 +95,7 @@ def handler(request):
             cached.setdefault("meals", []).insert(0, meal_entry)
             _redis_set_json(_draft_meal_logs_key(user_id), cached, ttl_seconds=CACHE_TTL_LONG)
             SESSION_CACHE.setdefault(user_id, {})["meal_logs"] = cached
+        invalidate(user_id, "meals", day=logged_at)
         return json_response(
             {
                 "logged_at": logged_at,